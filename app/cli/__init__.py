@@ -0,0 +1,2 @@
+# cli/__init__.py
+# 命令行工具：通过 python -m app.cli.<工具名> 运行
@@ -0,0 +1,212 @@
+"""
+离线批量解密归档的钉钉回调数据
+
+归档格式为 JSONL（可为 .gz 压缩），每行一条记录，至少包含：
+    {"encrypt": "...", "signature": "...", "timestamp": "...", "nonce": "..."}
+（也兼容 {"query": {...}, "body": {"encrypt": "..."}} 的嵌套结构）
+
+用法：
+    python -m app.cli.decrypt_archive archive.jsonl.gz -o decrypted.jsonl.gz \\
+        --token xxx --aes-key xxx --key dingxxxx --workers 8 --chunk-size 2000
+
+- 流式读取：按块读取并分发到进程池，读写同时进行，不会整体加载文件
+- 输出顺序与输入一致；签名或解密失败的记录写入旁路文件（默认 <输出>.failed.jsonl）
+- 运行过程中在 stderr 输出吞吐统计
+"""
+
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import IO, ContextManager, Iterator, List, Optional, Tuple
+
+from app.utils.DingCallbackCrypto3 import DingCallbackCrypto3
+
+# 每个工作进程持有一个加解密实例（由进程池 initializer 创建）
+_worker_crypto: Optional[DingCallbackCrypto3] = None
+
+
+def _init_worker(token: str, aes_key: str, key: str):
+    global _worker_crypto
+    _worker_crypto = DingCallbackCrypto3(token=token, encodingAesKey=aes_key, key=key)
+
+
+def _extract(record: dict) -> Tuple[str, str, str, str]:
+    """从归档记录中取出 signature / timestamp / nonce / encrypt"""
+    query = record.get("query") or record
+    body = record.get("body") or record
+    return (
+        query.get("signature") or query.get("msg_signature"),
+        query.get("timestamp"),
+        query.get("nonce"),
+        body.get("encrypt"),
+    )
+
+
+def _decrypt_chunk(chunk: List[Tuple[int, str]]) -> Tuple[List[str], List[str]]:
+    """
+    在工作进程中解密一块记录，返回 (成功行列表, 失败行列表)，均已序列化为 JSON 行
+    """
+    ok, failed = [], []
+    for line_no, line in chunk:
+        try:
+            record = json.loads(line)
+            signature, timestamp, nonce, encrypt = _extract(record)
+            plaintext = _worker_crypto.getDecryptMsg(
+                signature, timestamp, nonce, encrypt
+            )
+            try:
+                event = json.loads(plaintext)
+            except json.JSONDecodeError:
+                event = plaintext
+            ok.append(
+                json.dumps(
+                    {"line": line_no, "timestamp": timestamp, "event": event},
+                    ensure_ascii=False,
+                )
+            )
+        except Exception as e:
+            failed.append(
+                json.dumps(
+                    {"line": line_no, "error": f"{type(e).__name__}: {e}", "raw": line},
+                    ensure_ascii=False,
+                )
+            )
+    return ok, failed
+
+
+def _open(path: str, mode: str) -> ContextManager[IO[str]]:
+    if path == "-":
+        # 标准输入输出由调用方持有，with 块结束时不关闭
+        return contextlib.nullcontext(sys.stdin if "r" in mode else sys.stdout)
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, mode + "b"), encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _iter_chunks(f: IO[str], chunk_size: int) -> Iterator[List[Tuple[int, str]]]:
+    lines = ((no, line.rstrip("\n")) for no, line in enumerate(f, 1) if line.strip())
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run(
+    input_path: str,
+    output_path: str,
+    failed_path: str,
+    token: str,
+    aes_key: str,
+    key: str,
+    workers: int,
+    chunk_size: int,
+) -> dict:
+    total = ok_count = failed_count = 0
+    start = time.perf_counter()
+    last_report = start
+
+    with (
+        _open(input_path, "r") as fin,
+        _open(output_path, "w") as fout,
+        _open(failed_path, "w") as ffail,
+        ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(token, aes_key, key),
+        ) as pool,
+    ):
+        # 同时在途的块数有上限，保证读取速度不会远超写出速度（内存有界）
+        inflight: deque[Future] = deque()
+        max_inflight = workers * 2
+
+        def drain_one():
+            nonlocal total, ok_count, failed_count, last_report
+            ok, failed = inflight.popleft().result()
+            for line in ok:
+                fout.write(line + "\n")
+            for line in failed:
+                ffail.write(line + "\n")
+            ok_count += len(ok)
+            failed_count += len(failed)
+            total += len(ok) + len(failed)
+
+            now = time.perf_counter()
+            if now - last_report >= 5:
+                last_report = now
+                print(
+                    f"[progress] {total} 条，{total / (now - start):.0f} 条/秒，"
+                    f"失败 {failed_count}",
+                    file=sys.stderr,
+                )
+
+        for chunk in _iter_chunks(fin, chunk_size):
+            inflight.append(pool.submit(_decrypt_chunk, chunk))
+            if len(inflight) >= max_inflight:
+                drain_one()
+        while inflight:
+            drain_one()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "total": total,
+        "ok": ok_count,
+        "failed": failed_count,
+        "elapsed_s": round(elapsed, 3),
+        "records_per_s": round(total / elapsed, 1) if elapsed else 0,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="离线批量解密钉钉回调归档（JSONL/gzip）"
+    )
+    parser.add_argument(
+        "input", help="归档文件路径（.jsonl 或 .jsonl.gz，- 表示 stdin）"
+    )
+    parser.add_argument("-o", "--output", default="-", help="解密结果输出路径")
+    parser.add_argument(
+        "--failed", default=None, help="失败记录旁路文件（默认 <输出>.failed.jsonl）"
+    )
+    parser.add_argument("--token", default=os.getenv("token"), help="回调 token")
+    parser.add_argument(
+        "--aes-key", default=os.getenv("ase_key"), help="回调 EncodingAESKey"
+    )
+    parser.add_argument(
+        "--key", default=os.getenv("Client_ID"), help="AppKey / CorpId / SuiteKey"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    if not (args.token and args.aes_key and args.key):
+        parser.error("必须提供 --token / --aes-key / --key（或对应的环境变量）")
+
+    failed_path = args.failed
+    if failed_path is None:
+        base = "decrypt" if args.output == "-" else args.output
+        failed_path = base.removesuffix(".gz").removesuffix(".jsonl") + ".failed.jsonl"
+
+    summary = run(
+        args.input,
+        args.output,
+        failed_path,
+        args.token,
+        args.aes_key,
+        args.key,
+        max(1, args.workers),
+        max(1, args.chunk_size),
+    )
+    print(f"[done] {json.dumps(summary, ensure_ascii=False)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
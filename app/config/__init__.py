@@ -1,9 +1,37 @@
 # config/__init__.py
+from typing import Optional
+
 from .settings import Settings
 from .api_paths import APIPaths
 
-settings = Settings()
+_settings: Optional[Settings] = None
+
+
+def get_settings() -> Settings:
+    """返回全局配置实例；首次调用时才读取环境变量与 .env"""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+class _LazySettings:
+    """
+    settings 的惰性代理：导入 app 时不再实例化 Settings（不读取 .env），
+    首次访问任一配置项时才加载，之后的读写都转发给真实的 Settings 实例
+    """
+
+    __slots__ = ()
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(get_settings(), name, value)
+
+
+settings = _LazySettings()
 api_paths = APIPaths()
 
 # 我们只导出这个实例，隐藏类的定义
-__all__ = ["settings", "api_paths"]
+__all__ = ["settings", "api_paths", "get_settings"]
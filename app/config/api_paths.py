@@ -14,5 +14,56 @@ class APIPaths:
     # 健康检查接口
     HEALTH_CHECK = f"{API_PREFIX}/health"
 
+    # 就绪检查接口（停机排空期间返回 503）
+    HEALTH_READY = f"{API_PREFIX}/health/ready"
+
     # 钉钉回调接口
     CALLBACK_VERIFY = f"{API_PREFIX}/callback"
+
+    # 互动卡片回调接口（同步返回更新后的卡片数据）
+    CARD_CALLBACK = f"{API_PREFIX}/card/callback"
+
+    # 管理接口（需 API_Token）
+    ADMIN_PREFIX = f"{API_PREFIX}/admin"
+
+    # 慢请求追踪查询接口
+    ADMIN_TRACES = f"{ADMIN_PREFIX}/traces"
+
+    # 历史回调事件查询接口
+    ADMIN_EVENTS = f"{ADMIN_PREFIX}/events"
+
+    # 历史机器人消息查询接口
+    ADMIN_MESSAGES = f"{ADMIN_PREFIX}/messages"
+
+    # 运行状态统计接口
+    ADMIN_STATS = f"{ADMIN_PREFIX}/stats"
+
+    # 事件实时订阅接口（SSE）
+    STREAM_EVENTS = f"{API_PREFIX}/stream/events"
+
+    # 事件实时订阅接口（WebSocket）
+    STREAM_WS = f"{API_PREFIX}/stream/ws"
+
+    # 本地通讯录：用户查询接口
+    ADMIN_DIRECTORY_USERS = f"{ADMIN_PREFIX}/directory/users"
+
+    # 本地通讯录：部门查询接口（含祖先链与成员）
+    ADMIN_DIRECTORY_DEPT = f"{ADMIN_PREFIX}/directory/depts/{{dept_id}}"
+
+    # 停机排空接口（停止接收新事件，供部署 preStop 调用）
+    ADMIN_DRAIN = f"{ADMIN_PREFIX}/drain"
+
+    # 机器人消息全文检索接口
+    ADMIN_MESSAGES_SEARCH = f"{ADMIN_PREFIX}/messages/search"
+
+    # 在线剖析接口（统计采样折叠栈 / cProfile 数据）
+    ADMIN_PROFILE = f"{ADMIN_PREFIX}/profile"
+
+    # 内存排查接口：tracemalloc 开关、命名快照、快照差异、对象计数
+    ADMIN_MEMORY_TRACEMALLOC = f"{ADMIN_PREFIX}/memory/tracemalloc"
+    ADMIN_MEMORY_SNAPSHOTS = f"{ADMIN_PREFIX}/memory/snapshots"
+    ADMIN_MEMORY_DIFF = f"{ADMIN_PREFIX}/memory/diff"
+    ADMIN_MEMORY_OBJECTS = f"{ADMIN_PREFIX}/memory/objects"
+
+    # 批量消息发送接口
+    ADMIN_BULK_SEND = f"{ADMIN_PREFIX}/messages/bulk-send"
@@ -1,4 +1,5 @@
 # config/settings.py
+from typing import Dict, List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
@@ -28,6 +29,303 @@ class Settings(BaseSettings):
     CorpID: str = Field(description="钉钉机器人的CorpID")
     API_Token: str = Field(description="钉钉机器人的API_Token")
 
+    # 日志配置
+    LOG_LEVEL: str = Field(default="INFO", description="根日志级别")
+    LOG_FILE: str = Field(
+        default="fastapi.log",
+        description="日志文件（按 10MB 轮转），留空则只输出到控制台",
+    )
+
     # 服务器配置
     SERVER_HOST: str = Field(description="服务器主机地址")
     SERVER_PORT: int = Field(description="服务器端口号")
+
+    # 请求追踪配置
+    TRACE_ENABLED: bool = Field(default=True, description="是否启用本地请求追踪")
+    TRACE_SAMPLE_RATE: float = Field(
+        default=1.0, description="追踪头部采样率（0~1），未采样请求几乎无额外开销"
+    )
+    TRACE_SLOW_MS: float = Field(
+        default=500.0, description="慢请求阈值（毫秒），超过阈值的追踪才会被保留"
+    )
+    TRACE_BUFFER_SIZE: int = Field(
+        default=200, description="内存中保留的慢请求追踪条数（环形缓冲区）"
+    )
+    TRACE_EXPORT_FILE: str = Field(
+        default="", description="慢请求追踪导出文件路径（JSONL），为空则不导出"
+    )
+
+    # 事件存储配置（SQLite WAL）
+    EVENT_STORE_ENABLED: bool = Field(
+        default=True, description="是否将回调事件与机器人消息写入本地事件存储"
+    )
+    EVENT_STORE_PATH: str = Field(default="events.db", description="事件存储文件路径")
+    EVENT_STORE_BATCH_SIZE: int = Field(
+        default=500, description="事件存储单次组提交的最大条数"
+    )
+    EVENT_STORE_FLUSH_MS: int = Field(
+        default=200, description="事件存储组提交的最长等待时间（毫秒）"
+    )
+    EVENT_STORE_QUEUE_SIZE: int = Field(
+        default=100000, description="事件存储写入队列上限，超出后丢弃并计数"
+    )
+    EVENT_STORE_RETENTION_DAYS: float = Field(
+        default=7, description="事件存储中回调事件与机器人消息的保留天数"
+    )
+    EVENT_STORE_MAX_ROWS: int = Field(
+        default=1000000, description="事件存储每张表最多保留的条数"
+    )
+
+    # 事件实时订阅配置（SSE / WebSocket）
+    EVENT_HUB_BUFFER_SIZE: int = Field(
+        default=1000, description="每个订阅者的缓冲区上限（条）"
+    )
+    EVENT_HUB_SLOW_POLICY: str = Field(
+        default="drop",
+        description="订阅者缓冲区满时的策略：drop（丢弃最旧）/ disconnect（断开）",
+    )
+    EVENT_HUB_MAX_SUBSCRIBERS: int = Field(default=100, description="最大订阅者数量")
+    EVENT_HUB_HEARTBEAT_SECONDS: float = Field(
+        default=15.0, description="订阅连接空闲时的心跳间隔（秒）"
+    )
+
+    # 事件转发配置（内部 Webhook）
+    FORWARD_URLS: List[str] = Field(
+        default_factory=list,
+        description='事件转发目标地址列表（JSON 数组，如 ["http://svc/hook"]），为空则不转发',
+    )
+    FORWARD_BATCH_SIZE: int = Field(default=100, description="每次 POST 的最大事件数")
+    FORWARD_BATCH_INTERVAL_MS: int = Field(
+        default=200, description="攒批的最长等待时间（毫秒）"
+    )
+    FORWARD_MAX_RETRIES: int = Field(default=3, description="单批次失败后的重试次数")
+    FORWARD_BACKOFF_MS: int = Field(
+        default=200, description="重试退避的基础时长（毫秒，按 2 的幂递增）"
+    )
+    FORWARD_QUEUE_SIZE: int = Field(
+        default=10000, description="每个目标的缓冲上限，超出后丢弃最旧事件"
+    )
+    FORWARD_BREAKER_THRESHOLD: int = Field(
+        default=5, description="连续失败多少次后熔断"
+    )
+    FORWARD_BREAKER_COOLDOWN: float = Field(
+        default=30.0, description="熔断后的冷却时间（秒）"
+    )
+    FORWARD_TIMEOUT: float = Field(default=5.0, description="转发请求超时时间（秒）")
+
+    # 钉钉 Stream 模式配置
+    STREAM_MODE_ENABLED: bool = Field(
+        default=False, description="是否启用 Stream 模式（长连接）接入事件与机器人消息"
+    )
+    STREAM_GATEWAY_URL: str = Field(
+        default="https://api.dingtalk.com/v1.0/gateway/connections/open",
+        description="Stream 模式网关注册地址（本地测试时可指向替身服务）",
+    )
+    STREAM_MAX_INFLIGHT: int = Field(
+        default=64, description="Stream 模式同时处理中的最大消息数（流控）"
+    )
+    STREAM_RECONNECT_MAX_SECONDS: float = Field(
+        default=60.0, description="Stream 模式断线重连的最大退避时间（秒）"
+    )
+
+    # 钉钉服务端 API 配置
+    DINGTALK_OAPI_URL: str = Field(
+        default="https://oapi.dingtalk.com",
+        description="钉钉服务端 API 地址（本地测试时可指向替身服务）",
+    )
+    DINGTALK_API_URL: str = Field(
+        default="https://api.dingtalk.com",
+        description="钉钉新版服务端 API 地址（本地测试时可指向替身服务）",
+    )
+
+    # 出站调用限流配置（同一节点的所有 worker 进程共享预算）
+    OUTBOUND_RATE_LIMIT_ENABLED: bool = Field(
+        default=True,
+        description="是否对开放接口与 sessionWebhook 调用按接口 + Client_ID 限流",
+    )
+    OUTBOUND_RATE_LIMIT_PATH: str = Field(
+        default="",
+        description="共享令牌桶文件路径，留空则放在 /dev/shm（不存在时为系统临时目录）",
+    )
+    OUTBOUND_QPS: float = Field(
+        default=20.0, description="每个接口的默认 QPS 上限（所有 worker 合计）"
+    )
+    OUTBOUND_QPS_OVERRIDES: Dict[str, float] = Field(
+        default_factory=dict,
+        description="按接口覆盖 QPS：接口路径（或 sessionWebhook）-> QPS，0 表示不限流",
+    )
+    OUTBOUND_RATE_LIMIT_SLOTS: int = Field(
+        default=256, description="共享令牌桶文件中的槽位数（可容纳的接口数）"
+    )
+
+    # 本地通讯录缓存配置
+    DIRECTORY_ENABLED: bool = Field(
+        default=False, description="是否启用本地通讯录缓存（由通讯录回调事件增量维护）"
+    )
+    DIRECTORY_SNAPSHOT_PATH: str = Field(
+        default="directory.json", description="通讯录快照文件路径（用于快速热启动）"
+    )
+    DIRECTORY_SNAPSHOT_INTERVAL_SECONDS: float = Field(
+        default=60.0, description="通讯录有变更时的快照保存间隔（秒）"
+    )
+
+    # 突发事件合并配置（按需开启）
+    COALESCE_ENABLED: bool = Field(
+        default=False, description="是否在分发处理函数前合并同类突发事件"
+    )
+    COALESCE_EVENT_TYPES: List[str] = Field(
+        default_factory=lambda: ["user_modify_org", "org_dept_modify"],
+        description="参与合并的事件类型",
+    )
+    COALESCE_WINDOW_MS: int = Field(
+        default=1000, description="默认合并窗口（毫秒），即单条事件的最大额外延迟"
+    )
+    COALESCE_WINDOWS: Dict[str, int] = Field(
+        default_factory=dict,
+        description='按事件类型覆盖合并窗口（JSON，如 {"user_modify_org": 2000}）',
+    )
+    COALESCE_MAX_IDS: int = Field(
+        default=1000, description="单条合并事件的最大ID数，达到后立即下发"
+    )
+
+    # 事件处理优先级调度配置
+    SCHEDULER_ENABLED: bool = Field(
+        default=True, description="是否按优先级类别调度事件处理函数"
+    )
+    SCHEDULER_WORKERS: int = Field(default=16, description="执行处理函数的 worker 数")
+    SCHEDULER_CLASS_WEIGHTS: Dict[str, int] = Field(
+        default_factory=lambda: {"critical": 16, "high": 8, "normal": 2, "low": 1},
+        description="各优先级类别的权重（加权公平队列）",
+    )
+    SCHEDULER_EVENT_CLASSES: Dict[str, str] = Field(
+        default_factory=dict,
+        description='EventType 到优先级类别的映射（覆盖内置映射，机器人消息使用键 "robot"）',
+    )
+    SCHEDULER_DEFAULT_CLASS: str = Field(
+        default="normal", description="未配置的事件类型所属的优先级类别"
+    )
+    SCHEDULER_MAX_QUEUE_SIZE: int = Field(
+        default=100000, description="每个优先级类别的最大排队数"
+    )
+
+    # 停机排空配置
+    DRAIN_TIMEOUT_SECONDS: float = Field(
+        default=20.0, description="停机时等待处理函数完成的最长时间（秒）"
+    )
+    DRAIN_SPILL_PATH: str = Field(
+        default="pending_work.json",
+        description="停机时未处理完的工作落盘文件（下次启动时重放），留空则不落盘；"
+        "相对路径相对于 DATA_DIR",
+    )
+    DATA_DIR: str = Field(
+        default="",
+        description="运行时数据目录，相对路径的落盘文件放在此处；"
+        "本身为相对路径时相对于项目根目录，留空即项目根目录",
+    )
+
+    # 机器人消息入站限流配置（令牌桶）
+    ROBOT_RATE_LIMIT_ENABLED: bool = Field(
+        default=True, description="是否对机器人消息按发送者/会话/企业限流"
+    )
+    ROBOT_RATE_LIMITS: Dict[str, List[float]] = Field(
+        default_factory=lambda: {
+            "senderId": [1.0, 5],
+            "conversationId": [5.0, 20],
+            "chatbotCorpId": [50.0, 200],
+        },
+        description="各维度的限流预算：字段名 -> [每秒补充令牌数, 桶容量]",
+    )
+    ROBOT_RATE_IDLE_SECONDS: float = Field(
+        default=300.0, description="令牌桶空闲多久后被回收（秒）"
+    )
+    ROBOT_RATE_MAX_BUCKETS: int = Field(
+        default=100000, description="每个维度最多保留的令牌桶数量"
+    )
+
+    # 入口防护配置（ASGI 层，早于请求体缓冲与解析）
+    CALLBACK_MAX_BODY_BYTES: int = Field(
+        default=64 * 1024, description="钉钉回调接口的请求体上限（字节）"
+    )
+    ROBOT_MAX_BODY_BYTES: int = Field(
+        default=256 * 1024, description="机器人消息接口的请求体上限（字节）"
+    )
+    DEFAULT_MAX_BODY_BYTES: int = Field(
+        default=1024 * 1024, description="其他接口的请求体上限（字节）"
+    )
+
+    # 机器人消息关键词扫描配置
+    KEYWORD_SCAN_ENABLED: bool = Field(
+        default=False, description="是否对机器人消息进行关键词/敏感词扫描"
+    )
+    KEYWORD_DICT_PATH: str = Field(
+        default="keywords.txt",
+        description="关键词词典文件（每行一个词，可 Tab 分隔分类）",
+    )
+    KEYWORD_IGNORE_CASE: bool = Field(default=True, description="匹配时是否忽略大小写")
+    KEYWORD_RELOAD_INTERVAL_SECONDS: float = Field(
+        default=10.0, description="检查词典文件变化的间隔（秒）"
+    )
+
+    # 机器人消息全文索引配置（SQLite FTS5）
+    MESSAGE_INDEX_ENABLED: bool = Field(
+        default=False, description="是否为机器人文本消息建立全文索引"
+    )
+    MESSAGE_INDEX_PATH: str = Field(
+        default="messages_index.db", description="全文索引数据库文件路径"
+    )
+    MESSAGE_INDEX_BATCH_SIZE: int = Field(default=500, description="每批提交的消息数")
+    MESSAGE_INDEX_FLUSH_MS: int = Field(
+        default=500, description="攒批的最长等待时间（毫秒）"
+    )
+    MESSAGE_INDEX_QUEUE_SIZE: int = Field(
+        default=50000, description="待索引队列上限，超出后丢弃"
+    )
+    MESSAGE_INDEX_RETENTION_DAYS: float = Field(
+        default=30, description="索引中消息的保留天数"
+    )
+    MESSAGE_INDEX_MAX_ROWS: int = Field(
+        default=1000000, description="索引中最多保留的消息条数"
+    )
+
+    # 多轮对话状态缓存配置
+    CONVERSATION_STATE_MAX_ENTRIES: int = Field(
+        default=10000, description="最多保留的会话状态条数"
+    )
+    CONVERSATION_STATE_MAX_BYTES: int = Field(
+        default=64 * 1024 * 1024, description="会话状态的近似内存上限（字节）"
+    )
+    CONVERSATION_STATE_TTL_SECONDS: float = Field(
+        default=1800.0, description="会话状态空闲多久后过期（秒）"
+    )
+    CONVERSATION_STATE_SNAPSHOT_PATH: str = Field(
+        default="", description="会话状态快照文件，留空则不持久化"
+    )
+    CONVERSATION_STATE_SNAPSHOT_INTERVAL_SECONDS: float = Field(
+        default=30.0, description="会话状态快照的保存间隔（秒）"
+    )
+
+    # CPU 密集型处理函数的分片进程池配置
+    PROCESS_POOL_SHARDS: int = Field(
+        default=0,
+        description="分片进程数（0 表示不启用，cpu_bound 处理函数退回线程池执行）",
+    )
+
+    # 批量消息发送配置
+    BULK_SEND_QPS: float = Field(default=20.0, description="批量发送的全局 QPS 预算")
+    BULK_SEND_CONCURRENCY: int = Field(
+        default=10, description="批量发送的最大并发请求数"
+    )
+    BULK_SEND_MAX_RETRIES: int = Field(
+        default=3, description="遇到限流错误时的重试次数"
+    )
+
+    # 互动卡片回调配置
+    CARD_TEMPLATE_DIR: str = Field(
+        default="", description="卡片模板目录（*.json），留空则只使用代码中注册的模板"
+    )
+    CARD_CALLBACK_DEADLINE_MS: float = Field(
+        default=2000.0, description="卡片回调同步应答的时限（毫秒），超时返回空响应"
+    )
+    CARD_RENDER_CACHE_SIZE: int = Field(
+        default=1024, description="卡片渲染结果的 LRU 缓存条数（0 表示不缓存）"
+    )
@@ -1,8 +1,7 @@
 # core/__init__.py
-import logging
 from .lifespan import lifespan
+from .dispatcher import dispatcher
+from .conversation_state import conversation_store
+from .card_callbacks import card_callbacks
 
-# 配置日志，以便在初始化时就能看到输出
-logging.basicConfig(level=logging.INFO)
-
-__all__ = ["lifespan"]
+__all__ = ["lifespan", "dispatcher", "conversation_store", "card_callbacks"]
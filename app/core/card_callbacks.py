@@ -0,0 +1,197 @@
+# core/card_callbacks.py
+import asyncio
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.utils.card_template import CardTemplate
+
+logger = logging.getLogger(__name__)
+
+# 通配符：处理所有 actionId
+ANY = "*"
+
+# 无需更新卡片时的响应
+EMPTY_RESPONSE = b"{}"
+
+CardHandler = Callable[[Any], Any]
+
+
+class RenderedCard(bytes):
+    """模板渲染结果（已是 JSON 字节串，直接作为响应体返回）"""
+
+
+class CardCallbackRegistry:
+    """
+    互动卡片回调：处理函数注册、预编译模板与渲染缓存
+
+    与 ding_callback 只回 "success" 不同，卡片回调需要在时限内同步返回更新后的卡片数据：
+
+        @card_callbacks.on_action("approve")
+        async def approve(callback: CardCallbackRequest):
+            return card_callbacks.render("approval_result", {"status": "已同意"})
+
+    处理函数可返回 render() 的结果、普通 dict，或 None（不更新卡片）。
+    - 模板在注册时预编译，渲染只替换变量（见 CardTemplate）
+    - 渲染结果按 (模板名, 变量) 放入 LRU 缓存，相同的点击结果直接复用字节串；
+      同步处理函数在线程中调用 render()，缓存的读写由一把线程锁保护
+    - 每次回调按时限计时：处理函数超时即返回空响应，并记录超时与耗时分布
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[CardHandler]] = {}
+        self._templates: Dict[str, CardTemplate] = {}
+        self._cache: "OrderedDict[Tuple[str, str], RenderedCard]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.configure()
+        self._latencies: deque = deque(maxlen=1000)
+        self.calls = 0
+        self.unhandled = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def configure(self, deadline_ms: float = 2000.0, cache_size: int = 1024):
+        self.deadline = deadline_ms / 1000
+        self.cache_size = cache_size
+        with self._cache_lock:
+            self._cache.clear()
+
+    # ------------------- 处理函数 -------------------
+    def add_handler(self, action_ids, handler: CardHandler):
+        for action_id in action_ids:
+            self._handlers.setdefault(action_id, []).append(handler)
+
+    def on_action(self, *action_ids: str):
+        """装饰器：按卡片按钮的 actionId 注册处理函数（不传参数表示所有回调）"""
+
+        def decorator(handler: CardHandler) -> CardHandler:
+            self.add_handler(action_ids or (ANY,), handler)
+            return handler
+
+        return decorator
+
+    def find_handler(self, action_ids: List[str]) -> Optional[CardHandler]:
+        """一次回调只由一个处理函数应答：按 actionId 顺序取第一个，最后回退到通配"""
+        for action_id in (*action_ids, ANY):
+            handlers = self._handlers.get(action_id)
+            if handlers:
+                return handlers[0]
+        return None
+
+    # ------------------- 模板 -------------------
+    def register_template(self, name: str, template: Any):
+        """注册（或替换）模板；template 为卡片 JSON 结构"""
+        self._templates[name] = CardTemplate(template)
+        with self._cache_lock:
+            for key in [k for k in self._cache if k[0] == name]:
+                del self._cache[key]
+
+    def load_templates(self, directory: str) -> int:
+        """加载目录下的 *.json 模板，文件名（不含扩展名）即模板名"""
+        count = 0
+        for filename in sorted(os.listdir(directory)):
+            name, ext = os.path.splitext(filename)
+            if ext != ".json":
+                continue
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                self.register_template(name, json.load(f))
+            count += 1
+        logger.info(f"已加载 {count} 个卡片模板: {directory}")
+        return count
+
+    def render(self, name: str, variables: Dict[str, Any]) -> RenderedCard:
+        """渲染模板（带 LRU 缓存）；模板不存在或缺少变量时抛出 KeyError"""
+        template = self._templates[name]
+        # 变量按键排序后序列化作为缓存键，保证不同类型的相等值（1 / True）不会互相命中
+        key = (name, json.dumps(variables, sort_keys=True, default=str))
+        cache = self._cache
+        with self._cache_lock:
+            rendered = cache.get(key)
+            if rendered is not None:
+                cache.move_to_end(key)
+                self.cache_hits += 1
+                return rendered
+            self.cache_misses += 1
+        # 渲染在锁外进行；并发渲染同一结果时后写入的覆盖先写入的，结果相同
+        rendered = RenderedCard(template.render(variables).encode())
+        if self.cache_size > 0:
+            with self._cache_lock:
+                cache[key] = rendered
+                cache.move_to_end(key)
+                while len(cache) > self.cache_size:
+                    cache.popitem(last=False)
+        return rendered
+
+    # ------------------- 回调处理 -------------------
+    async def handle(self, callback: Any) -> bytes:
+        """执行对应的处理函数并返回响应体（JSON 字节串）；超时或失败时返回空响应"""
+        start = time.perf_counter()
+        self.calls += 1
+        handler = self.find_handler(callback.action_ids)
+        if handler is None:
+            self.unhandled += 1
+            return EMPTY_RESPONSE
+        try:
+            if inspect.iscoroutinefunction(handler):
+                call = handler(callback)
+            else:
+                call = asyncio.to_thread(handler, callback)
+            result = await asyncio.wait_for(call, timeout=self.deadline)
+            body = self._to_body(result)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            logger.warning(
+                f"卡片回调处理超时（{self.deadline * 1000:.0f}ms）: "
+                f"outTrackId={callback.outTrackId} actions={callback.action_ids}"
+            )
+            body = EMPTY_RESPONSE
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"卡片回调处理失败: {e}", exc_info=True)
+            body = EMPTY_RESPONSE
+        self._latencies.append((time.perf_counter() - start) * 1000)
+        return body
+
+    @staticmethod
+    def _to_body(result: Any) -> bytes:
+        if result is None:
+            return EMPTY_RESPONSE
+        if isinstance(result, bytes):
+            return result
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        lookups = self.cache_hits + self.cache_misses
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 2)
+
+        return {
+            "deadline_ms": self.deadline * 1000,
+            "templates": len(self._templates),
+            "handlers": {k: len(v) for k, v in self._handlers.items()},
+            "calls": self.calls,
+            "unhandled": self.unhandled,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(latencies[-1], 2) if latencies else None,
+            "cache_entries": len(self._cache),
+            "cache_hit_rate": (
+                round(self.cache_hits / lookups, 4) if lookups else None
+            ),
+        }
+
+
+card_callbacks = CardCallbackRegistry()
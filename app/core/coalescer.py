@@ -0,0 +1,144 @@
+# core/coalescer.py
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 需要合并的实体ID字段（钉钉通讯录类事件以列表形式携带）
+ID_FIELDS = ("UserId", "DeptId")
+
+
+class _Pending:
+    """同一 (EventType, CorpId) 在窗口内累积的事件"""
+
+    __slots__ = ("event", "ids", "count", "first_at", "handle")
+
+    def __init__(self, event: Dict[str, Any]):
+        self.event = dict(event)
+        # dict 作为有序集合：保留首次出现顺序并去重
+        self.ids: Dict[str, Dict[Any, None]] = defaultdict(dict)
+        self.count = 0
+        self.first_at = time.monotonic()
+        self.handle: Optional[asyncio.TimerHandle] = None
+
+
+class _TypeStats:
+    __slots__ = ("events_in", "events_out", "ids_in", "ids_out", "lag_total", "lag_max")
+
+    def __init__(self):
+        self.events_in = 0
+        self.events_out = 0
+        self.ids_in = 0
+        self.ids_out = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+
+
+class EventCoalescer:
+    """
+    突发同实体变更事件合并（位于解密之后、处理函数分发之前，按需开启）
+
+    批量导入等场景会在几秒内产生成千上万条 user_modify_org / org_dept_modify。
+    同一 (EventType, CorpId) 的事件在窗口期内合并为一条，UserId / DeptId 取并集去重，
+    处理函数收到的是合并后的ID集合。
+    - 窗口从该键的第一条事件开始计时，因此每条事件的额外延迟不超过对应窗口
+    - 合并的ID数达到 max_ids 时立即下发，避免单条事件过大
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[Dict[str, Any]], None],
+        event_types: Iterable[str],
+        window_ms: int = 1000,
+        windows: Optional[Dict[str, int]] = None,
+        max_ids: int = 1000,
+    ):
+        self.emit = emit
+        self.event_types = set(event_types)
+        self.default_window = window_ms / 1000
+        self.windows = {k: v / 1000 for k, v in (windows or {}).items()}
+        self.max_ids = max_ids
+        self._pending: Dict[Tuple[str, Any], _Pending] = {}
+        self._stats: Dict[str, _TypeStats] = defaultdict(_TypeStats)
+
+    def accepts(self, event_type: Optional[str]) -> bool:
+        return event_type in self.event_types
+
+    def add(self, event: Dict[str, Any]):
+        event_type = event.get("EventType")
+        key = (event_type, event.get("CorpId"))
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = _Pending(event)
+            window = self.windows.get(event_type, self.default_window)
+            loop = asyncio.get_running_loop()
+            pending.handle = loop.call_later(window, self.flush, key)
+            self._pending[key] = pending
+        else:
+            # 非ID字段以最新一条为准
+            pending.event.update(event)
+
+        stats = self._stats[event_type]
+        stats.events_in += 1
+        pending.count += 1
+        total_ids = 0
+        for field in ID_FIELDS:
+            values = event.get(field)
+            if values:
+                stats.ids_in += len(values)
+                merged = pending.ids[field]
+                for value in values:
+                    merged[value] = None
+            total_ids += len(pending.ids.get(field, ()))
+
+        if total_ids >= self.max_ids:
+            self.flush(key)
+
+    def flush(self, key: Tuple[str, Any]):
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        if pending.handle is not None:
+            pending.handle.cancel()
+
+        merged = pending.event
+        for field, values in pending.ids.items():
+            merged[field] = list(values)
+        merged["CoalescedCount"] = pending.count
+
+        stats = self._stats[key[0]]
+        lag = (time.monotonic() - pending.first_at) * 1000
+        stats.events_out += 1
+        stats.ids_out += sum(len(v) for v in pending.ids.values())
+        stats.lag_total += lag
+        stats.lag_max = max(stats.lag_max, lag)
+        try:
+            self.emit(merged)
+        except Exception as e:
+            logger.error(f"合并事件下发失败: {e}", exc_info=True)
+
+    def flush_all(self):
+        """立即下发所有窗口中的事件（应用关闭时调用）"""
+        for key in list(self._pending):
+            self.flush(key)
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for event_type, s in self._stats.items():
+            result[event_type] = {
+                "events_in": s.events_in,
+                "events_out": s.events_out,
+                "merge_ratio": (
+                    round(s.events_in / s.events_out, 2) if s.events_out else None
+                ),
+                "ids_in": s.ids_in,
+                "ids_out": s.ids_out,
+                "avg_window_lag_ms": (
+                    round(s.lag_total / s.events_out, 2) if s.events_out else None
+                ),
+                "max_window_lag_ms": round(s.lag_max, 2),
+            }
+        return {"pending": len(self._pending), "types": result}
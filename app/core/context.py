@@ -1,10 +1,53 @@
 # core/context.py
+import asyncio
+import json
 import logging
+import os
+import tempfile
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import anyio
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.requests import HTTPConnection
+
 from app.config import Settings  # 导入 Settings 类定义，而不是实例
+from app.core.card_callbacks import card_callbacks
+from app.core.coalescer import EventCoalescer
+from app.core.conversation_state import conversation_store
+from app.core.dispatcher import dispatcher
+from app.core.events import CallbackEvent, RobotEvent
+from app.core.logging_config import configure_logging
+from app.core.memory import memory_inspector
+from app.core.process_pool import ShardedProcessPool
+from app.core.profiler import profiler
+from app.core.ratelimit import MultiKeyRateLimiter, SharedTokenBucket
+from app.core.scheduler import ROBOT_KEY, PriorityScheduler
+from app.core.spool import PendingWorkSpool
+from app.core.tracing import tracer
+from app.services.event_store_services import EventStore
+from app.services.event_hub_services import EventHub
+from app.services.forwarder_services import EventForwarder
+from app.schemas.ding_robot import robot_request_adapter, robot_request_samples
+from app.services.dingtalk_api_services import DingTalkClient
+from app.services.bulk_send_services import BulkSender
+from app.services.directory_services import DIRECTORY_EVENTS, OrgDirectory
+from app.services.keyword_services import KeywordScanner
+from app.services.message_search_services import MessageSearchIndex
+from app.utils.DingCallbackCrypto3 import DingCallbackCrypto3
+from app.utils.DingRobotCryPto3 import DingRobotCrypto3
+
+if TYPE_CHECKING:
+    from app.services.stream_services import DingStreamClient
 
 # 获取一个日志记录器
 logger = logging.getLogger(__name__)
 
+# 项目根目录（app 包的上一级），用作相对路径数据文件的默认位置
+PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
 
 class AppContext:
     """
@@ -14,9 +57,10 @@ class AppContext:
     这是一个单一实例（Singleton）类，在整个应用生命周期中存在。
     """
 
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, app: Optional[FastAPI] = None):
         logger.info("正在创建应用上下文 (AppContext)...")
         self.settings = settings
+        self.app = app
 
         # ----------------------------------------------------
         # 1. 注册所有服务状态（初始化为 None）
@@ -24,16 +68,87 @@ class AppContext:
         # self.redis: Optional[Redis] = None
         # self.db_pool: Optional[asyncpg.Pool] = None # 如果用 asyncpg
         # 我们这里使用 Tortoise-ORM，它会自己管理连接
+        self.trace_exporter_task: Optional[asyncio.Task] = None
+        self.callback_crypto: Optional[DingCallbackCrypto3] = None
+        self.robot_crypto: Optional[DingRobotCrypto3] = None
+        self.event_store: Optional[EventStore] = None
+        self.message_index: Optional[MessageSearchIndex] = None
+        self.event_hub: Optional[EventHub] = None
+        self.forwarder: Optional[EventForwarder] = None
+        self.stream_client: Optional["DingStreamClient"] = None
+        self.dispatcher = dispatcher
+        self.conversation_store = conversation_store
+        self.card_callbacks = card_callbacks
+        self.coalescer: Optional[EventCoalescer] = None
+        self.scheduler: Optional[PriorityScheduler] = None
+        self.process_pool: Optional[ShardedProcessPool] = None
+        self.robot_limiter: Optional[MultiKeyRateLimiter] = None
+        self.outbound_limiter: Optional[SharedTokenBucket] = None
+        self.keyword_scanner: Optional[KeywordScanner] = None
+        self.dingtalk_api: Optional[DingTalkClient] = None
+        self.bulk_sender: Optional[BulkSender] = None
+        self.directory: Optional[OrgDirectory] = None
+        self._background_tasks: list[asyncio.Task] = []
+
+        # 生命周期状态：starting -> ready -> draining -> stopped
+        self.state = "starting"
+        self._drain_started = 0.0
+        self._drain_started_at = 0.0
+        self.last_drain: Optional[Dict[str, Any]] = None
+        self.previous_drain: Optional[Dict[str, Any]] = None
+        self.replayed = 0
+        self.startup_report: Optional[Dict[str, Any]] = None
         logger.info("服务句柄已初始化为 None。")
 
+    @property
+    def accepting(self) -> bool:
+        """是否接收新的回调事件与机器人消息"""
+        return self.state == "ready"
+
     async def startup(self):
         """
         在应用启动时，统一调用所有服务的初始化函数。
         """
         logger.info("执行应用启动任务 (startup)...")
-        # 按照你希望的顺序“注册”并初始化服务
-        # ... await self._init_...() ...
-        logger.info("所有服务均已启动。")
+        # 按照你希望的顺序“注册”并初始化服务，并记录每一步的耗时
+        steps = (
+            self._init_logging,
+            self._init_crypto,
+            self._init_tracing,
+            self._init_event_store,
+            self._init_message_index,
+            self._init_event_hub,
+            self._init_robot_limiter,
+            self._init_keyword_scanner,
+            self._init_forwarder,
+            self._init_process_pool,
+            self._init_scheduler,
+            self._init_coalescer,
+            self._init_outbound_limiter,
+            self._init_dingtalk_api,
+            self._init_directory,
+            self._init_conversation_state,
+            self._init_card_callbacks,
+            self._init_stream_client,
+            self._replay_pending_work,
+            self._prewarm,
+        )
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+        for step in steps:
+            step_started = time.perf_counter()
+            await step()
+            timings[step.__name__.lstrip("_")] = round(
+                (time.perf_counter() - step_started) * 1000, 2
+            )
+        total = round((time.perf_counter() - started) * 1000, 2)
+        self.startup_report = {"total_ms": total, "steps": timings}
+        slowest = sorted(timings.items(), key=lambda kv: kv[1], reverse=True)[:3]
+        self.state = "ready"
+        logger.info(
+            f"所有服务均已启动，耗时 {total}ms，最慢的步骤: "
+            + ", ".join(f"{name} {ms}ms" for name, ms in slowest)
+        )
 
     async def shutdown(self):
         """
@@ -42,16 +157,603 @@ class AppContext:
         logger.info("执行应用关闭任务 (shutdown)...")
         # 按照与启动相反的顺序关闭
         # ... await self._close_...() ...
+        self.begin_drain()
+        await self._close_stream_client()
+        await self._close_coalescer()
+        await self._drain_pending_work()
+        await self._close_scheduler()
+        await self._close_process_pool()
+        await self._cancel_background_tasks()
+        await self._close_directory()
+        await self._close_conversation_state()
+        await self._close_dingtalk_api()
+        await self._close_outbound_limiter()
+        await self._close_forwarder()
+        await self._close_event_hub()
+        await self._close_message_index()
+        await self._close_event_store()
+        await self._close_tracing()
+        self.state = "stopped"
         logger.info("所有服务均已安全关闭。")
 
+    def begin_drain(self):
+        """进入排空状态：就绪检查返回 draining，回调与机器人接口拒绝新请求（钉钉会重试到其他实例）"""
+        if self.state in ("draining", "stopped"):
+            return
+        self.state = "draining"
+        self._drain_started = time.monotonic()
+        self._drain_started_at = time.time()
+        logger.info("应用进入排空状态，停止接收新事件")
+
+    async def _drain_pending_work(self):
+        """
+        在截止时间内等待处理函数完成；仍未完成的（含被中断的）落盘，下次启动时重放。
+        被中断的处理函数会在重放时重新执行，因此处理函数应保持幂等
+        """
+        s = self.settings
+        pending_before = self.dispatcher.unfinished
+        completed = await self.dispatcher.drain(s.DRAIN_TIMEOUT_SECONDS)
+        items = [] if completed else self.dispatcher.take_unfinished()
+        report = {
+            "started_at": self._drain_started_at,
+            "duration_ms": round((time.monotonic() - self._drain_started) * 1000, 2),
+            "pending_at_drain": pending_before,
+            "timed_out": not completed,
+            "spilled": len(items),
+        }
+        # 排空报告只记录在日志与 stats 中，只有确实存在未完成工作时才落盘
+        if items and s.DRAIN_SPILL_PATH:
+            try:
+                await asyncio.to_thread(
+                    PendingWorkSpool(self._data_path(s.DRAIN_SPILL_PATH)).save,
+                    report,
+                    items,
+                )
+            except Exception as e:
+                logger.error(f"未完成工作落盘失败，{len(items)} 项将丢失: {e}")
+        elif items:
+            logger.warning(f"未配置落盘文件，丢弃 {len(items)} 项未完成工作")
+        self.last_drain = report
+        logger.info(
+            f"排空完成: 耗时 {report['duration_ms']}ms，待处理 {pending_before} 项，"
+            f"超时={report['timed_out']}，落盘 {len(items)} 项"
+        )
+
+    def _data_path(self, path: str) -> str:
+        """相对路径的数据文件放在 DATA_DIR（相对项目根目录）下，不依赖启动时的工作目录"""
+        if os.path.isabs(path):
+            return path
+        return os.path.join(PROJECT_ROOT, self.settings.DATA_DIR, path)
+
+    async def _replay_pending_work(self):
+        """重放上次停机时落盘的未完成工作（处理函数按名称找回）"""
+        path = self.settings.DRAIN_SPILL_PATH
+        if not path:
+            return
+        spool = PendingWorkSpool(self._data_path(path))
+        self.previous_drain, records = await asyncio.to_thread(spool.load)
+        if self.previous_drain is not None:
+            logger.info(f"上次停机排空报告: {self.previous_drain}")
+        skipped: List[str] = []
+        for record in records:
+            handler = self.dispatcher.find_handler(record.get("handler", ""))
+            if handler is None:
+                skipped.append(record.get("handler", ""))
+                continue
+            payload = record.get("payload")
+            if record.get("key") == ROBOT_KEY:
+                payload = RobotEvent.from_request(
+                    robot_request_adapter.validate_python(payload)
+                )
+            else:
+                payload = CallbackEvent.from_dict(payload)
+            self.dispatcher.submit(record.get("key"), handler, payload)
+            self.replayed += 1
+        if records:
+            logger.info(f"已重放 {self.replayed} 项未完成工作")
+        # 全部提交给调度器后删除；未执行完的会在本次停机时重新落盘
+        if self.previous_drain is not None or records:
+            await asyncio.to_thread(spool.remove)
+        if skipped:
+            logger.warning(
+                f"以下处理函数已不存在，跳过 {len(skipped)} 项: {set(skipped)}"
+            )
+
     # ----------------------------------------------------
     # 2. 编写每个服务的“注册”（初始化）函数
     # ----------------------------------------------------
     # async def _init_redis(self):
     # async def _init_database(self):
+    async def _init_logging(self):
+        """配置根日志（控制台 + 轮转文件），不在导入模块时进行"""
+        configure_logging(self.settings.LOG_LEVEL, self.settings.LOG_FILE)
+
+    async def _init_crypto(self):
+        """创建回调加解密与机器人签名工具；配置有误时记录错误，对应接口返回 500"""
+        s = self.settings
+        try:
+            self.callback_crypto = DingCallbackCrypto3(
+                token=s.token, encodingAesKey=s.ase_key, key=s.Client_ID
+            )
+        except Exception as e:
+            logger.error(f"初始化回调加解密工具失败，请检查 ase_key 是否正确: {e}")
+        try:
+            self.robot_crypto = DingRobotCrypto3(app_secret=s.Client_Secret)
+        except Exception as e:
+            logger.error(f"初始化机器人签名工具失败: {e}")
+
+    async def _prewarm(self):
+        """
+        预热原本由第一个请求承担的延迟初始化：
+        - anyio 的 asyncio 后端（中间件首次创建同步原语时才导入）
+        - 各消息类型的校验器
+        - AES 加解密（pycryptodome 的 CBC 模式首次使用时才加载）
+        - FastAPI 各路由的依赖与请求体字段（首次路由匹配时才构建）
+        """
+        anyio.Event()
+        for payload in robot_request_samples():
+            robot_request_adapter.validate_python(payload)
+            robot_request_adapter.validate_json(json.dumps(payload))
+        if self.callback_crypto is not None:
+            crypto = self.callback_crypto
+            encrypted = crypto.getEncryptedMap("prewarm")
+            crypto.getDecryptMsg(
+                encrypted["msg_signature"],
+                encrypted["timeStamp"],
+                encrypted["nonce"],
+                encrypted["encrypt"],
+            )
+        if self.app is not None:
+            await self._prewarm_routes()
+
+    async def _prewarm_routes(self):
+        """向路由层（不经过中间件）发一个不匹配任何路由的请求，触发所有路由的构建"""
+        scope = {
+            "type": "http",
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": "/__prewarm__",
+            "raw_path": b"/__prewarm__",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+        }
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            pass
+
+        await self.app.router(scope, receive, send)
+
+    async def _init_tracing(self):
+        """按配置初始化请求追踪器，并启动慢请求追踪的后台导出任务"""
+        s = self.settings
+        tracer.configure(
+            enabled=s.TRACE_ENABLED,
+            sample_rate=s.TRACE_SAMPLE_RATE,
+            slow_ms=s.TRACE_SLOW_MS,
+            buffer_size=s.TRACE_BUFFER_SIZE,
+            export_file=s.TRACE_EXPORT_FILE,
+        )
+        if s.TRACE_ENABLED and s.TRACE_EXPORT_FILE:
+            self.trace_exporter_task = asyncio.create_task(tracer.run_exporter())
+        logger.info(
+            f"请求追踪已初始化: enabled={s.TRACE_ENABLED}, "
+            f"sample_rate={s.TRACE_SAMPLE_RATE}, slow_ms={s.TRACE_SLOW_MS}"
+        )
+
+    async def _init_event_store(self):
+        """初始化 SQLite 事件存储（后台线程批量写入）"""
+        s = self.settings
+        if not s.EVENT_STORE_ENABLED:
+            return
+        self.event_store = EventStore(
+            path=s.EVENT_STORE_PATH,
+            batch_size=s.EVENT_STORE_BATCH_SIZE,
+            flush_interval_ms=s.EVENT_STORE_FLUSH_MS,
+            queue_size=s.EVENT_STORE_QUEUE_SIZE,
+            retention_days=s.EVENT_STORE_RETENTION_DAYS,
+            max_rows=s.EVENT_STORE_MAX_ROWS,
+        )
+        await asyncio.to_thread(self.event_store.start)
+
+    async def _init_message_index(self):
+        """初始化机器人消息全文索引（后台线程批量写入）"""
+        s = self.settings
+        if not s.MESSAGE_INDEX_ENABLED:
+            return
+        self.message_index = MessageSearchIndex(
+            path=s.MESSAGE_INDEX_PATH,
+            batch_size=s.MESSAGE_INDEX_BATCH_SIZE,
+            flush_interval_ms=s.MESSAGE_INDEX_FLUSH_MS,
+            queue_size=s.MESSAGE_INDEX_QUEUE_SIZE,
+            retention_days=s.MESSAGE_INDEX_RETENTION_DAYS,
+            max_rows=s.MESSAGE_INDEX_MAX_ROWS,
+        )
+        await asyncio.to_thread(self.message_index.start)
+
+    async def _init_event_hub(self):
+        """初始化事件实时分发中心"""
+        s = self.settings
+        self.event_hub = EventHub(
+            buffer_size=s.EVENT_HUB_BUFFER_SIZE,
+            policy=s.EVENT_HUB_SLOW_POLICY,
+            max_subscribers=s.EVENT_HUB_MAX_SUBSCRIBERS,
+        )
+
+    async def _init_robot_limiter(self):
+        """初始化机器人消息入站限流器（纯内存）"""
+        s = self.settings
+        if not s.ROBOT_RATE_LIMIT_ENABLED:
+            return
+        self.robot_limiter = MultiKeyRateLimiter(
+            limits=s.ROBOT_RATE_LIMITS,
+            idle_seconds=s.ROBOT_RATE_IDLE_SECONDS,
+            max_buckets=s.ROBOT_RATE_MAX_BUCKETS,
+        )
+
+    async def _init_keyword_scanner(self):
+        """加载关键词词典并启动热更新检查"""
+        s = self.settings
+        if not s.KEYWORD_SCAN_ENABLED:
+            return
+        self.keyword_scanner = KeywordScanner(
+            s.KEYWORD_DICT_PATH, s.KEYWORD_IGNORE_CASE
+        )
+        if not await self.keyword_scanner.reload(force=True):
+            logger.warning(f"关键词词典 {s.KEYWORD_DICT_PATH} 不存在，等待文件创建")
+        self._spawn_background(
+            self.keyword_scanner.run_reloader(s.KEYWORD_RELOAD_INTERVAL_SECONDS)
+        )
+
+    async def _init_forwarder(self):
+        """初始化事件批量转发器（未配置目标地址时不启用）"""
+        s = self.settings
+        if not s.FORWARD_URLS:
+            return
+        self.forwarder = EventForwarder(
+            urls=s.FORWARD_URLS,
+            batch_size=s.FORWARD_BATCH_SIZE,
+            batch_interval_ms=s.FORWARD_BATCH_INTERVAL_MS,
+            max_retries=s.FORWARD_MAX_RETRIES,
+            backoff_ms=s.FORWARD_BACKOFF_MS,
+            queue_size=s.FORWARD_QUEUE_SIZE,
+            breaker_threshold=s.FORWARD_BREAKER_THRESHOLD,
+            breaker_cooldown=s.FORWARD_BREAKER_COOLDOWN,
+            timeout=s.FORWARD_TIMEOUT,
+        )
+        self.forwarder.start()
+
+    async def _init_process_pool(self):
+        """按配置创建分片进程池，供 cpu_bound 处理函数使用"""
+        s = self.settings
+        if s.PROCESS_POOL_SHARDS <= 0:
+            return
+        self.process_pool = ShardedProcessPool(s.PROCESS_POOL_SHARDS)
+        self.dispatcher.process_pool = self.process_pool
+        logger.info(f"处理函数进程池已创建: {s.PROCESS_POOL_SHARDS} 个分片")
+
+    async def _init_scheduler(self):
+        """启动优先级调度器，并挂载到事件分发器上"""
+        s = self.settings
+        if not s.SCHEDULER_ENABLED:
+            return
+        self.scheduler = PriorityScheduler(
+            run=self.dispatcher.run_handler,
+            workers=s.SCHEDULER_WORKERS,
+            weights=s.SCHEDULER_CLASS_WEIGHTS,
+            event_classes=s.SCHEDULER_EVENT_CLASSES,
+            default_class=s.SCHEDULER_DEFAULT_CLASS,
+            max_queue_size=s.SCHEDULER_MAX_QUEUE_SIZE,
+        )
+        self.scheduler.start()
+        self.dispatcher.scheduler = self.scheduler
+
+    async def _init_coalescer(self):
+        """按需启用突发事件合并，合并结果再交给分发器"""
+        s = self.settings
+        if not s.COALESCE_ENABLED:
+            return
+        self.coalescer = EventCoalescer(
+            emit=self.dispatcher.dispatch_event,
+            event_types=s.COALESCE_EVENT_TYPES,
+            window_ms=s.COALESCE_WINDOW_MS,
+            windows=s.COALESCE_WINDOWS,
+            max_ids=s.COALESCE_MAX_IDS,
+        )
+
+    async def _init_outbound_limiter(self):
+        """打开出站调用的共享令牌桶（同一节点的所有 worker 共用一个文件）"""
+        s = self.settings
+        if not s.OUTBOUND_RATE_LIMIT_ENABLED:
+            return
+        path = s.OUTBOUND_RATE_LIMIT_PATH
+        if not path:
+            directory = (
+                "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            )
+            path = os.path.join(directory, "dingtalk_http_outbound.ratelimit")
+        self.outbound_limiter = SharedTokenBucket(
+            path,
+            default_rate=s.OUTBOUND_QPS,
+            rates=s.OUTBOUND_QPS_OVERRIDES,
+            slots=s.OUTBOUND_RATE_LIMIT_SLOTS,
+        )
+
+    async def _init_dingtalk_api(self):
+        """创建钉钉服务端 API 客户端（首次调用时才会请求 access_token）"""
+        s = self.settings
+        self.dingtalk_api = DingTalkClient(
+            app_key=s.Client_ID,
+            app_secret=s.Client_Secret,
+            base_url=s.DINGTALK_OAPI_URL,
+            api_base_url=s.DINGTALK_API_URL,
+            limiter=self.outbound_limiter,
+        )
+        self.bulk_sender = BulkSender(
+            api=self.dingtalk_api,
+            robot_code=s.RobotCode,
+            agent_id=s.AgentID,
+            qps=s.BULK_SEND_QPS,
+            concurrency=s.BULK_SEND_CONCURRENCY,
+            max_retries=s.BULK_SEND_MAX_RETRIES,
+        )
+
+    async def _init_directory(self):
+        """
+        初始化本地通讯录：优先加载快照（热启动），否则在后台全量拉取；
+        并注册通讯录事件处理函数进行增量维护
+        """
+        s = self.settings
+        if not s.DIRECTORY_ENABLED:
+            return
+        self.directory = OrgDirectory(self.dingtalk_api, s.DIRECTORY_SNAPSHOT_PATH)
+        try:
+            loaded = await asyncio.to_thread(self.directory.load_snapshot)
+        except Exception as e:
+            logger.error(f"通讯录快照加载失败，改为全量拉取: {e}")
+            # 丢弃加载了一半的数据
+            self.directory = OrgDirectory(self.dingtalk_api, s.DIRECTORY_SNAPSHOT_PATH)
+            loaded = False
+        if not loaded:
+            self._spawn_background(self._bootstrap_directory())
+        self._spawn_background(
+            self.directory.run_snapshotter(s.DIRECTORY_SNAPSHOT_INTERVAL_SECONDS)
+        )
+        self.dispatcher.add_event_handler(
+            DIRECTORY_EVENTS, self.directory.on_directory_event
+        )
+
+    async def _init_conversation_state(self):
+        """配置多轮对话状态缓存，并从快照恢复未过期的会话"""
+        s = self.settings
+        self.conversation_store.configure(
+            max_entries=s.CONVERSATION_STATE_MAX_ENTRIES,
+            max_bytes=s.CONVERSATION_STATE_MAX_BYTES,
+            ttl_seconds=s.CONVERSATION_STATE_TTL_SECONDS,
+            snapshot_path=s.CONVERSATION_STATE_SNAPSHOT_PATH,
+        )
+        if not s.CONVERSATION_STATE_SNAPSHOT_PATH:
+            return
+        try:
+            await asyncio.to_thread(self.conversation_store.load_snapshot)
+        except Exception as e:
+            logger.error(f"会话状态快照加载失败: {e}")
+        self._spawn_background(
+            self.conversation_store.run_snapshotter(
+                s.CONVERSATION_STATE_SNAPSHOT_INTERVAL_SECONDS
+            )
+        )
+
+    async def _init_card_callbacks(self):
+        """配置卡片回调时限与渲染缓存，并加载模板目录"""
+        s = self.settings
+        self.card_callbacks.configure(
+            deadline_ms=s.CARD_CALLBACK_DEADLINE_MS,
+            cache_size=s.CARD_RENDER_CACHE_SIZE,
+        )
+        if s.CARD_TEMPLATE_DIR:
+            await asyncio.to_thread(
+                self.card_callbacks.load_templates, s.CARD_TEMPLATE_DIR
+            )
+
+    async def _bootstrap_directory(self):
+        try:
+            await self.directory.bootstrap()
+        except Exception as e:
+            logger.error(f"通讯录全量初始化失败: {e}", exc_info=True)
+
+    def _spawn_background(self, coro):
+        """启动一个随应用关闭而取消的后台任务"""
+        self._background_tasks.append(asyncio.create_task(coro))
+
+    async def _init_stream_client(self):
+        """按配置启动钉钉 Stream 模式客户端（与 HTTP 回调共用处理路径）"""
+        s = self.settings
+        if not s.STREAM_MODE_ENABLED:
+            return
+        # stream_services 依赖 services 包中的回调处理路径，在此处导入以避免循环导入
+        from app.services.stream_services import DingStreamClient
+
+        self.stream_client = DingStreamClient(
+            context=self,
+            client_id=s.Client_ID,
+            client_secret=s.Client_Secret,
+            gateway_url=s.STREAM_GATEWAY_URL,
+            max_inflight=s.STREAM_MAX_INFLIGHT,
+            reconnect_max=s.STREAM_RECONNECT_MAX_SECONDS,
+        )
+        self.stream_client.start()
 
     # ----------------------------------------------------
     # 3. 编写每个服务的“注销”（关闭）函数
     # ----------------------------------------------------
     # async def _close_redis(self):
     # async def _close_database(self):
+    async def _close_tracing(self):
+        """停止导出任务，并将剩余的追踪落盘"""
+        if self.trace_exporter_task is not None:
+            self.trace_exporter_task.cancel()
+            self.trace_exporter_task = None
+        tracer.flush_export()
+
+    async def _close_event_store(self):
+        """等待写线程刷完队列中剩余的事件"""
+        if self.event_store is not None:
+            await asyncio.to_thread(self.event_store.stop)
+            self.event_store = None
+
+    async def _close_message_index(self):
+        """等待写线程提交队列中剩余的消息"""
+        if self.message_index is not None:
+            await asyncio.to_thread(self.message_index.stop)
+            self.message_index = None
+
+    async def _close_stream_client(self):
+        """最先停止 Stream 接入，不再接收新消息"""
+        if self.stream_client is not None:
+            await self.stream_client.stop(self.settings.DRAIN_TIMEOUT_SECONDS)
+            self.stream_client = None
+
+    async def _close_coalescer(self):
+        """立即下发合并窗口中尚未到期的事件"""
+        if self.coalescer is not None:
+            self.coalescer.flush_all()
+            self.coalescer = None
+
+    async def _close_scheduler(self):
+        if self.scheduler is not None:
+            self.dispatcher.scheduler = None
+            await self.scheduler.stop()
+            self.scheduler = None
+
+    async def _close_process_pool(self):
+        """排空之后关闭进程池（等待已提交的任务完成）"""
+        if self.process_pool is not None:
+            self.dispatcher.process_pool = None
+            await asyncio.to_thread(self.process_pool.shutdown)
+            self.process_pool = None
+
+    async def _cancel_background_tasks(self):
+        """取消快照、热更新等周期性后台任务"""
+        for task in self._background_tasks:
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._background_tasks.clear()
+
+    async def _close_directory(self):
+        """注销通讯录事件处理函数，并保存最新的通讯录快照"""
+        if self.directory is not None:
+            self.dispatcher.remove_event_handler(
+                DIRECTORY_EVENTS, self.directory.on_directory_event
+            )
+            await self.directory.save_snapshot()
+            self.directory = None
+
+    async def _close_conversation_state(self):
+        """保存最新的会话状态快照"""
+        await self.conversation_store.save_snapshot()
+
+    async def _close_dingtalk_api(self):
+        if self.dingtalk_api is not None:
+            await self.dingtalk_api.aclose()
+            self.dingtalk_api = None
+            self.bulk_sender = None
+
+    async def _close_outbound_limiter(self):
+        if self.outbound_limiter is not None:
+            self.outbound_limiter.close()
+            self.outbound_limiter = None
+
+    async def _close_forwarder(self):
+        """尽力发送完缓冲区中的事件后关闭连接池"""
+        if self.forwarder is not None:
+            await self.forwarder.stop()
+            self.forwarder = None
+
+    async def _close_event_hub(self):
+        """断开所有实时订阅者"""
+        if self.event_hub is not None:
+            self.event_hub.close()
+            self.event_hub = None
+
+    # ----------------------------------------------------
+    # 4. 事件入口：由服务层在事件解密/校验完成后调用
+    # ----------------------------------------------------
+    def on_callback_event(self, event: CallbackEvent):
+        """入口处生成的紧凑回调事件进入各个下游服务（均为非阻塞操作）"""
+        if self.event_store is not None:
+            self.event_store.add_callback_event(event)
+        if self.event_hub is not None:
+            self.event_hub.publish_callback_event(event)
+        if self.forwarder is not None:
+            self.forwarder.forward_callback_event(event)
+        if self.coalescer is not None and self.coalescer.accepts(event.event_type):
+            # 合并窗口需要修改事件内容，按 dict 保留
+            self.coalescer.add(event.raw)
+        else:
+            self.dispatcher.dispatch_event(event)
+
+    def on_robot_message(self, event: RobotEvent):
+        """入口处生成的紧凑机器人消息进入各个下游服务（均为非阻塞操作）"""
+        if self.event_store is not None:
+            self.event_store.add_robot_message(event)
+        if self.message_index is not None:
+            self.message_index.add_robot_message(event)
+        if self.event_hub is not None:
+            self.event_hub.publish_robot_message(event)
+        if self.forwarder is not None:
+            self.forwarder.forward_robot_message(event)
+        self.dispatcher.dispatch_message(event)
+
+    def stats(self) -> Dict[str, Any]:
+        """汇总各服务的运行统计"""
+        return {
+            "tracing": tracer.stats(),
+            "event_store": self.event_store.stats() if self.event_store else None,
+            "message_index": (
+                self.message_index.stats() if self.message_index else None
+            ),
+            "event_hub": self.event_hub.stats() if self.event_hub else None,
+            "forwarder": self.forwarder.stats() if self.forwarder else None,
+            "stream": self.stream_client.stats() if self.stream_client else None,
+            "dispatcher": self.dispatcher.stats(),
+            "coalescer": self.coalescer.stats() if self.coalescer else None,
+            "scheduler": self.scheduler.stats() if self.scheduler else None,
+            "process_pool": (self.process_pool.stats() if self.process_pool else None),
+            "keywords": (
+                self.keyword_scanner.stats() if self.keyword_scanner else None
+            ),
+            "robot_rate_limit": (
+                self.robot_limiter.stats() if self.robot_limiter else None
+            ),
+            "directory": self.directory.stats() if self.directory else None,
+            "bulk_send": self.bulk_sender.stats() if self.bulk_sender else None,
+            "outbound_rate_limit": (
+                self.outbound_limiter.stats() if self.outbound_limiter else None
+            ),
+            "conversation_state": self.conversation_store.stats(),
+            "card_callbacks": self.card_callbacks.stats(),
+            "profiler": profiler.stats(),
+            "memory": memory_inspector.status(),
+            "lifecycle": {
+                "state": self.state,
+                "replayed": self.replayed,
+                "previous_drain": self.previous_drain,
+                "startup": self.startup_report,
+            },
+        }
+
+
+def get_app_context(conn: HTTPConnection) -> AppContext:
+    """FastAPI 依赖项：获取挂在 app.state 上的应用上下文"""
+    return conn.app.state.context
+
+
+def ensure_accepting(context: AppContext = Depends(get_app_context)):
+    """FastAPI 依赖项：排空期间拒绝新的事件请求"""
+    if not context.accepting:
+        raise HTTPException(status_code=503, detail="服务正在停机排空，请稍后重试")
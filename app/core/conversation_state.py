@@ -0,0 +1,232 @@
+# core/conversation_state.py
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+StateKey = Tuple[str, str]
+
+
+class _Entry:
+    __slots__ = ("state", "size", "touched_at", "touched_wall")
+
+    def __init__(self, state: Dict[str, Any], size: int):
+        self.state = state
+        self.size = size
+        self.touched_at = time.monotonic()
+        self.touched_wall = time.time()
+
+
+class ConversationStateStore:
+    """
+    多轮对话状态缓存：按 (conversationId, senderId) 保存处理函数之间的会话状态
+
+        state = conversation_store.get(body.conversationId, body.senderId) or {}
+        state["step"] = 2
+        conversation_store.set(body.conversationId, body.senderId, state)
+
+    - OrderedDict 实现 LRU，读写均为 O(1)；每次访问同时刷新空闲计时，
+      因此最久未访问的一端也是最先过期的一端，过期清理均摊 O(1)
+    - 容量上限：条目数 max_entries + 近似内存 max_bytes（按状态的 JSON 长度估算），超出时淘汰最久未访问的会话
+    - senderId 传空字符串表示整个会话共享的状态
+    - 可选磁盘快照：重启后恢复未过期的会话
+    - 线程安全：同步处理函数在线程池中执行（见 dispatcher.run_handler），
+      所有对条目的读写与快照都在同一把锁内完成
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[StateKey, _Entry]" = OrderedDict()
+        self.configure()
+        self._bytes = 0
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.evicted_ttl = 0
+        self.evicted_lru = 0
+
+    def configure(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 1800.0,
+        snapshot_path: str = "",
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.snapshot_path = snapshot_path
+
+    # ------------------- 读写 -------------------
+    def get(
+        self, conversation_id: str, sender_id: str = ""
+    ) -> Optional[Dict[str, Any]]:
+        key = (conversation_id, sender_id or "")
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and now - entry.touched_at >= self.ttl:
+                self._remove(key)
+                self.evicted_ttl += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry.touched_at = now
+            entry.touched_wall = time.time()
+            self._entries.move_to_end(key)
+            return entry.state
+
+    def set(self, conversation_id: str, sender_id: str, state: Dict[str, Any]):
+        """保存会话状态（状态需可 JSON 序列化，用于估算内存与快照）"""
+        size = len(json.dumps(state, ensure_ascii=False, default=str))
+        if size > self.max_bytes:
+            raise ValueError(f"会话状态过大: {size} 字节")
+        with self._lock:
+            self._set((conversation_id, sender_id or ""), state, size)
+
+    def delete(self, conversation_id: str, sender_id: str = ""):
+        """会话流程结束时调用，立即释放状态"""
+        with self._lock:
+            self._remove((conversation_id, sender_id or ""))
+
+    # 以下下划线方法均在持有 self._lock 时调用
+    def _set(self, key: StateKey, state: Dict[str, Any], size: int):
+        self._remove(key)
+        self._entries[key] = _Entry(state, size)
+        self._bytes += size
+        self._dirty = True
+        self._evict()
+
+    def _remove(self, key: StateKey):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+            self._dirty = True
+
+    def _evict(self):
+        entries = self._entries
+        now = time.monotonic()
+        while entries:
+            key, entry = next(iter(entries.items()))
+            if now - entry.touched_at >= self.ttl:
+                self.evicted_ttl += 1
+            elif len(entries) > self.max_entries or self._bytes > self.max_bytes:
+                self.evicted_lru += 1
+            else:
+                break
+            self._remove(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ------------------- 持久化 -------------------
+    def _take_snapshot(self) -> Optional[str]:
+        """
+        在锁内把快照序列化为 JSON 字符串；无变更时返回 None。
+        状态 dict 由处理函数持有并可能随时修改，必须在这里完成序列化，不能交给写盘线程；
+        处理函数恰好在线程中修改某个状态导致序列化失败时，保留变更标记，下个周期重试
+        """
+        with self._lock:
+            if not self.snapshot_path or not self._dirty:
+                return None
+            self._evict()
+            try:
+                snapshot = json.dumps(
+                    {
+                        "saved_at": time.time(),
+                        "entries": [
+                            [
+                                conversation_id,
+                                sender_id,
+                                entry.touched_wall,
+                                entry.state,
+                            ]
+                            for (conversation_id, sender_id), entry in (
+                                self._entries.items()
+                            )
+                        ],
+                    },
+                    ensure_ascii=False,
+                    default=str,
+                )
+            except RuntimeError as e:
+                logger.warning(f"会话状态快照序列化失败，下个周期重试: {e}")
+                return None
+            self._dirty = False
+            return snapshot
+
+    def _write_snapshot(self, snapshot: str):
+        """原子写入快照（先写临时文件再替换）"""
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(snapshot)
+        os.replace(tmp_path, self.snapshot_path)
+
+    async def save_snapshot(self) -> bool:
+        snapshot = self._take_snapshot()
+        if snapshot is None:
+            return False
+        await asyncio.to_thread(self._write_snapshot, snapshot)
+        return True
+
+    def load_snapshot(self) -> int:
+        """恢复快照中未过期的会话，按原访问顺序重建 LRU；返回恢复的条目数"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return 0
+        with open(self.snapshot_path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        now_wall, now = time.time(), time.monotonic()
+        with self._lock:
+            for conversation_id, sender_id, touched_wall, state in snapshot.get(
+                "entries", []
+            ):
+                idle = now_wall - touched_wall
+                if idle >= self.ttl:
+                    continue
+                key = (conversation_id, sender_id)
+                size = len(json.dumps(state, ensure_ascii=False, default=str))
+                self._set(key, state, size)
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.touched_at = now - idle
+                    entry.touched_wall = touched_wall
+            self._dirty = False
+            restored = len(self._entries)
+        logger.info(f"已从快照恢复 {restored} 个会话状态")
+        return restored
+
+    async def run_snapshotter(self, interval: float):
+        """后台任务：周期性地保存快照（序列化在事件循环中进行，写盘在线程中进行）"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.save_snapshot()
+            except Exception as e:
+                logger.error(f"会话状态快照保存失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, approx_bytes = len(self._entries), self._bytes
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "approx_bytes": approx_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evicted_ttl": self.evicted_ttl,
+            "evicted_lru": self.evicted_lru,
+        }
+
+
+conversation_store = ConversationStateStore()
@@ -0,0 +1,217 @@
+# core/dispatcher.py
+import asyncio
+import inspect
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set, Union
+
+from app.core.events import CallbackEvent, CompactEvent, RobotEvent
+from app.core.process_pool import ShardedProcessPool
+from app.core.scheduler import ROBOT_KEY, PriorityScheduler
+
+logger = logging.getLogger(__name__)
+
+# 通配符：订阅所有事件类型 / 消息类型
+ANY = "*"
+
+Handler = Callable[[Any], Any]
+
+
+def handler_name(handler: Handler) -> str:
+    """处理函数的稳定标识（模块 + 限定名），重启后用于找回同一个处理函数"""
+    module = getattr(handler, "__module__", "")
+    return f"{module}.{getattr(handler, '__qualname__', repr(handler))}"
+
+
+class EventDispatcher:
+    """
+    事件处理函数注册与分发
+
+    回调事件按 EventType、机器人消息按 msgtype 注册处理函数：
+
+        @dispatcher.on_event("user_add_org", "user_modify_org")
+        async def sync_user(event: dict): ...
+
+        @dispatcher.on_message("text")
+        async def reply(body: TextRequest): ...
+
+    处理函数在后台执行，不阻塞对钉钉的 ack；同步函数会被放入线程池。
+    排队期间只保留紧凑事件（见 core/events.py），处理函数开始执行时才还原为 dict / 模型。
+    挂载优先级调度器后，处理函数按优先级排队，由调度器的 worker 执行。
+
+    CPU 密集型处理函数可声明 cpu_bound=True，在分片进程池中执行
+    （需定义在模块顶层；未启用进程池时退回线程池）：
+
+        @dispatcher.on_event("bpms_instance_change", cpu_bound=True)
+        def parse_form(event: dict): ...
+    """
+
+    def __init__(self):
+        self._event_handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._message_handlers: Dict[str, List[Handler]] = defaultdict(list)
+        # 未挂载调度器时的后台任务 -> (key, handler, payload)
+        self._tasks: Dict[asyncio.Task, tuple] = {}
+        self.scheduler: Optional[PriorityScheduler] = None
+        self.process_pool: Optional[ShardedProcessPool] = None
+        self._cpu_bound: Set[Handler] = set()
+        self.dispatched = 0
+        self.failed = 0
+
+    # ------------------- 注册 -------------------
+    def add_event_handler(self, event_types, handler: Handler, cpu_bound=False):
+        if cpu_bound:
+            self._cpu_bound.add(handler)
+        for event_type in event_types:
+            self._event_handlers[event_type].append(handler)
+
+    def add_message_handler(self, msgtypes, handler: Handler, cpu_bound=False):
+        if cpu_bound:
+            self._cpu_bound.add(handler)
+        for msgtype in msgtypes:
+            self._message_handlers[msgtype].append(handler)
+
+    def remove_event_handler(self, event_types, handler: Handler):
+        for event_type in event_types:
+            if handler in self._event_handlers.get(event_type, ()):
+                self._event_handlers[event_type].remove(handler)
+
+    def remove_message_handler(self, msgtypes, handler: Handler):
+        for msgtype in msgtypes:
+            if handler in self._message_handlers.get(msgtype, ()):
+                self._message_handlers[msgtype].remove(handler)
+
+    def on_event(self, *event_types: str, cpu_bound: bool = False):
+        """装饰器：注册回调事件处理函数（不传参数表示所有事件）"""
+
+        def decorator(handler: Handler) -> Handler:
+            self.add_event_handler(event_types or (ANY,), handler, cpu_bound)
+            return handler
+
+        return decorator
+
+    def on_message(self, *msgtypes: str, cpu_bound: bool = False):
+        """装饰器：注册机器人消息处理函数（不传参数表示所有消息类型）"""
+
+        def decorator(handler: Handler) -> Handler:
+            self.add_message_handler(msgtypes or (ANY,), handler, cpu_bound)
+            return handler
+
+        return decorator
+
+    def event_handlers(self, event_type: str) -> List[Handler]:
+        return self._event_handlers.get(event_type, []) + self._event_handlers.get(
+            ANY, []
+        )
+
+    def message_handlers(self, msgtype: str) -> List[Handler]:
+        return self._message_handlers.get(msgtype, []) + self._message_handlers.get(
+            ANY, []
+        )
+
+    def find_handler(self, name: str) -> Optional[Handler]:
+        """按 handler_name 查找已注册的处理函数"""
+        for handlers in (self._event_handlers, self._message_handlers):
+            for registered in handlers.values():
+                for handler in registered:
+                    if handler_name(handler) == name:
+                        return handler
+        return None
+
+    # ------------------- 分发 -------------------
+    def dispatch_event(self, event: Union[CallbackEvent, Dict[str, Any]]):
+        if not isinstance(event, CallbackEvent):
+            event = CallbackEvent.from_dict(event)
+        for handler in self.event_handlers(event.event_type):
+            self.submit(event.event_type, handler, event)
+
+    def dispatch_message(self, event: Any):
+        if not isinstance(event, RobotEvent):
+            event = RobotEvent.from_request(event)
+        for handler in self.message_handlers(event.msgtype):
+            self.submit(ROBOT_KEY, handler, event)
+
+    def submit(self, key: str, handler: Handler, payload: Any):
+        """提交单个处理函数：有调度器时按优先级排队，否则直接创建后台任务"""
+        if isinstance(payload, CompactEvent):
+            payload.retain()
+        if self.scheduler is not None:
+            if not self.scheduler.submit(key, handler, payload) and isinstance(
+                payload, CompactEvent
+            ):
+                payload.release()
+            return
+        task = asyncio.create_task(self.run_handler(handler, payload))
+        self._tasks[task] = (key, handler, payload)
+        task.add_done_callback(self._forget)
+
+    def _forget(self, task: asyncio.Task):
+        self._tasks.pop(task, None)
+
+    async def run_handler(self, handler: Handler, payload: Any):
+        """执行单个处理函数，异常只记录日志，不向上传播"""
+        self.dispatched += 1
+        try:
+            if self.process_pool is not None and handler in self._cpu_bound:
+                if isinstance(payload, CompactEvent):
+                    payload.release()
+                # 进程池直接传递紧凑事件的 JSON 字节串，由子进程还原
+                await self.process_pool.run(handler, payload)
+                return
+            if isinstance(payload, CompactEvent):
+                # 同一事件的多个处理函数共用一次还原（与直接传递模型时一致，共享同一实例）
+                payload = payload.shared()
+            if inspect.iscoroutinefunction(handler):
+                await handler(payload)
+            else:
+                await asyncio.to_thread(handler, payload)
+        except Exception as e:
+            self.failed += 1
+            name = getattr(handler, "__qualname__", repr(handler))
+            logger.error(f"事件处理函数 {name} 执行失败: {e}", exc_info=True)
+
+    # ------------------- 停机排空 -------------------
+    @property
+    def idle(self) -> bool:
+        scheduler_idle = self.scheduler is None or self.scheduler.idle
+        return scheduler_idle and not self._tasks
+
+    @property
+    def unfinished(self) -> int:
+        """排队中与执行中的处理函数数量"""
+        count = len(self._tasks)
+        if self.scheduler is not None:
+            count += self.scheduler.pending + self.scheduler.busy
+        return count
+
+    async def drain(self, timeout: float, poll_interval: float = 0.05) -> bool:
+        """等待排队中与执行中的处理函数全部完成；超时返回 False"""
+        deadline = time.monotonic() + timeout
+        while not self.idle:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(poll_interval)
+        return True
+
+    def take_unfinished(self) -> List[tuple]:
+        """取出未完成的 (key, handler, payload) 并取消对应的后台任务"""
+        items = []
+        if self.scheduler is not None:
+            items.extend(self.scheduler.take_unfinished())
+        for task, item in list(self._tasks.items()):
+            task.cancel()
+            items.append(item)
+        self._tasks.clear()
+        return items
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "event_handlers": {k: len(v) for k, v in self._event_handlers.items()},
+            "message_handlers": {k: len(v) for k, v in self._message_handlers.items()},
+            "running": len(self._tasks),
+            "dispatched": self.dispatched,
+            "failed": self.failed,
+        }
+
+
+dispatcher = EventDispatcher()
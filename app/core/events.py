@@ -0,0 +1,170 @@
+# core/events.py
+import json
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from app.schemas.ding_robot import robot_request_adapter
+
+
+class CompactEvent(ABC):
+    """
+    队列、缓冲区中保留的紧凑事件（机器人消息 / 回调事件的公共基类）
+
+    在入口处（HTTP 路由、Stream 接入）由校验后的模型或解密后的事件生成一次：
+    - 只保留下游服务与调度需要的字段（__slots__，没有实例 __dict__）
+    - 原始负载以紧凑 JSON 字节串保存，需要时才解析（raw）或还原为模型（materialize）
+    - 同一事件分发给多个处理函数时只还原一次（retain / shared），最后一个处理函数
+      取用后释放还原结果，排队期间仍只保留字节串
+    """
+
+    __slots__ = ("received_at", "_raw", "_shared", "_holders")
+
+    def __init__(self, raw: bytes, received_at: Optional[float] = None):
+        self._raw = raw
+        self.received_at = time.time() if received_at is None else received_at
+        self._shared: Any = None
+        self._holders = 0
+
+    @property
+    def raw_json(self) -> bytes:
+        """原始负载的 JSON 字节串（转发、落盘、跨进程传递时直接使用，无需重新序列化）"""
+        return self._raw
+
+    @property
+    def raw(self) -> Dict[str, Any]:
+        """解析原始负载（每次调用都返回新的 dict）"""
+        return json.loads(self._raw)
+
+    @abstractmethod
+    def materialize(self) -> Any:
+        """还原为处理函数接收的对象"""
+
+    def retain(self):
+        """登记一个将要执行的处理函数（分发时调用）"""
+        self._holders += 1
+
+    def shared(self) -> Any:
+        """
+        返回本次分发的处理函数共用的还原结果：第一个处理函数执行时还原，
+        之后的处理函数直接复用；登记的处理函数都已取用后释放引用
+        """
+        value = self._shared
+        if value is None:
+            value = self.materialize()
+        self._shared = value
+        self.release()
+        return value
+
+    def release(self):
+        """登记的处理函数不再需要还原结果（已取用，或在进程池中执行）"""
+        self._holders -= 1
+        if self._holders <= 0:
+            self._holders = 0
+            self._shared = None
+
+
+class RobotEvent(CompactEvent):
+    """紧凑的机器人消息；处理函数执行前才还原为 DingRobotRequest 模型"""
+
+    __slots__ = (
+        "msg_id",
+        "msgtype",
+        "corp_id",
+        "conversation_id",
+        "conversation_title",
+        "sender_id",
+        "sender_nick",
+        "created_at",
+        "text",
+    )
+
+    def __init__(
+        self,
+        raw: bytes,
+        msg_id: str,
+        msgtype: str,
+        corp_id: str,
+        conversation_id: str,
+        conversation_title: Optional[str],
+        sender_id: str,
+        sender_nick: str,
+        created_at: int,
+        text: str = "",
+        received_at: Optional[float] = None,
+    ):
+        super().__init__(raw, received_at)
+        self.msg_id = msg_id
+        self.msgtype = msgtype
+        self.corp_id = corp_id
+        self.conversation_id = conversation_id
+        self.conversation_title = conversation_title
+        self.sender_id = sender_id
+        self.sender_nick = sender_nick
+        self.created_at = created_at
+        self.text = text
+
+    @classmethod
+    def from_request(cls, body: Any, text: str = "") -> "RobotEvent":
+        """
+        由校验后的请求模型生成（模型上的 keywordMatches 等附加字段一并保留在原始负载中）
+        :param text: 消息中的全部文本（换行连接），供消息索引使用
+        """
+        return cls(
+            raw=body.model_dump_json(exclude_none=True).encode(),
+            msg_id=body.msgId,
+            msgtype=body.msgtype,
+            corp_id=body.chatbotCorpId,
+            conversation_id=body.conversationId,
+            conversation_title=body.conversationTitle,
+            sender_id=body.senderId,
+            sender_nick=body.senderNick,
+            created_at=body.createAt,
+            text=text,
+        )
+
+    def materialize(self) -> Any:
+        """重新校验为 DingRobotRequest 模型（每次调用都返回新的实例）"""
+        return robot_request_adapter.validate_json(self._raw)
+
+    def __repr__(self) -> str:
+        return f"RobotEvent(msgtype={self.msgtype!r}, msg_id={self.msg_id!r})"
+
+
+class CallbackEvent(CompactEvent):
+    """紧凑的回调事件；处理函数执行前才解析为 dict"""
+
+    __slots__ = ("event_type", "corp_id")
+
+    def __init__(
+        self,
+        raw: bytes,
+        event_type: Optional[str],
+        corp_id: Optional[str],
+        received_at: Optional[float] = None,
+    ):
+        super().__init__(raw, received_at)
+        self.event_type = event_type
+        self.corp_id = corp_id
+
+    @classmethod
+    def from_dict(
+        cls, event_data: Dict[str, Any], raw: Optional[str] = None
+    ) -> "CallbackEvent":
+        """
+        由解密后的事件生成
+        :param raw: 事件明文；HTTP 回调解密得到的字符串可直接复用，省去一次序列化
+        """
+        if raw is None:
+            raw = json.dumps(event_data, ensure_ascii=False, separators=(",", ":"))
+        return cls(
+            raw=raw.encode(),
+            event_type=event_data.get("EventType"),
+            corp_id=event_data.get("CorpId") or event_data.get("corpId"),
+        )
+
+    def materialize(self) -> Dict[str, Any]:
+        return self.raw
+
+    def __repr__(self) -> str:
+        return f"CallbackEvent(event_type={self.event_type!r})"
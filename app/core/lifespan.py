@@ -3,7 +3,7 @@ import logging
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
-from app.config import settings  # 导入全局唯一的 settings 实例
+from app.config import get_settings  # 首次调用时才读取环境变量与 .env
 from app.core.context import AppContext  # 导入 AppContext 类
 
 # 获取日志
@@ -16,7 +16,7 @@ async def lifespan(app: FastAPI):
     应用的生命周期管理器
     """
     logger.info("应用开始启动...")
-    context = AppContext(settings=settings)
+    context = AppContext(settings=get_settings(), app=app)
     # 统一调用 AppContext 的 startup
     await context.startup()
 
@@ -0,0 +1,20 @@
+# core/logging_config.py
+import logging
+import logging.handlers
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+def configure_logging(level: str = "INFO", log_file: str = "fastapi.log"):
+    """
+    配置根日志：控制台 + 按大小轮转的日志文件（log_file 为空时只输出到控制台）。
+    由应用启动时调用，而不是在导入模块时；根日志已被配置（如测试框架）时不做改动
+    """
+    handlers: list[logging.Handler] = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(
+            logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=1024 * 1024 * 10, backupCount=5, encoding="utf-8"
+            )
+        )
+    logging.basicConfig(level=level.upper(), format=LOG_FORMAT, handlers=handlers)
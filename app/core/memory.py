@@ -0,0 +1,135 @@
+# core/memory.py
+import gc
+import linecache
+import logging
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+# 统计实例数时默认关注的项目类型所在的包
+PROJECT_PACKAGE = "app."
+
+# 始终出现在计数结果中的类型（即使为 0），怀疑持有请求体的对象
+DEFAULT_OBJECT_TYPES = ("TextRequest", "DingCallbackCrypto3", "Trace")
+
+# 快照中排除 tracemalloc 自身与导入机制的分配
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class MemoryInspector:
+    """
+    内存排查：tracemalloc 命名快照与差异对比，以及项目类型的实例计数
+
+    - 默认不开启 tracemalloc，此时没有任何额外开销；需要排查时通过管理接口开启，
+      排查结束后关闭（关闭会清空已采集的分配记录与快照）
+    - 快照按名称保存，超过 max_snapshots 时丢弃最早的一个
+    """
+
+    def __init__(self, max_snapshots: int = 8):
+        self.max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[str, tracemalloc.Snapshot]" = OrderedDict()
+        self._taken_at: Dict[str, float] = {}
+
+    # ------------------- tracemalloc 开关 -------------------
+    def start(self, frames: int = 1) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.info(f"tracemalloc 已开启（保留 {frames} 层调用栈）")
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc 已关闭")
+        self._snapshots.clear()
+        self._taken_at.clear()
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else None,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory() if tracing else 0,
+            "snapshots": {
+                name: {"taken_at": self._taken_at[name]} for name in self._snapshots
+            },
+        }
+
+    # ------------------- 快照 -------------------
+    def take_snapshot(self, name: str) -> Dict[str, Any]:
+        """保存命名快照（同名覆盖）；tracemalloc 未开启时抛出 RuntimeError"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc 未开启")
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        self._snapshots.pop(name, None)
+        self._snapshots[name] = snapshot
+        self._taken_at[name] = time.time()
+        while len(self._snapshots) > self.max_snapshots:
+            dropped, _ = self._snapshots.popitem(last=False)
+            self._taken_at.pop(dropped, None)
+        return {
+            "name": name,
+            "traces": len(snapshot.traces),
+            "size": sum(stat.size for stat in snapshot.statistics("filename")),
+        }
+
+    def diff(
+        self, base: str, target: str, group_by: str = "lineno", limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        对比两个快照，按增长量从大到小返回前 limit 项
+        :param group_by: lineno（文件 + 行号）、filename 或 traceback
+        """
+        missing = [n for n in (base, target) if n not in self._snapshots]
+        if missing:
+            raise KeyError(f"快照不存在: {', '.join(missing)}")
+        stats = self._snapshots[target].compare_to(self._snapshots[base], group_by)
+        return [
+            {
+                "location": [
+                    f"{frame.filename}:{frame.lineno}" for frame in stat.traceback
+                ],
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+            for stat in stats[:limit]
+        ]
+
+    # ------------------- 对象计数 -------------------
+    @staticmethod
+    def object_counts(
+        type_names: Iterable[str] = DEFAULT_OBJECT_TYPES, limit: int = 50
+    ) -> Dict[str, int]:
+        """
+        统计存活对象数：项目包（app.*）中定义的类型，以及 type_names 中额外指定的类型名。
+        遍历 gc 跟踪的全部对象，耗时与堆大小成正比，只在排查时调用
+        """
+        wanted = set(type_names)
+        counts: Counter = Counter()
+        for obj in gc.get_objects():
+            cls = type(obj)
+            name = cls.__name__
+            if name in wanted or cls.__module__.startswith(PROJECT_PACKAGE):
+                counts[name] += 1
+        result = dict(counts.most_common(limit))
+        for name in wanted:
+            result.setdefault(name, counts.get(name, 0))
+        return result
+
+
+memory_inspector = MemoryInspector()
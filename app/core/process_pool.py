@@ -0,0 +1,145 @@
+# core/process_pool.py
+import asyncio
+import inspect
+import json
+import logging
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.core.events import CompactEvent, RobotEvent
+
+logger = logging.getLogger(__name__)
+
+# 跨进程传输的负载类型
+_EVENT = "e"
+_MESSAGE = "m"
+
+
+def encode_payload(payload: Any) -> Tuple[str, bytes]:
+    """把回调事件 dict / 机器人消息模型序列化为紧凑的 JSON 字节串（紧凑事件直接复用）"""
+    if isinstance(payload, CompactEvent):
+        return (
+            _MESSAGE if isinstance(payload, RobotEvent) else _EVENT
+        ), payload.raw_json
+    if isinstance(payload, BaseModel):
+        return _MESSAGE, payload.model_dump_json(exclude_none=True).encode()
+    return (
+        _EVENT,
+        json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode(),
+    )
+
+
+def decode_payload(kind: str, data: bytes) -> Any:
+    if kind == _MESSAGE:
+        # 仅在子进程中导入模型，主进程的导入开销不受影响
+        from app.schemas.ding_robot import robot_request_adapter
+
+        return robot_request_adapter.validate_json(data)
+    return json.loads(data)
+
+
+def shard_key(payload: Any) -> str:
+    """回调事件按企业 CorpId、机器人消息按会话 conversationId 分片"""
+    if isinstance(payload, RobotEvent):
+        return payload.conversation_id or ""
+    if isinstance(payload, CompactEvent):
+        return str(payload.corp_id or "")
+    if isinstance(payload, BaseModel):
+        return getattr(payload, "conversationId", "") or ""
+    return str(payload.get("CorpId") or payload.get("corpId") or "")
+
+
+def _run_in_worker(handler: Callable, kind: str, data: bytes):
+    """子进程入口：还原负载并执行处理函数（async 函数在子进程的事件循环中执行）"""
+    payload = decode_payload(kind, data)
+    if inspect.iscoroutinefunction(handler):
+        asyncio.run(handler(payload))
+    else:
+        handler(payload)
+
+
+class _Shard:
+    __slots__ = ("index", "executor", "inflight", "completed", "restarts")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.inflight = 0
+        self.completed = 0
+        self.restarts = 0
+
+
+class ShardedProcessPool:
+    """
+    CPU 密集型处理函数的分片进程池
+
+    - 每个分片是一个单进程的 ProcessPoolExecutor：同一分片键（CorpId / conversationId）
+      总是落到同一进程并按提交顺序串行执行，从而保持同键事件的顺序
+    - 处理函数按引用（模块 + 名称）传给子进程，需定义在模块顶层；
+      负载以紧凑 JSON 字节传输，而不是 pickle 整个对象
+    - 子进程异常退出（BrokenProcessPool）时重建该分片，当前任务记为失败
+    - 子进程使用 spawn 方式启动，不继承主进程的事件循环与后台线程
+    """
+
+    def __init__(self, shards: int):
+        self._mp_context = multiprocessing.get_context("spawn")
+        self._shards: List[_Shard] = [_Shard(i) for i in range(shards)]
+        for shard in self._shards:
+            self._start_shard(shard)
+
+    def _start_shard(self, shard: _Shard):
+        shard.executor = ProcessPoolExecutor(max_workers=1, mp_context=self._mp_context)
+
+    def _shard_for(self, key: str) -> _Shard:
+        # crc32 在进程间稳定（内置 hash 对字符串加了随机盐）
+        return self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+
+    async def run(self, handler: Callable, payload: Any):
+        """提交到分片进程并等待完成；提交动作在首次 await 之前同步完成，保证同键顺序"""
+        shard = self._shard_for(shard_key(payload))
+        kind, data = encode_payload(payload)
+        executor = shard.executor
+        shard.inflight += 1
+        try:
+            future = executor.submit(_run_in_worker, handler, kind, data)
+            await asyncio.wrap_future(future)
+            shard.completed += 1
+        except BrokenProcessPool:
+            # 同一进程池上的其他任务也会失败，只由第一个发现的任务重建
+            if shard.executor is executor:
+                self._restart(shard)
+            raise
+        finally:
+            shard.inflight -= 1
+
+    def _restart(self, shard: _Shard):
+        """子进程崩溃后重建分片（同一分片上排队的任务也会随旧进程池失败）"""
+        old = shard.executor
+        logger.error(f"处理进程分片 {shard.index} 异常退出，正在重启")
+        self._start_shard(shard)
+        shard.restarts += 1
+        old.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """等待所有分片完成已提交的任务后退出（应在线程中调用）"""
+        for shard in self._shards:
+            shard.executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "shards": len(self._shards),
+            "inflight": sum(s.inflight for s in self._shards),
+            "per_shard": [
+                {
+                    "inflight": s.inflight,
+                    "completed": s.completed,
+                    "restarts": s.restarts,
+                }
+                for s in self._shards
+            ],
+        }
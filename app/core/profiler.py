@@ -0,0 +1,125 @@
+# core/profiler.py
+import asyncio
+import cProfile
+import logging
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilerBusyError(RuntimeError):
+    """已有一次剖析在进行中"""
+
+
+def _frame_label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame, thread_name: str) -> str:
+    """把一个线程的调用栈折叠为 flamegraph 格式：线程名;根函数;...;叶函数"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+class Profiler:
+    """
+    在线剖析（同一时间只允许一次，空闲时没有任何钩子或线程，零开销）
+
+    - sample：后台线程按固定间隔读取 sys._current_frames() 做统计采样，
+      输出 flamegraph.pl / speedscope 可直接读取的折叠栈文本
+    - cprofile：在事件循环线程上开启 cProfile 一段时间，期间经过该线程的
+      回调、机器人消息等请求都会被完整记录，输出 pstats 可加载的数据
+    """
+
+    def __init__(self):
+        self._active: Optional[str] = None
+        self.runs = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    @property
+    def active(self) -> Optional[str]:
+        return self._active
+
+    def _begin(self, mode: str):
+        # 事件循环单线程内检查与赋值之间没有 await，无需加锁
+        if self._active is not None:
+            raise ProfilerBusyError(f"已有剖析在进行中: {self._active}")
+        self._active = mode
+        self.runs += 1
+
+    def _finish(self, mode: str, seconds: float, **extra):
+        self._active = None
+        self.last_run = {"mode": mode, "seconds": seconds, "at": time.time(), **extra}
+        logger.info(f"剖析结束: {self.last_run}")
+
+    # ------------------- 统计采样 -------------------
+    async def sample(
+        self, seconds: float, interval: float = 0.01, all_threads: bool = False
+    ) -> str:
+        """
+        采样 seconds 秒，返回折叠栈文本（每行 "栈 次数"）
+        :param all_threads: False 时只采样事件循环线程（调用方所在线程）
+        """
+        self._begin("sample")
+        counts: Counter = Counter()
+        stop = threading.Event()
+        target = None if all_threads else threading.get_ident()
+        sampler = threading.Thread(
+            target=self._sample_loop,
+            args=(counts, stop, interval, target),
+            name="profiler-sampler",
+            daemon=True,
+        )
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+            self._finish("sample", seconds, samples=sum(counts.values()))
+        return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+    @staticmethod
+    def _sample_loop(
+        counts: Counter, stop: threading.Event, interval: float, target: Optional[int]
+    ):
+        own = threading.get_ident()
+        while not stop.wait(interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (target is not None and ident != target):
+                    continue
+                counts[collapse_stack(frame, names.get(ident, str(ident)))] += 1
+
+    # ------------------- cProfile -------------------
+    async def cprofile(self, seconds: float) -> bytes:
+        """在事件循环线程上开启 cProfile，返回 marshal 格式的统计（与 pstats.dump_stats 一致）"""
+        self._begin("cprofile")
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profile.disable()
+        finally:
+            self._finish("cprofile", seconds)
+        profile.create_stats()
+        return marshal.dumps(profile.stats)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"active": self._active, "runs": self.runs, "last_run": self.last_run}
+
+
+profiler = Profiler()
@@ -0,0 +1,379 @@
+# core/ratelimit.py
+import asyncio
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl：共享令牌桶退化为进程内令牌桶
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketLimiter:
+    """
+    按键的令牌桶限流（单进程内存）
+
+    - 每个键一个桶：容量 burst，每秒补充 rate 个令牌，取用时惰性补充
+    - 桶按最近访问排序，超过 idle_seconds 未访问的桶被回收，总数不超过 max_buckets
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        idle_seconds: float = 300.0,
+        max_buckets: int = 100000,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.idle_seconds = idle_seconds
+        self.max_buckets = max_buckets
+        # key -> [tokens, last_refill]
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self.allowed = 0
+        self.throttled = 0
+        self.expired = 0
+
+    def _bucket(self, key: str, now: float) -> list:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [self.burst, now]
+            self._buckets[key] = bucket
+            self._expire(now)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return bucket
+
+    def _expire(self, now: float):
+        """从最久未访问的一端回收空闲桶（均摊 O(1)）"""
+        buckets = self._buckets
+        while buckets:
+            key, bucket = next(iter(buckets.items()))
+            if len(buckets) <= self.max_buckets and now - bucket[1] < self.idle_seconds:
+                break
+            del buckets[key]
+            self.expired += 1
+
+    def peek(self, key: str, now: float) -> bool:
+        """是否还有令牌（会补充令牌，但不消耗）"""
+        return self._bucket(key, now)[0] >= 1
+
+    def take(self, key: str, now: float):
+        self._bucket(key, now)[0] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "buckets": len(self._buckets),
+            "allowed": self.allowed,
+            "throttled": self.throttled,
+            "expired": self.expired,
+        }
+
+
+class MultiKeyRateLimiter:
+    """
+    多维度组合限流：消息需同时通过每个维度（如 senderId / conversationId / chatbotCorpId）
+    的令牌桶才放行；被某一维度拒绝时，其他维度的令牌不会被消耗
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Sequence[float]],
+        idle_seconds: float = 300.0,
+        max_buckets: int = 100000,
+    ):
+        self.limiters = {
+            field: TokenBucketLimiter(rate, burst, idle_seconds, max_buckets)
+            for field, (rate, burst) in limits.items()
+        }
+
+    def check(self, values: Dict[str, Any]) -> Optional[str]:
+        """放行返回 None，否则返回触发限流的维度名；缺失的维度不参与限流"""
+        now = time.monotonic()
+        keys = []
+        for field, limiter in self.limiters.items():
+            value = values.get(field)
+            if value is None:
+                continue
+            key = str(value)
+            if not limiter.peek(key, now):
+                limiter.throttled += 1
+                return field
+            keys.append((limiter, key))
+        for limiter, key in keys:
+            limiter.take(key, now)
+            limiter.allowed += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {field: limiter.stats() for field, limiter in self.limiters.items()}
+
+
+class AsyncTokenBucket:
+    """
+    出站调用的全局 QPS 预算：acquire() 在令牌不足时异步等待，而不是拒绝。
+    单事件循环内检查与扣减之间没有 await，无需加锁
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self.acquired = 0
+        self.waited_ms = 0.0
+
+    async def acquire(self):
+        start = time.monotonic()
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.acquired += 1
+                self.waited_ms += (now - start) * 1000
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "acquired": self.acquired,
+            "avg_wait_ms": (
+                round(self.waited_ms / self.acquired, 2) if self.acquired else None
+            ),
+        }
+
+
+# 共享令牌桶文件布局：头部 (magic, 版本, 槽位数) + 槽位 (键哈希, 令牌数, 上次补充时间)
+_SHARED_MAGIC = b"DTRL"
+_SHARED_VERSION = 1
+_SHARED_HEADER = struct.Struct("<4sII")
+_SHARED_HEADER_SIZE = 16
+_SHARED_SLOT = struct.Struct("<Qdd")
+# 头部中的槽位数超过此值视为文件损坏
+_SHARED_MAX_SLOTS = 1 << 20
+
+
+class SharedTokenBucket:
+    """
+    同一节点上所有 worker 进程共享的出站 QPS 预算（文件映射内存 + fcntl 字节区间锁）
+
+    - 每个 "接口|Client_ID" 一个令牌桶，按键哈希开放寻址放入固定数量的槽位
+    - 预约式扣减：令牌可以为负，调用方按所欠令牌计算等待时间，一次加锁只锁一个槽位
+      （24 字节），临界区只有一次读写，没有跨进程的条件等待
+    - fcntl 锁由内核随进程退出自动释放，worker 崩溃不会留下死锁；槽位数据异常
+      （写到一半被强杀、重启后时钟回退）时重置为满桶
+    - 时间使用 time.monotonic()（Linux 上为全系统共享的 CLOCK_MONOTONIC）
+    - 文件不可用（含头部有效但长度被截断且无法补齐）、平台不支持 fcntl 或槽位用尽时，
+      退回进程内令牌桶并计入统计
+    """
+
+    def __init__(
+        self,
+        path: str,
+        default_rate: float = 20.0,
+        rates: Optional[Dict[str, float]] = None,
+        slots: int = 256,
+    ):
+        """
+        :param default_rate: 每个接口的默认 QPS（桶容量同为 1 秒的量）
+        :param rates: 按接口覆盖 QPS，0 表示该接口不限流
+        """
+        self.path = path
+        self.default_rate = default_rate
+        self.rates = dict(rates or {})
+        self.slots = slots
+        self._mm: Optional[mmap.mmap] = None
+        self._fd: Optional[int] = None
+        # fcntl 锁属于进程，同一进程的多个线程之间还需要一把线程锁
+        self._thread_lock = threading.Lock()
+        # 键 -> (哈希, 槽位下标)；键名只在本进程可见，用于统计
+        self._keys: Dict[str, tuple] = {}
+        # 退化时的进程内令牌桶：哈希 -> [令牌数, 上次补充时间]
+        self._local: Dict[int, list] = {}
+        self.fallback_reason: Optional[str] = None
+        self.acquired = 0
+        self.waited = 0
+        self.waited_ms = 0.0
+        self.recovered = 0
+        self.overflow = 0
+        try:
+            self._open()
+        except (OSError, ValueError) as e:
+            self.fallback_reason = str(e)
+            logger.warning(f"共享令牌桶不可用，退回进程内限流: {e}")
+
+    # ------------------- 共享文件 -------------------
+    def _open(self):
+        if fcntl is None:
+            raise OSError("当前平台不支持 fcntl")
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # 只有头部为空或无效时才初始化；已有文件沿用其槽位数，避免与其他 worker 不一致
+            fcntl.lockf(fd, fcntl.LOCK_EX, _SHARED_HEADER_SIZE, 0)
+            try:
+                header = os.pread(fd, _SHARED_HEADER.size, 0)
+                magic, version, slots = (
+                    _SHARED_HEADER.unpack(header)
+                    if len(header) == _SHARED_HEADER.size
+                    else (b"", 0, 0)
+                )
+                if (
+                    magic != _SHARED_MAGIC
+                    or version != _SHARED_VERSION
+                    or not 0 < slots <= _SHARED_MAX_SLOTS
+                ):
+                    slots = self.slots
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, _SHARED_HEADER_SIZE + slots * _SHARED_SLOT.size)
+                    os.pwrite(
+                        fd,
+                        _SHARED_HEADER.pack(_SHARED_MAGIC, _SHARED_VERSION, slots),
+                        0,
+                    )
+                elif os.fstat(fd).st_size < _SHARED_HEADER_SIZE + (
+                    slots * _SHARED_SLOT.size
+                ):
+                    # 头部有效但文件被截断：补齐长度（补出的槽位为全零即空槽位），
+                    # 否则 mmap 会因文件长度不足而失败
+                    logger.warning(f"共享令牌桶文件长度不足，已补齐: {self.path}")
+                    os.ftruncate(fd, _SHARED_HEADER_SIZE + slots * _SHARED_SLOT.size)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, _SHARED_HEADER_SIZE, 0)
+            self._mm = mmap.mmap(fd, _SHARED_HEADER_SIZE + slots * _SHARED_SLOT.size)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self.slots = slots
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    # ------------------- 取令牌 -------------------
+    def rate_for(self, endpoint: str) -> float:
+        return self.rates.get(endpoint, self.default_rate)
+
+    async def acquire(self, endpoint: str, client_id: str = ""):
+        """取一个令牌，预算不足时异步等待到轮到自己"""
+        rate = self.rate_for(endpoint)
+        if rate <= 0:
+            return
+        wait = self.reserve(f"{endpoint}|{client_id}", rate, max(1.0, rate))
+        self.acquired += 1
+        if wait > 0:
+            self.waited += 1
+            self.waited_ms += wait * 1000
+            await asyncio.sleep(wait)
+
+    def reserve(self, key: str, rate: float, burst: float) -> float:
+        """扣减一个令牌（允许为负），返回需要等待的秒数"""
+        entry = self._keys.get(key)
+        if entry is None:
+            digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+            # 0 表示空槽位
+            entry = (int.from_bytes(digest, "little") or 1, None)
+            self._keys[key] = entry
+        key_hash, index = entry
+        now = time.monotonic()
+        with self._thread_lock:
+            if self._mm is None:
+                return self._reserve_local(key_hash, now, rate, burst)
+            if index is not None:
+                wait = self._reserve_slot(index, key_hash, now, rate, burst)
+                if wait is not None:
+                    return wait
+            # 线性探测：找到本键所在的槽位或第一个空槽位
+            start = key_hash % self.slots
+            for i in range(self.slots):
+                index = (start + i) % self.slots
+                wait = self._reserve_slot(index, key_hash, now, rate, burst)
+                if wait is not None:
+                    self._keys[key] = (key_hash, index)
+                    return wait
+            self.overflow += 1
+            return self._reserve_local(key_hash, now, rate, burst)
+
+    def _reserve_slot(
+        self, index: int, key_hash: int, now: float, rate: float, burst: float
+    ) -> Optional[float]:
+        """在指定槽位上扣减；槽位被其他键占用时返回 None"""
+        offset = _SHARED_HEADER_SIZE + index * _SHARED_SLOT.size
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, _SHARED_SLOT.size, offset)
+        try:
+            slot_hash, tokens, last = _SHARED_SLOT.unpack_from(self._mm, offset)
+            if slot_hash not in (0, key_hash):
+                return None
+            if slot_hash == 0:
+                tokens = burst
+            elif not (
+                math.isfinite(tokens) and math.isfinite(last) and tokens <= burst
+            ) or not (0 <= last <= now + 1):
+                self.recovered += 1
+                tokens = burst
+            else:
+                tokens = min(burst, tokens + (now - last) * rate)
+            tokens -= 1
+            _SHARED_SLOT.pack_into(self._mm, offset, key_hash, tokens, now)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, _SHARED_SLOT.size, offset)
+        return 0.0 if tokens >= 0 else -tokens / rate
+
+    def _reserve_local(self, key_hash: int, now: float, rate: float, burst: float):
+        bucket = self._local.get(key_hash)
+        if bucket is None:
+            bucket = self._local[key_hash] = [burst, now]
+        bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate) - 1
+        bucket[1] = now
+        return 0.0 if bucket[0] >= 0 else -bucket[0] / rate
+
+    def stats(self) -> Dict[str, Any]:
+        used = 0
+        if self._mm is not None:
+            used = sum(
+                1
+                for i in range(self.slots)
+                if _SHARED_SLOT.unpack_from(
+                    self._mm, _SHARED_HEADER_SIZE + i * _SHARED_SLOT.size
+                )[0]
+            )
+        return {
+            "path": self.path,
+            "shared": self._mm is not None,
+            "fallback_reason": self.fallback_reason,
+            "default_rate": self.default_rate,
+            "rates": self.rates,
+            "slots": self.slots,
+            "slots_used": used,
+            "keys": sorted(self._keys),
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "avg_wait_ms": (
+                round(self.waited_ms / self.waited, 2) if self.waited else None
+            ),
+            "recovered": self.recovered,
+            "overflow": self.overflow,
+        }
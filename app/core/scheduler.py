@@ -0,0 +1,227 @@
+# core/scheduler.py
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 步长调度的基数：stride = STRIDE_BASE / weight
+STRIDE_BASE = 1 << 20
+
+# 机器人消息在优先级映射中使用的键
+ROBOT_KEY = "robot"
+
+DEFAULT_WEIGHTS = {"critical": 16, "high": 8, "normal": 2, "low": 1}
+
+DEFAULT_EVENT_CLASSES = {
+    # 回调地址验证：钉钉后台点击“验证有效性”时用户在等待
+    "check_url": "critical",
+    "check_create_suite_url": "critical",
+    "check_update_suite_url": "critical",
+    # 审批：用户在等待处理结果
+    "bpms_instance_change": "high",
+    "bpms_task_change": "high",
+    # 机器人消息：用户在会话中等待回复
+    ROBOT_KEY: "high",
+    # 批量同步类事件：允许排队
+    "attendance_check_record": "low",
+    "attendance_schedule_change": "low",
+    "user_add_org": "low",
+    "user_modify_org": "low",
+    "user_leave_org": "low",
+    "org_dept_create": "low",
+    "org_dept_modify": "low",
+    "org_dept_remove": "low",
+}
+
+
+class _PriorityClass:
+    __slots__ = (
+        "name",
+        "stride",
+        "pass_value",
+        "queue",
+        "max_size",
+        "enqueued",
+        "dequeued",
+        "dropped",
+        "waits",
+        "wait_max",
+    )
+
+    def __init__(self, name: str, weight: int, max_size: int):
+        self.name = name
+        self.stride = STRIDE_BASE // max(1, weight)
+        self.pass_value = 0
+        self.queue: deque = deque()
+        self.max_size = max_size
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped = 0
+        # 最近的排队耗时（毫秒），用于计算分位数
+        self.waits: deque = deque(maxlen=1000)
+        self.wait_max = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+
+        def pct(p: float) -> Optional[float]:
+            if not waits:
+                return None
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))], 2)
+
+        return {
+            "weight": STRIDE_BASE // self.stride,
+            "queued": len(self.queue),
+            "enqueued": self.enqueued,
+            "dequeued": self.dequeued,
+            "dropped": self.dropped,
+            "wait_p50_ms": pct(0.5),
+            "wait_p99_ms": pct(0.99),
+            "wait_max_ms": round(self.wait_max, 2),
+        }
+
+
+class PriorityScheduler:
+    """
+    事件处理优先级调度器（加权公平队列）
+
+    - 按 EventType 映射到优先级类别（机器人消息使用键 "robot"），映射可配置
+    - 各类别独立排队，使用步长调度（stride scheduling）实现加权公平：
+      每次取 pass 值最小的非空类别，取出后 pass += 1/权重，
+      因此高优先级类别获得更多处理机会，低优先级类别也始终能推进
+    - 固定数量的 worker 协程执行处理函数，突发流量只会排队而不会无限并发
+    """
+
+    def __init__(
+        self,
+        run: Callable[[Any, Any], Awaitable[None]],
+        workers: int = 16,
+        weights: Optional[Dict[str, int]] = None,
+        event_classes: Optional[Dict[str, str]] = None,
+        default_class: str = "normal",
+        max_queue_size: int = 100000,
+    ):
+        self.run = run
+        self.workers = workers
+        self.event_classes = dict(DEFAULT_EVENT_CLASSES)
+        self.event_classes.update(event_classes or {})
+        self.default_class = default_class
+        weights = dict(weights or DEFAULT_WEIGHTS)
+        weights.setdefault(default_class, 1)
+        self._classes = {
+            name: _PriorityClass(name, weight, max_queue_size)
+            for name, weight in weights.items()
+        }
+        # 信号量计数始终等于排队中的任务数，worker 获取后必有任务可取
+        self._available = asyncio.Semaphore(0)
+        self._size = 0
+        self._tasks: List[asyncio.Task] = []
+        # worker 编号 -> 正在执行的 (key, handler, payload)，停机时用于落盘
+        self._running: Dict[int, tuple] = {}
+
+    # ------------------- 生命周期 -------------------
+    def start(self):
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"scheduler-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(
+            f"优先级调度器已启动: {self.workers} 个 worker，"
+            f"类别权重 { {k: v.stats()['weight'] for k, v in self._classes.items()} }"
+        )
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def pending(self) -> int:
+        return self._size
+
+    @property
+    def busy(self) -> int:
+        return len(self._running)
+
+    @property
+    def idle(self) -> bool:
+        return self._size == 0 and not self._running
+
+    def take_unfinished(self) -> List[tuple]:
+        """
+        取出所有未完成的任务 (key, handler, payload)：正在执行的在前，排队中的按类别在后。
+        调用后应随即 stop()，被中断的处理函数会在重放时重新执行一次
+        """
+        items = list(self._running.values())
+        for pclass in self._classes.values():
+            items.extend((key, h, p) for _, key, h, p in pclass.queue)
+            pclass.queue.clear()
+        self._size = 0
+        return items
+
+    # ------------------- 入队 -------------------
+    def classify(self, key: Optional[str]) -> _PriorityClass:
+        name = self.event_classes.get(key, self.default_class)
+        return self._classes.get(name) or self._classes[self.default_class]
+
+    def submit(self, key: Optional[str], handler: Any, payload: Any) -> bool:
+        """非阻塞入队；队列已满时返回 False"""
+        pclass = self.classify(key)
+        if len(pclass.queue) >= pclass.max_size:
+            pclass.dropped += 1
+            logger.warning(f"优先级队列 {pclass.name} 已满，丢弃 {key} 事件")
+            return False
+        if not pclass.queue:
+            # 从空闲变为活跃时不允许“攒”额度，避免长期空闲的类别突发霸占 worker
+            pclass.pass_value = max(pclass.pass_value, self._min_active_pass())
+        pclass.queue.append((time.monotonic(), key, handler, payload))
+        pclass.enqueued += 1
+        self._size += 1
+        self._available.release()
+        return True
+
+    def _min_active_pass(self) -> int:
+        active = [c.pass_value for c in self._classes.values() if c.queue]
+        return min(active) if active else 0
+
+    # ------------------- 出队与执行 -------------------
+    def _next(self) -> tuple:
+        chosen = None
+        for pclass in self._classes.values():
+            if pclass.queue and (
+                chosen is None or pclass.pass_value < chosen.pass_value
+            ):
+                chosen = pclass
+        enqueued_at, key, handler, payload = chosen.queue.popleft()
+        chosen.pass_value += chosen.stride
+        chosen.dequeued += 1
+        wait = (time.monotonic() - enqueued_at) * 1000
+        chosen.waits.append(wait)
+        chosen.wait_max = max(chosen.wait_max, wait)
+        self._size -= 1
+        return key, handler, payload
+
+    async def _worker(self, index: int):
+        while True:
+            await self._available.acquire()
+            if not self._size:
+                # 队列已被 take_unfinished 取走
+                continue
+            item = self._next()
+            self._running[index] = item
+            try:
+                await self.run(item[1], item[2])
+            finally:
+                self._running.pop(index, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "busy": self.busy,
+            "pending": self._size,
+            "classes": {name: c.stats() for name, c in self._classes.items()},
+        }
@@ -0,0 +1,75 @@
+# core/spool.py
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.core.dispatcher import handler_name
+from app.core.events import CompactEvent
+
+logger = logging.getLogger(__name__)
+
+
+class PendingWorkSpool:
+    """
+    停机时未处理完的工作落盘，下次启动时读取并重放
+
+    文件内容：
+        {"drain": {...排空报告...}, "items": [{"key", "handler", "payload"}, ...]}
+    - 回调事件 payload 为原始 dict；机器人消息 payload 为模型的 JSON 形式，key 为 "robot"
+    - 先写临时文件再替换，避免进程被强杀时留下半个文件
+    - 只在有未完成工作时写入；重放提交完成后由调用方 remove() 删除
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def save(self, report: Dict[str, Any], items: List[tuple]) -> int:
+        records = []
+        for key, handler, payload in items:
+            if isinstance(payload, CompactEvent):
+                payload = payload.raw
+            elif isinstance(payload, BaseModel):
+                payload = payload.model_dump(mode="json")
+            records.append(
+                {"key": key, "handler": handler_name(handler), "payload": payload}
+            )
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"drain": report, "items": records}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        return len(records)
+
+    def load(self) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        读取落盘文件（不删除，重放提交完成后再 remove）；文件不存在或损坏时返回 (None, [])。
+        损坏的文件改名为 <path>.<时间戳>.corrupt 留待排查，避免每次启动都读取失败
+        """
+        if not self.path or not os.path.exists(self.path):
+            return None, []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("顶层不是 JSON 对象")
+        except (OSError, ValueError) as e:
+            logger.error(f"未完成工作文件 {self.path} 读取失败: {e}")
+            corrupt_path = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}.corrupt"
+            try:
+                os.replace(self.path, corrupt_path)
+            except OSError as e:
+                logger.error(f"未完成工作文件 {self.path} 移动失败: {e}")
+            return None, []
+        return data.get("drain"), data.get("items") or []
+
+    def remove(self):
+        """重放完成后删除落盘文件"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"未完成工作文件 {self.path} 删除失败: {e}")
@@ -0,0 +1,216 @@
+# core/tracing.py
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 当前请求的请求ID（由日志中间件写入，下游任意位置均可读取）
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+# 当前请求的追踪对象（未被采样时为 None，span 走空操作快路径）
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar(
+    "current_trace", default=None
+)
+
+
+def new_request_id() -> str:
+    """生成全局唯一的请求ID（替代 id(request) 截断，避免碰撞）"""
+    return uuid.uuid4().hex[:16]
+
+
+def get_request_id() -> str:
+    """获取当前上下文中的请求ID"""
+    return request_id_var.get()
+
+
+class Trace:
+    """
+    单个请求的追踪记录
+    spans 中每一项为 (阶段名, 相对请求开始的偏移ms, 耗时ms, 错误信息)
+    """
+
+    __slots__ = ("trace_id", "name", "start", "wall_start", "spans", "attrs", "error")
+
+    def __init__(self, trace_id: str, name: str):
+        self.trace_id = trace_id
+        self.name = name
+        self.start = time.perf_counter()
+        self.wall_start = time.time()
+        self.spans: List[tuple] = []
+        self.attrs: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+
+    def to_dict(self, duration_ms: float) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "start": self.wall_start,
+            "duration_ms": round(duration_ms, 3),
+            "error": self.error,
+            "attrs": self.attrs,
+            "spans": [
+                {
+                    "name": name,
+                    "offset_ms": round(offset, 3),
+                    "duration_ms": round(cost, 3),
+                    "error": err,
+                }
+                for name, offset, cost, err in self.spans
+            ],
+        }
+
+
+class Tracer:
+    """
+    轻量级本地请求追踪器
+
+    - 头部采样：按 sample_rate 决定是否记录（未采样请求的 span 为空操作，接近零开销）
+    - 尾部采样：请求结束时仅保留慢请求或异常请求，放入内存环形缓冲区
+    - 导出：保留的追踪可通过管理接口查询，或由后台任务追加写入本地 JSONL 文件
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.sample_rate = 1.0
+        self.slow_ms = 500.0
+        self.export_file = ""
+        self._buffer: deque = deque(maxlen=200)
+        self._pending_export: List[Dict[str, Any]] = []
+        self.sampled = 0
+        self.kept = 0
+
+    def configure(
+        self,
+        enabled: bool,
+        sample_rate: float,
+        slow_ms: float,
+        buffer_size: int,
+        export_file: str = "",
+    ):
+        """根据配置重新初始化追踪器（由 AppContext 启动时调用）"""
+        self.enabled = enabled
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.slow_ms = slow_ms
+        self.export_file = export_file
+        self._buffer = deque(self._buffer, maxlen=max(1, buffer_size))
+
+    # ------------------- 追踪生命周期 -------------------
+    def start_trace(self, name: str, trace_id: str) -> Optional[Trace]:
+        """开始一次追踪；未命中头部采样时返回 None"""
+        if not self.enabled:
+            return None
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:  # nosec B311
+            return None
+        trace = Trace(trace_id, name)
+        _current_trace.set(trace)
+        self.sampled += 1
+        return trace
+
+    def finish_trace(self, trace: Optional[Trace]):
+        """结束追踪，按尾部采样规则决定是否保留"""
+        if trace is None:
+            return
+        _current_trace.set(None)
+        duration_ms = (time.perf_counter() - trace.start) * 1000
+        if duration_ms < self.slow_ms and trace.error is None:
+            return
+        record = trace.to_dict(duration_ms)
+        self._buffer.append(record)
+        self.kept += 1
+        if self.export_file:
+            self._pending_export.append(record)
+
+    # ------------------- 查询与导出 -------------------
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """返回最近保留的慢请求追踪（最新在前）"""
+        items = list(self._buffer)[-limit:]
+        items.reverse()
+        return items
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+            "sampled": self.sampled,
+            "kept": self.kept,
+            "buffered": len(self._buffer),
+        }
+
+    def flush_export(self) -> int:
+        """将待导出的追踪追加写入本地文件，返回写入条数"""
+        if not self._pending_export or not self.export_file:
+            return 0
+        pending, self._pending_export = self._pending_export, []
+        with open(self.export_file, "a", encoding="utf-8") as f:
+            for record in pending:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return len(pending)
+
+    async def run_exporter(self, interval: float = 1.0):
+        """后台导出任务：周期性地在线程中落盘，避免阻塞事件循环"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.flush_export)
+            except Exception as e:
+                logger.error(f"追踪导出失败: {e}")
+
+
+tracer = Tracer()
+
+
+class _NoopSpan:
+    """未采样时使用的空操作 span"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+@contextmanager
+def _record_span(trace: Trace, name: str):
+    start = time.perf_counter()
+    err = None
+    try:
+        yield trace
+    except BaseException as e:
+        err = type(e).__name__
+        raise
+    finally:
+        end = time.perf_counter()
+        trace.spans.append(
+            (name, (start - trace.start) * 1000, (end - start) * 1000, err)
+        )
+
+
+def span(name: str):
+    """
+    记录一个阶段耗时：
+        with span("getDecryptMsg"):
+            ...
+    当前请求未被采样时直接返回空操作对象
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _record_span(trace, name)
+
+
+def set_trace_attr(key: str, value: Any):
+    """为当前追踪附加属性（如 EventType、msgtype）"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attrs[key] = value
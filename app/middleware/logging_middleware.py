@@ -8,18 +8,9 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response as StarletteResponse
 from fastapi import FastAPI
 
+from app.core.tracing import new_request_id, request_id_var, span, tracer
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.handlers.RotatingFileHandler(
-            "fastapi.log", maxBytes=1024 * 1024 * 10, backupCount=5
-        ),
-    ],
-)
+# 日志的 handler 与格式由应用启动时统一配置（见 app.core.logging_config）
 
 logger = logging.getLogger("fastapi.middleware.logging")
 
@@ -90,8 +81,30 @@ class LogAllRequestsMiddleware(BaseHTTPMiddleware):
         call_next: Callable[[Request], Awaitable[StarletteResponse]],
     ) -> StarletteResponse:
         start_time = time.time()
-        request_id = str(id(request))[:8]
-
+        # 优先沿用上游传入的请求ID，便于跨服务关联
+        request_id = request.headers.get("x-request-id") or new_request_id()
+        token = request_id_var.set(request_id)
+        trace = tracer.start_trace(f"{request.method} {request.url.path}", request_id)
+        try:
+            response = await self._dispatch(request, call_next, request_id, start_time)
+            if trace is not None and response.status_code >= 500:
+                trace.error = f"HTTP {response.status_code}"
+            return response
+        except Exception as e:
+            if trace is not None:
+                trace.error = type(e).__name__
+            raise
+        finally:
+            tracer.finish_trace(trace)
+            request_id_var.reset(token)
+
+    async def _dispatch(
+        self,
+        request: Request,
+        call_next: Callable[[Request], Awaitable[StarletteResponse]],
+        request_id: str,
+        start_time: float,
+    ) -> StarletteResponse:
         # 1. 记录请求基础信息（优化：添加请求ID，方便关联请求-响应）
         logger.info(f"\n{'='*80}")
         logger.info(f"【请求ID：{request_id}】【请求信息】")
@@ -104,12 +117,14 @@ class LogAllRequestsMiddleware(BaseHTTPMiddleware):
         )
 
         # 2. 解析并记录请求体（优化：调用工具函数，安全无副作用）
-        body_type, body_content = await parse_request_body(request)
+        with span("middleware.read_body"):
+            body_type, body_content = await parse_request_body(request)
         logger.info(f"请求体（{body_type}）: {body_content}")
 
         # 3. 处理请求（优化：不修改 request._body，避免破坏原始请求）
         try:
-            response = await call_next(request)
+            with span("middleware.call_next"):
+                response = await call_next(request)
         except Exception as e:
             logger.error(
                 f"【请求ID：{request_id}】【请求处理异常】: {str(e)}", exc_info=True
@@ -126,6 +141,7 @@ class LogAllRequestsMiddleware(BaseHTTPMiddleware):
         logger.info(f"处理时间: {process_time:.2f}s")
         logger.info(f"{'='*80}")
 
+        response.headers["X-Request-ID"] = request_id
         return response
 
 
@@ -0,0 +1,173 @@
+import logging
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from fastapi import FastAPI
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import api_paths, settings
+
+logger = logging.getLogger(__name__)
+
+
+class _GuardRule:
+    """单个路由的入口限制：请求体上限 + 必需的查询参数 / 请求头"""
+
+    __slots__ = ("max_body", "query", "headers")
+
+    def __init__(
+        self,
+        max_body: int,
+        query: Tuple[str, ...] = (),
+        headers: Tuple[str, ...] = (),
+    ):
+        self.max_body = max_body
+        self.query = query
+        # ASGI 中请求头名为小写 bytes
+        self.headers = tuple(h.lower().encode("latin-1") for h in headers)
+
+
+class RequestGuardMiddleware:
+    """
+    ASGI 层的入口防护（位于最外层，早于日志中间件与 FastAPI 的请求体解析）
+
+    - 缺少必需的查询参数 / 请求头时直接 400，不读取请求体
+    - Content-Length 超限直接 413；分块上传时边读边计数，超限立即 413，
+      不会把超大请求体读入内存
+    - 通过检查的请求体（已不超过上限）交给下游时原样重放
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rules: Optional[Dict[Tuple[str, str], _GuardRule]] = None,
+        default_max_body: Optional[int] = None,
+    ):
+        # Starlette 在构建中间件栈（应用启动）时才实例化中间件，此时再读取配置
+        self.app = app
+        self.rules = rules if rules is not None else default_rules()
+        self.default_max_body = (
+            default_max_body
+            if default_max_body is not None
+            else settings.DEFAULT_MAX_BODY_BYTES
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rule = self.rules.get((scope["method"], scope["path"]))
+        max_body = rule.max_body if rule else self.default_max_body
+
+        if rule is not None:
+            missing = self._missing(scope, rule)
+            if missing:
+                await self._reject(
+                    scope, receive, send, 400, f"缺少必需参数: {missing}"
+                )
+                return
+
+        content_length = self._content_length(scope)
+        if content_length is not None and content_length > max_body:
+            await self._reject(scope, receive, send, 413, "请求体过大")
+            return
+
+        if scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        body, more = await self._read_body(receive, max_body)
+        if body is None:
+            await self._reject(scope, receive, send, 413, "请求体过大")
+            return
+
+        replayed = False
+
+        async def replay() -> Message:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": more}
+            return await receive()
+
+        await self.app(scope, replay, send)
+
+    @staticmethod
+    def _missing(scope: Scope, rule: _GuardRule) -> Optional[str]:
+        if rule.query:
+            present = {
+                k for k, v in parse_qsl(scope["query_string"].decode("latin-1")) if v
+            }
+            for name in rule.query:
+                if name not in present:
+                    return name
+        if rule.headers:
+            present_headers = {k for k, v in scope["headers"] if v}
+            for name in rule.headers:
+                if name not in present_headers:
+                    return name.decode("latin-1")
+        return None
+
+    @staticmethod
+    def _content_length(scope: Scope) -> Optional[int]:
+        for key, value in scope["headers"]:
+            if key == b"content-length":
+                try:
+                    return int(value)
+                except ValueError:
+                    return None
+        return None
+
+    @staticmethod
+    async def _read_body(
+        receive: Receive, max_body: int
+    ) -> Tuple[Optional[bytes], bool]:
+        """
+        读取请求体，超过上限时立即停止并返回 (None, False)。
+        客户端中途断开时返回已读部分，并保留 more_body=True 让下游自行感知断开
+        """
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return b"".join(chunks), True
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > max_body:
+                return None, False
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                return b"".join(chunks), False
+
+    async def _reject(
+        self, scope: Scope, receive: Receive, send: Send, status: int, detail: str
+    ):
+        logger.warning(f"入口防护拒绝请求: {scope['method']} {scope['path']} {detail}")
+        response = JSONResponse({"detail": detail}, status_code=status)
+        await response(scope, receive, send)
+
+
+def default_rules() -> Dict[Tuple[str, str], _GuardRule]:
+    """各钉钉入口路由的防护规则（上限取自配置）"""
+    return {
+        ("POST", api_paths.CALLBACK_VERIFY): _GuardRule(
+            max_body=settings.CALLBACK_MAX_BODY_BYTES,
+            query=("signature", "timestamp", "nonce"),
+        ),
+        ("POST", api_paths.CARD_CALLBACK): _GuardRule(
+            max_body=settings.CALLBACK_MAX_BODY_BYTES,
+            headers=("timestamp", "sign"),
+        ),
+        ("POST", api_paths.API_ROOT): _GuardRule(
+            max_body=settings.ROBOT_MAX_BODY_BYTES,
+            headers=("timestamp", "sign"),
+        ),
+    }
+
+
+def add_request_guard_middleware(app: FastAPI):
+    """添加入口防护中间件（需最后注册，使其位于中间件栈的最外层）"""
+    app.add_middleware(RequestGuardMiddleware)
@@ -1,5 +1,15 @@
 from .health_router import router as health_router
 from .ding_callback_router import router as callback_router
+from .card_callback_router import router as card_callback_router
 from .ding_robot_router import router as robot_router
+from .admin_router import router as admin_router
+from .event_stream_router import router as event_stream_router
 
-__all__ = ["health_router", "callback_router", "robot_router"]
+__all__ = [
+    "health_router",
+    "callback_router",
+    "card_callback_router",
+    "robot_router",
+    "admin_router",
+    "event_stream_router",
+]
@@ -0,0 +1,247 @@
+import asyncio
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+
+from app.config import api_paths
+from app.core.context import AppContext, get_app_context
+from app.core.memory import DEFAULT_OBJECT_TYPES, memory_inspector
+from app.core.profiler import ProfilerBusyError, profiler
+from app.core.tracing import tracer
+from app.schemas.bulk_send import BulkSendRequest
+from app.services.admin_services import verify_admin_token
+
+router = APIRouter(tags=["管理接口"], dependencies=[Depends(verify_admin_token)])
+
+
+@router.get(path=api_paths.ADMIN_STATS, description="查询各服务运行统计")
+async def get_stats(context: AppContext = Depends(get_app_context)):
+    """返回应用上下文中各服务的统计信息"""
+    return context.stats()
+
+
+@router.post(path=api_paths.ADMIN_DRAIN, description="进入排空状态，停止接收新事件")
+async def begin_drain(context: AppContext = Depends(get_app_context)):
+    """
+    供部署的 preStop 钩子调用：就绪检查立即返回 draining，负载均衡摘除本实例后再发送 SIGTERM
+    """
+    context.begin_drain()
+    return {"state": context.state, "unfinished": context.dispatcher.unfinished}
+
+
+@router.get(path=api_paths.ADMIN_TRACES, description="查询最近保留的慢请求追踪")
+async def list_traces(limit: int = Query(50, ge=1, le=1000)):
+    """返回追踪器统计信息以及最近的慢请求分阶段耗时"""
+    return {"stats": tracer.stats(), "traces": tracer.recent(limit)}
+
+
+@router.get(path=api_paths.ADMIN_PROFILE, description="对当前 worker 进行在线剖析")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=300, description="剖析时长（秒）"),
+    mode: Literal["sample", "cprofile"] = Query(
+        "sample", description="sample：统计采样折叠栈；cprofile：pstats 数据"
+    ),
+    interval_ms: float = Query(10, ge=1, le=1000, description="采样间隔（毫秒）"),
+    all_threads: bool = Query(False, description="是否采样所有线程（默认仅事件循环）"),
+):
+    """
+    剖析处理本请求的 worker 进程，结束后返回结果文件：
+    - sample：flamegraph.pl profile.folded > profile.svg，或拖入 speedscope
+    - cprofile：python -m pstats profile.pstats，或 snakeviz profile.pstats
+    """
+    try:
+        if mode == "sample":
+            folded = await profiler.sample(seconds, interval_ms / 1000, all_threads)
+            return PlainTextResponse(
+                folded,
+                headers={"Content-Disposition": "attachment; filename=profile.folded"},
+            )
+        data = await profiler.cprofile(seconds)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        # 同一线程上已有其他剖析器（如调试器或覆盖率工具）
+        raise HTTPException(status_code=409, detail=f"无法开启 cProfile: {e}")
+    return Response(
+        data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": "attachment; filename=profile.pstats"},
+    )
+
+
+@router.post(path=api_paths.ADMIN_MEMORY_TRACEMALLOC, description="开启 tracemalloc")
+async def start_tracemalloc(
+    frames: int = Query(1, ge=1, le=50, description="每次分配保留的调用栈层数"),
+):
+    """开启后所有内存分配都会被记录（有明显开销），排查结束后应关闭"""
+    return memory_inspector.start(frames)
+
+
+@router.delete(path=api_paths.ADMIN_MEMORY_TRACEMALLOC, description="关闭 tracemalloc")
+async def stop_tracemalloc():
+    """关闭 tracemalloc 并清空已保存的快照"""
+    return memory_inspector.stop()
+
+
+@router.get(path=api_paths.ADMIN_MEMORY_TRACEMALLOC, description="查询内存追踪状态")
+async def tracemalloc_status():
+    return memory_inspector.status()
+
+
+@router.post(path=api_paths.ADMIN_MEMORY_SNAPSHOTS, description="保存命名内存快照")
+async def take_memory_snapshot(
+    name: str = Query(..., min_length=1, max_length=64, description="快照名称"),
+):
+    try:
+        return await asyncio.to_thread(memory_inspector.take_snapshot, name)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get(path=api_paths.ADMIN_MEMORY_DIFF, description="对比两个内存快照")
+async def diff_memory_snapshots(
+    base: str = Query(..., description="基准快照名称"),
+    target: str = Query(..., description="对比快照名称"),
+    group_by: Literal["lineno", "filename", "traceback"] = Query("lineno"),
+    limit: int = Query(20, ge=1, le=500),
+):
+    """按文件与行号返回 target 相对 base 增长最多的分配位置"""
+    try:
+        return await asyncio.to_thread(
+            memory_inspector.diff, base, target, group_by, limit
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+
+@router.get(path=api_paths.ADMIN_MEMORY_OBJECTS, description="统计项目类型的存活对象数")
+async def count_objects(
+    types: List[str] = Query(
+        list(DEFAULT_OBJECT_TYPES), description="额外关注的类型名（可多次传入）"
+    ),
+    limit: int = Query(50, ge=1, le=1000),
+):
+    """
+    遍历 gc 跟踪的对象，无需开启 tracemalloc；耗时与堆大小成正比，
+    因此放到线程中执行，遍历期间事件循环仍可处理其他请求
+    """
+    return await asyncio.to_thread(memory_inspector.object_counts, types, limit)
+
+
+@router.get(path=api_paths.ADMIN_EVENTS, description="查询历史回调事件")
+async def list_events(
+    event_type: Optional[str] = Query(None, description="事件类型 EventType"),
+    corp_id: Optional[str] = Query(None, description="企业 corpId"),
+    since: Optional[float] = Query(None, description="起始时间（Unix 秒）"),
+    until: Optional[float] = Query(None, description="结束时间（Unix 秒）"),
+    limit: int = Query(100, ge=1, le=1000),
+    context: AppContext = Depends(get_app_context),
+):
+    """按条件查询事件存储中的回调事件"""
+    if context.event_store is None:
+        raise HTTPException(status_code=404, detail="事件存储未启用")
+    return await asyncio.to_thread(
+        context.event_store.query_events, event_type, corp_id, since, until, limit
+    )
+
+
+@router.get(path=api_paths.ADMIN_MESSAGES, description="查询历史机器人消息")
+async def list_messages(
+    conversation_id: Optional[str] = Query(None, description="会话 conversationId"),
+    sender_id: Optional[str] = Query(None, description="发送者 senderId"),
+    corp_id: Optional[str] = Query(None, description="企业 chatbotCorpId"),
+    msgtype: Optional[str] = Query(None, description="消息类型"),
+    since: Optional[float] = Query(None, description="起始时间（Unix 秒）"),
+    until: Optional[float] = Query(None, description="结束时间（Unix 秒）"),
+    limit: int = Query(100, ge=1, le=1000),
+    context: AppContext = Depends(get_app_context),
+):
+    """按条件查询事件存储中的机器人消息"""
+    if context.event_store is None:
+        raise HTTPException(status_code=404, detail="事件存储未启用")
+    return await asyncio.to_thread(
+        context.event_store.query_messages,
+        conversation_id,
+        sender_id,
+        corp_id,
+        msgtype,
+        since,
+        until,
+        limit,
+    )
+
+
+@router.get(path=api_paths.ADMIN_MESSAGES_SEARCH, description="全文检索机器人消息")
+async def search_messages(
+    q: str = Query(..., min_length=1, description="关键词，空格分隔表示同时包含"),
+    conversation_id: Optional[str] = Query(None, description="会话 conversationId"),
+    sender_id: Optional[str] = Query(None, description="发送者 senderId"),
+    since: Optional[float] = Query(None, description="起始时间（Unix 秒）"),
+    until: Optional[float] = Query(None, description="结束时间（Unix 秒）"),
+    limit: int = Query(50, ge=1, le=1000),
+    context: AppContext = Depends(get_app_context),
+):
+    """在机器人消息全文索引中检索，如“某人上周在某群里说过 X”"""
+    if context.message_index is None:
+        raise HTTPException(status_code=404, detail="消息全文索引未启用")
+    return await asyncio.to_thread(
+        context.message_index.search, q, conversation_id, sender_id, since, until, limit
+    )
+
+
+@router.post(
+    path=api_paths.ADMIN_BULK_SEND, description="批量发送机器人单聊消息或工作通知"
+)
+async def bulk_send(
+    request: BulkSendRequest, context: AppContext = Depends(get_app_context)
+):
+    """合并相同内容、按接口上限切块并发发送，按消息分组返回逐个接收者的结果"""
+    return await context.bulk_sender.send(
+        request.channel, [(m.user_ids, m.msg) for m in request.messages]
+    )
+
+
+def _require_directory(context: AppContext):
+    if context.directory is None:
+        raise HTTPException(status_code=404, detail="本地通讯录未启用")
+    return context.directory
+
+
+@router.get(path=api_paths.ADMIN_DIRECTORY_USERS, description="从本地通讯录查询用户")
+async def find_directory_user(
+    userid: Optional[str] = Query(None),
+    unionid: Optional[str] = Query(None),
+    mobile: Optional[str] = Query(None),
+    context: AppContext = Depends(get_app_context),
+):
+    """按 userid / unionid / mobile 之一查询，不访问钉钉接口"""
+    directory = _require_directory(context)
+    if userid:
+        user = directory.get_user(userid)
+    elif unionid:
+        user = directory.get_user_by_unionid(unionid)
+    elif mobile:
+        user = directory.get_user_by_mobile(mobile)
+    else:
+        raise HTTPException(
+            status_code=400, detail="需要 userid / unionid / mobile 之一"
+        )
+    if user is None:
+        raise HTTPException(status_code=404, detail="用户不存在")
+    return user
+
+
+@router.get(path=api_paths.ADMIN_DIRECTORY_DEPT, description="从本地通讯录查询部门")
+async def get_directory_dept(
+    dept_id: int, context: AppContext = Depends(get_app_context)
+):
+    """返回部门信息、祖先链以及直属成员"""
+    directory = _require_directory(context)
+    dept = directory.get_dept(dept_id)
+    if dept is None:
+        raise HTTPException(status_code=404, detail="部门不存在")
+    return {
+        "dept": dept,
+        "ancestors": directory.dept_ancestors(dept_id),
+        "members": directory.dept_members(dept_id),
+    }
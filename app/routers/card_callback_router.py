@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+import logging
+
+from app.schemas.card import CardCallbackRequest
+from app.services import ding_robot_services
+from app.config import api_paths
+from app.core.context import AppContext, ensure_accepting, get_app_context
+
+logger = logging.getLogger(__name__)
+
+
+router = APIRouter(tags=["钉钉卡片回调"])
+
+
+@router.post(
+    path=api_paths.CARD_CALLBACK,
+    description="接收互动卡片回调，同步返回更新后的卡片数据",
+    # 与机器人回调相同，请求头携带 timestamp + sign（应用 AppSecret 的 HmacSHA256 签名）
+    dependencies=[
+        Depends(ensure_accepting),
+        Depends(ding_robot_services.verify_robot_security),
+    ],
+)
+async def handle_card_callback(
+    body: CardCallbackRequest,
+    context: AppContext = Depends(get_app_context),
+):
+    """
+    签名校验通过后，按 actionId 交给注册的卡片处理函数（见 app.core.card_callbacks）。
+    响应体为处理函数返回的 JSON 字节串，原样返回，不再经过 FastAPI 的序列化。
+    """
+    content = await context.card_callbacks.handle(body)
+    return Response(content=content, media_type="application/json")
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 import logging
 
 from app.schemas.callback import DingCallbackRequest, DingCallbackResponse
 from app.config import api_paths
+from app.core.context import AppContext, ensure_accepting, get_app_context
 from app.services.ding_http_callback_services import ding_callback
 
 logger = logging.getLogger(__name__)
@@ -15,12 +16,14 @@ router = APIRouter(tags=["钉钉回调接口"])
     path=api_paths.CALLBACK_VERIFY,
     response_model=DingCallbackResponse,
     description="接收钉钉回调推送，返回加密响应",
+    dependencies=[Depends(ensure_accepting)],
 )
 async def verify_dingtalk_callback(
     body: DingCallbackRequest,
     msg_signature: str = Query(..., alias="signature"),
     timestamp: str = Query(..., alias="timestamp"),
     nonce: str = Query(..., alias="nonce"),
+    context: AppContext = Depends(get_app_context),
 ):
     """
     接收并处理钉钉的回调。
@@ -34,7 +37,9 @@ async def verify_dingtalk_callback(
             f"收到回调请求: sig={msg_signature}, ts={timestamp}, nonce={nonce}"
         )
         # 2. 调用服务层处理回调事件
-        resp_data = ding_callback(msg_signature, timestamp, nonce, body.encrypt)
+        resp_data = ding_callback(
+            msg_signature, timestamp, nonce, body.encrypt, context=context
+        )
         logger.debug(f"回调处理成功, 返回数据: {resp_data}")
         return resp_data
 
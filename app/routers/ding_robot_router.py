@@ -9,6 +9,7 @@ from app.schemas.ding_robot import (
 
 from app.services import ding_robot_services
 from app.config import api_paths
+from app.core.context import AppContext, ensure_accepting, get_app_context
 
 # 获取日志
 logger = logging.getLogger(__name__)
@@ -18,9 +19,16 @@ router = APIRouter(tags=["钉钉机器人回调"])
 @router.post(
     path=api_paths.API_ROOT,
     # 3. 依赖项从 service 模块导入
-    dependencies=[Depends(ding_robot_services.verify_robot_security)],
+    dependencies=[
+        Depends(ensure_accepting),
+        Depends(ding_robot_services.verify_robot_security),
+        Depends(ding_robot_services.enforce_robot_rate_limit),
+    ],
 )
-async def handle_robot_message(body: DingRobotRequest):
+async def handle_robot_message(
+    body: DingRobotRequest,
+    context: AppContext = Depends(get_app_context),
+):
     """
     接收并处理来自钉钉机器人的@消息。
     安全校验已通过依赖项 (verify_robot_security) 自动完成。
@@ -28,4 +36,4 @@ async def handle_robot_message(body: DingRobotRequest):
     """
 
     # 4. 路由层现在只负责调用服务层
-    return await ding_robot_services.handle_robot_logic(body)
+    return await ding_robot_services.handle_robot_logic(body, context=context)
@@ -0,0 +1,123 @@
+import logging
+from typing import List, Optional
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import StreamingResponse
+
+from app.config import api_paths, settings
+from app.core.context import AppContext, get_app_context
+from app.services.admin_services import is_valid_admin_token, verify_admin_token
+from app.services.event_hub_services import EventHub, Subscriber
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["事件实时订阅"])
+
+
+def _subscribe(
+    hub: Optional[EventHub],
+    source: Optional[str],
+    event_type: Optional[List[str]],
+    msgtype: Optional[List[str]],
+    conversation_id: Optional[List[str]],
+) -> Subscriber:
+    if hub is None:
+        raise HTTPException(status_code=503, detail="事件分发中心未启用")
+    try:
+        return hub.subscribe(
+            source=source,
+            event_types=set(event_type or ()),
+            msgtypes=set(msgtype or ()),
+            conversation_ids=set(conversation_id or ()),
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get(
+    path=api_paths.STREAM_EVENTS,
+    dependencies=[Depends(verify_admin_token)],
+    description="以 Server-Sent Events 方式实时订阅回调事件与机器人消息",
+)
+async def stream_events_sse(
+    request: Request,
+    source: Optional[str] = Query(None, pattern="^(callback|robot)$"),
+    event_type: Optional[List[str]] = Query(None, description="回调事件类型过滤"),
+    msgtype: Optional[List[str]] = Query(None, description="机器人消息类型过滤"),
+    conversation_id: Optional[List[str]] = Query(None, description="会话过滤"),
+    context: AppContext = Depends(get_app_context),
+):
+    """
+    每条事件以一个 `data:` 帧推送；空闲时发送注释帧作为心跳。
+    """
+    hub = context.event_hub
+    sub = _subscribe(hub, source, event_type, msgtype, conversation_id)
+    heartbeat = settings.EVENT_HUB_HEARTBEAT_SECONDS
+
+    async def event_generator():
+        try:
+            while not await request.is_disconnected():
+                message = await sub.next_message(heartbeat)
+                if message is None:
+                    yield ": ping\n\n"
+                else:
+                    yield f"data: {message}\n\n"
+        except ConnectionError:
+            pass
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket(path=api_paths.STREAM_WS)
+async def stream_events_ws(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None, description="管理令牌（也可通过请求头传入）"),
+    source: Optional[str] = Query(None, pattern="^(callback|robot)$"),
+    event_type: Optional[List[str]] = Query(None),
+    msgtype: Optional[List[str]] = Query(None),
+    conversation_id: Optional[List[str]] = Query(None),
+    context: AppContext = Depends(get_app_context),
+):
+    """
+    以 WebSocket 方式实时订阅，过滤参数与 SSE 接口一致。
+    """
+    api_token = websocket.headers.get("x-api-token") or token
+    if not is_valid_admin_token(api_token):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    hub = context.event_hub
+    try:
+        sub = _subscribe(hub, source, event_type, msgtype, conversation_id)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=e.detail)
+        return
+
+    await websocket.accept()
+    heartbeat = settings.EVENT_HUB_HEARTBEAT_SECONDS
+    try:
+        while True:
+            message = await sub.next_message(heartbeat)
+            if message is None:
+                await websocket.send_json({"source": "ping"})
+            else:
+                await websocket.send_text(message)
+    except ConnectionError:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unsubscribe(sub)
@@ -1,6 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
 
-from app.schemas.health import HealthCheckResponse
+from app.schemas.health import HealthCheckResponse, ReadinessResponse
 from app.config import api_paths
 
 router = APIRouter(tags=["健康检查"])
@@ -11,3 +11,18 @@ router = APIRouter(tags=["健康检查"])
 async def health_check():
     """检查服务是否正常运行"""
     return HealthCheckResponse()
+
+
+# 就绪检查接口
+@router.get(path=api_paths.HEALTH_READY, response_model=ReadinessResponse)
+async def readiness_check(request: Request, response: Response):
+    """检查服务是否可以接收新事件；启动中与排空期间返回 503"""
+    context = getattr(request.app.state, "context", None)
+    if context is None:
+        response.status_code = 503
+        return ReadinessResponse(status="starting")
+    if not context.accepting:
+        response.status_code = 503
+    return ReadinessResponse(
+        status=context.state, unfinished=context.dispatcher.unfinished
+    )
@@ -0,0 +1,20 @@
+from typing import Any, Dict, List, Literal
+
+from pydantic import BaseModel, Field
+
+
+class BulkMessage(BaseModel):
+    user_ids: List[str] = Field(..., min_length=1, description="接收者 userid 列表")
+    msg: Dict[str, Any] = Field(
+        ...,
+        description='消息内容：机器人渠道为 {"msgKey", "msgParam"}，工作通知渠道为 msg 对象',
+    )
+
+
+class BulkSendRequest(BaseModel):
+    channel: Literal["robot", "work_notice"] = Field(
+        ..., description="发送渠道：robot（机器人单聊）/ work_notice（工作通知）"
+    )
+    messages: List[BulkMessage] = Field(
+        ..., min_length=1, description="消息列表，内容相同的消息会被合并发送"
+    )
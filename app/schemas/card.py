@@ -0,0 +1,37 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+
+class CardCallbackRequest(BaseModel):
+    """钉钉互动卡片回调请求体（用户点击卡片按钮、提交表单时推送）"""
+
+    model_config = ConfigDict(extra="allow")
+
+    outTrackId: str = Field(description="卡片的外部追踪ID（创建卡片时指定）")
+    corpId: Optional[str] = Field(default=None, description="企业 corpId")
+    userId: Optional[str] = Field(default=None, description="操作人 userId")
+    type: Optional[str] = Field(default=None, description="回调类型")
+    content: str = Field(default="{}", description="回调内容（JSON 字符串）")
+
+    _private_data: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+
+    def private_data(self) -> Dict[str, Any]:
+        """解析 content 中的 cardPrivateData：{"actionIds": [...], "params": {...}}（只解析一次）"""
+        if self._private_data is None:
+            try:
+                content = json.loads(self.content)
+            except ValueError:
+                content = None
+            data = content.get("cardPrivateData") if isinstance(content, dict) else None
+            self._private_data = data if isinstance(data, dict) else {}
+        return self._private_data
+
+    @property
+    def action_ids(self) -> List[str]:
+        return list(self.private_data().get("actionIds") or [])
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return dict(self.private_data().get("params") or {})
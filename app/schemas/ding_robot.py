@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Union, Literal
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
+from typing import Any, Dict, List, Optional, Union, Literal, get_args
 from enum import Enum
 
 import logging
@@ -190,3 +190,30 @@ DingRobotRequest = Union[
     FileRequest,
     RichTextRequest,
 ]
+
+# 从 dict / JSON 校验出具体的消息模型（非 FastAPI 请求体场景使用）
+robot_request_adapter = TypeAdapter(DingRobotRequest)
+
+
+def robot_request_samples() -> List[Dict[str, Any]]:
+    """每种消息类型一份最小的合法请求体（启动时预热校验器用）"""
+    base = {
+        "conversationId": "prewarm",
+        "chatbotCorpId": "prewarm",
+        "chatbotUserId": "prewarm",
+        "openThreadId": "prewarm",
+        "msgId": "prewarm",
+        "senderNick": "prewarm",
+        "isAdmin": False,
+        "sessionWebhookExpiredTime": 0,
+        "createAt": 0,
+        "conversationType": "1",
+        "senderId": "prewarm",
+        "sessionWebhook": "http://127.0.0.1/prewarm",
+    }
+    samples = []
+    for model in get_args(DingRobotRequest):
+        msgtype = model.model_fields["msgtype"].default
+        content_field = "text" if msgtype == MsgType.TEXT else "content"
+        samples.append({**base, "msgtype": msgtype.value, content_field: {}})
+    return samples
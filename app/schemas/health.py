@@ -9,3 +9,8 @@ class HealthCheckResponse(BaseModel):
         default_factory=lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         description="当前时间",
     )
+
+
+class ReadinessResponse(BaseModel):
+    status: str = Field(description="就绪状态：starting / ready / draining / stopped")
+    unfinished: int = Field(default=0, description="排队中与执行中的处理函数数量")
@@ -1,4 +1,11 @@
-from .ding_http_callback_services import ding_callback
+from .ding_http_callback_services import ding_callback, process_callback_event
 from .ding_robot_services import verify_robot_security, handle_robot_logic
+from .admin_services import verify_admin_token
 
-__all__ = ["ding_callback", "verify_robot_security", "handle_robot_logic"]
+__all__ = [
+    "ding_callback",
+    "process_callback_event",
+    "verify_robot_security",
+    "handle_robot_logic",
+    "verify_admin_token",
+]
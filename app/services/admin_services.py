@@ -0,0 +1,31 @@
+import hmac
+import logging
+from typing import Optional
+from fastapi import HTTPException, Header
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def is_valid_admin_token(api_token: Optional[str]) -> bool:
+    """常量时间比较管理令牌（未配置 API_Token 时一律拒绝）"""
+    if not api_token or not settings.API_Token:
+        return False
+    return hmac.compare_digest(api_token.encode(), settings.API_Token.encode())
+
+
+# --- 管理接口鉴权依赖项 ---
+async def verify_admin_token(
+    api_token: str = Header(..., alias="X-API-Token", description="管理接口令牌"),
+):
+    """
+    FastAPI 依赖项，使用配置中的 API_Token 校验管理接口访问权限
+    """
+    if not settings.API_Token:
+        raise HTTPException(status_code=500, detail="服务器未配置 API_Token")
+
+    if not is_valid_admin_token(api_token):
+        logger.warning("管理接口鉴权失败")
+        raise HTTPException(status_code=403, detail="Invalid API token")
+    return True
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.core.ratelimit import AsyncTokenBucket
+from app.services.dingtalk_api_services import DingTalkAPIError, DingTalkClient
+
+logger = logging.getLogger(__name__)
+
+# 各发送渠道单次调用的接收者上限
+ROBOT_BATCH_LIMIT = 20
+WORK_NOTICE_BATCH_LIMIT = 100
+
+# 钉钉限流类错误码（旧版 oapi 为数字，新版 api 为字符串）
+_FLOW_CONTROL_CODES = {"90002", "90006", "90018", "429"}
+
+
+def _is_flow_control(e: DingTalkAPIError) -> bool:
+    code = str(e.errcode)
+    return code in _FLOW_CONTROL_CODES or "Qps" in code or "Throttl" in code
+
+
+class BulkSender:
+    """
+    批量消息发送
+
+    - 相同内容的消息合并，接收者去重后按接口上限切块
+      （机器人单聊 batchSend 每次 20 人，工作通知 asyncsend_v2 每次 100 人）
+    - 所有块并发发送，受全局 QPS 令牌桶与并发上限约束；遇到限流错误按退避重试
+    - 按合并后的消息分组返回逐个接收者的发送结果（同一接收者可出现在多组中）
+    """
+
+    def __init__(
+        self,
+        api: DingTalkClient,
+        robot_code: str,
+        agent_id: str,
+        qps: float = 20.0,
+        concurrency: int = 10,
+        max_retries: int = 3,
+        backoff_ms: int = 500,
+    ):
+        self.api = api
+        self.robot_code = robot_code
+        self.agent_id = agent_id
+        self.bucket = AsyncTokenBucket(qps)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff_ms / 1000
+        self.requests = 0
+        self.retries = 0
+
+    @staticmethod
+    def plan(
+        messages: List[Tuple[List[str], Dict[str, Any]]], limit: int
+    ) -> Tuple[List[Dict[str, Any]], List[Tuple[int, List[str]]]]:
+        """
+        合并相同内容的消息并切块
+        :return: ([合并后的消息内容], [(消息序号, 接收者块)])
+        """
+        groups: Dict[str, Tuple[Dict[str, None], Dict[str, Any]]] = {}
+        for recipients, msg in messages:
+            key = json.dumps(msg, sort_keys=True, ensure_ascii=False)
+            group = groups.setdefault(key, ({}, msg))
+            for user_id in recipients:
+                group[0][user_id] = None
+        msgs, chunks = [], []
+        for index, (users, msg) in enumerate(groups.values()):
+            msgs.append(msg)
+            ids = list(users)
+            chunks.extend(
+                (index, ids[i : i + limit]) for i in range(0, len(ids), limit)
+            )
+        return msgs, chunks
+
+    async def send(
+        self, channel: str, messages: List[Tuple[List[str], Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        :param channel: "robot"（msg 为 {"msgKey", "msgParam"}）或
+                        "work_notice"（msg 为工作通知的 msg 对象）
+        :param messages: [(接收者 userid 列表, 消息内容)]
+        """
+        if channel == "robot":
+            limit, send_chunk = ROBOT_BATCH_LIMIT, self._send_robot
+        elif channel == "work_notice":
+            limit, send_chunk = WORK_NOTICE_BATCH_LIMIT, self._send_work_notice
+        else:
+            raise ValueError(f"未知的发送渠道: {channel}")
+
+        start = time.perf_counter()
+        msgs, chunks = self.plan(messages, limit)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # 按消息分组保存结果：同一接收者收到不同内容时各自记录，互不覆盖
+        results: List[Dict[str, Dict[str, Any]]] = [{} for _ in msgs]
+
+        async def run(index: int, user_ids: List[str]):
+            async with semaphore:
+                try:
+                    results[index].update(
+                        await self._with_retry(send_chunk, user_ids, msgs[index])
+                    )
+                except Exception as e:
+                    logger.error(f"批量发送失败（{len(user_ids)} 人）: {e}")
+                    for user_id in user_ids:
+                        results[index][user_id] = {"status": "failed", "error": str(e)}
+
+        await asyncio.gather(*(run(index, ids) for index, ids in chunks))
+        summary: Dict[str, int] = {}
+        for group in results:
+            for result in group.values():
+                summary[result["status"]] = summary.get(result["status"], 0) + 1
+        return {
+            "recipients": sum(len(group) for group in results),
+            "requests": len(chunks),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+            "summary": summary,
+            "results": [
+                {"msg": msg, "results": group} for msg, group in zip(msgs, results)
+            ],
+        }
+
+    async def _with_retry(self, send_chunk, user_ids: List[str], msg: Dict[str, Any]):
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            self.requests += 1
+            try:
+                return await send_chunk(user_ids, msg)
+            except DingTalkAPIError as e:
+                if not _is_flow_control(e) or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self.backoff * (2**attempt))
+
+    async def _send_robot(
+        self, user_ids: List[str], msg: Dict[str, Any]
+    ) -> Dict[str, Dict[str, Any]]:
+        msg_param = msg.get("msgParam", {})
+        if not isinstance(msg_param, str):
+            msg_param = json.dumps(msg_param, ensure_ascii=False)
+        data = await self.api.robot_batch_send(
+            self.robot_code, user_ids, msg.get("msgKey", "sampleText"), msg_param
+        )
+        invalid = set(data.get("invalidStaffIdList") or ())
+        flow_controlled = set(data.get("flowControlledStaffIdList") or ())
+        results = {}
+        for user_id in user_ids:
+            if user_id in invalid:
+                results[user_id] = {"status": "invalid"}
+            elif user_id in flow_controlled:
+                results[user_id] = {"status": "flow_controlled"}
+            else:
+                results[user_id] = {
+                    "status": "sent",
+                    "process_query_key": data.get("processQueryKey"),
+                }
+        return results
+
+    async def _send_work_notice(
+        self, user_ids: List[str], msg: Dict[str, Any]
+    ) -> Dict[str, Dict[str, Any]]:
+        data = await self.api.send_work_notice(int(self.agent_id), user_ids, msg)
+        task_id = data.get("task_id")
+        return {user_id: {"status": "sent", "task_id": task_id} for user_id in user_ids}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "qps_budget": self.bucket.stats(),
+        }
@@ -1,62 +1,87 @@
 import json
+from typing import TYPE_CHECKING, Optional
 from fastapi import HTTPException
-from app.utils.DingCallbackCrypto3 import DingCallbackCrypto3
-from app.config import settings
+from app.core.events import CallbackEvent
+from app.core.tracing import span, set_trace_attr
 import logging
 
+if TYPE_CHECKING:
+    from app.core.context import AppContext
+
 # 获取日志
 logger = logging.getLogger(__name__)
 
-try:
-    dingcrypto = DingCallbackCrypto3(
-        token=settings.token,
-        encodingAesKey=settings.ase_key,
-        key=settings.Client_ID,
-    )
-except Exception as e:
-    logger.error(f"初始化加解密工具失败，请检查key长度是否正确: {e}")
-    dingcrypto = None
+
+def process_callback_event(
+    event_data: dict,
+    context: Optional["AppContext"] = None,
+    raw: Optional[str] = None,
+):
+    """
+    处理一条已解密的回调事件（HTTP 回调与 Stream 模式共用的处理路径）
+    :param raw: 事件明文（有则直接作为紧凑事件的原始负载）
+    """
+    event_type = event_data.get("EventType")
+    set_trace_attr("EventType", event_type)
+    logger.info(f"收到事件类型: {event_type}")
+
+    # 生成紧凑事件，交给应用上下文分发给下游服务（事件存储等）
+    if context is not None:
+        context.on_callback_event(CallbackEvent.from_dict(event_data, raw))
+
+    with span("handler"):
+        # 处理“验证回调URL有效性”事件
+        if event_type == "check_url":
+            # 这通常是ISV应用或新版企业应用在后台点击“验证有效性”时收到的
+            logger.info(f"收到回调URL验证请求: {event_type}, 回调URL正确✔️")
+
+        elif event_type in ("check_create_suite_url", "check_update_suite_url"):
+            # 这通常是ISV应用或新版企业应用在后台点击“验证有效性”时收到的
+            logger.info(f"发生事件: {event_type}")
+
+        else:
+            # 其他未处理事件类型
+            logger.info(f"发生未处理事件: {event_type}")
 
 
-def ding_callback(msg_signature: str, timeStamp: str, nonce: str, encrypt_content: str):
+def ding_callback(
+    msg_signature: str,
+    timeStamp: str,
+    nonce: str,
+    encrypt_content: str,
+    context: Optional["AppContext"] = None,
+):
+    # 加解密工具由 AppContext 在启动时创建（见 AppContext._init_crypto）
+    dingcrypto = context.callback_crypto if context is not None else None
     if dingcrypto is None:
         logger.critical("钉钉回调加解密模块未成功初始化!")
         raise HTTPException(status_code=500, detail="服务器内部配置错误")
 
     try:
         # 1. 验证签名+解密
-        decrypted_msg = dingcrypto.getDecryptMsg(
-            msg_signature, timeStamp, nonce, encrypt_content
-        )
+        with span("getDecryptMsg"):
+            decrypted_msg = dingcrypto.getDecryptMsg(
+                msg_signature, timeStamp, nonce, encrypt_content
+            )
         logger.info(f"解密后的事件明文: {decrypted_msg}")
 
         # 2. 解析事件数据
         try:
-            event_data = json.loads(decrypted_msg)
-            event_type = event_data.get("EventType")
-            logger.info(f"收到事件类型: {event_type}")
+            with span("json_parse"):
+                event_data = json.loads(decrypted_msg)
         except json.JSONDecodeError as e:
             logger.error(f"事件明文不是有效的JSON: {e}")
             raise HTTPException(status_code=400, detail="请求数据格式错误")
 
-        # 处理“验证回调URL有效性”事件
-        if event_type == "check_url":
-            # 这通常是ISV应用或新版企业应用在后台点击“验证有效性”时收到的
-            logger.info(f"收到回调URL验证请求: {event_type}, 回调URL正确✔️")
-
-        elif event_type in ("check_create_suite_url", "check_update_suite_url"):
-            # 这通常是ISV应用或新版企业应用在后台点击“验证有效性”时收到的
-            logger.info(f"发生事件: {event_type}")
-
-        else:
-            # 其他未处理事件类型
-            logger.info(f"发生未处理事件: {event_type}")
+        # 3. 事件处理（HTTP 回调与 Stream 模式共用）
+        process_callback_event(event_data, context, raw=decrypted_msg)
 
-        # 3. 生成加密响应
+        # 4. 生成加密响应
         response_content = "success"
-        resp_data = dingcrypto.getEncryptedMap(response_content)
+        with span("getEncryptedMap"):
+            resp_data = dingcrypto.getEncryptedMap(response_content)
 
-        # 4. 返回响应字典
+        # 5. 返回响应字典
         return resp_data
 
     except ValueError as e:
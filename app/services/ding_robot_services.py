@@ -1,71 +1,113 @@
 import logging
-from fastapi import HTTPException, Header
+from typing import TYPE_CHECKING, Optional
+from fastapi import HTTPException, Header, Request
 
-from app.utils.DingRobotCryPto3 import DingRobotCrypto3
-from app.config import settings
+from app.core.events import RobotEvent
+from app.core.tracing import span, set_trace_attr
 from app.schemas.ding_robot import (
     DingRobotRequest,
     MsgType,
 )
+from app.services.keyword_services import iter_message_texts
 
-logger = logging.getLogger(__name__)
-
+if TYPE_CHECKING:
+    from app.core.context import AppContext
 
-# --- 初始化 Crypto 实例 ---
-try:
-    robot_crypto = DingRobotCrypto3(app_secret=settings.Client_Secret)
-except Exception as e:
-    logger.error(f"DingRobotCrypto3 初始化失败: {e}", exc_info=True)
-    robot_crypto = None
+logger = logging.getLogger(__name__)
 
 
 # --- 安全验证依赖项 ---
 async def verify_robot_security(
+    request: Request,
     timestamp: str = Header(..., description="毫秒级时间戳"),
     sign: str = Header(..., description="HmacSHA256 签名"),
 ):
     """
     FastAPI 依赖项，使用 DingRobotCrypto3 实例验证签名
+    （实例由 AppContext 在启动时创建，见 AppContext._init_crypto）
     """
+    robot_crypto = request.app.state.context.robot_crypto
     if robot_crypto is None:
         raise HTTPException(status_code=500, detail="服务器签名验证配置不完整")
 
     # 2. 调用类的方法
-    if not robot_crypto.verify_signature(timestamp, sign):
+    with span("verify_robot_security"):
+        verified = robot_crypto.verify_signature(timestamp, sign)
+    if not verified:
         logger.error("机器人回调安全验证失败")
         raise HTTPException(status_code=403, detail="Signature verification failed")
     # 验证通过
     return True
 
 
+# --- 入站限流依赖项 ---
+async def enforce_robot_rate_limit(request: Request):
+    """
+    FastAPI 依赖项，在签名校验之后、模型校验与业务处理之前执行令牌桶限流。
+    只读取已解析的 JSON 中的几个字段，被限流的消息直接返回 429
+    """
+    limiter = request.app.state.context.robot_limiter
+    if limiter is None:
+        return
+    try:
+        payload = await request.json()
+    except ValueError:
+        # 交给后续的模型校验返回 422
+        return
+    if not isinstance(payload, dict):
+        return
+    field = limiter.check(payload)
+    if field is not None:
+        logger.warning(f"机器人消息触发限流: {field}={payload.get(field)}")
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limited by {field}",
+            headers={"Retry-After": "1"},
+        )
+
+
 # --- 业务逻辑服务 ---
-async def handle_robot_logic(body: DingRobotRequest):
+async def handle_robot_logic(
+    body: DingRobotRequest, context: Optional["AppContext"] = None
+):
     """
     钉钉机器人的核心业务逻辑
     """
+    set_trace_attr("msgtype", body.msgtype)
+    if context is not None and context.keyword_scanner is not None:
+        # 命中的关键词及位置随消息一起交给处理函数（body.keywordMatches）
+        with span("keyword_scan"):
+            body.keywordMatches = context.keyword_scanner.scan_message(body)
+    # 生成紧凑事件，交给应用上下文分发给下游服务（事件存储等）
+    if context is not None:
+        text = "\n".join(t for _, t in iter_message_texts(body))
+        context.on_robot_message(RobotEvent.from_request(body, text))
     try:
-        if body.msgtype == MsgType.TEXT.value:
-            received_content = body.text.content.strip()
-            logger.info(f"收到来自 {body.senderNick} 的文本消息: {received_content}")
+        with span("handler"):
+            if body.msgtype == MsgType.TEXT.value:
+                received_content = body.text.content.strip()
+                logger.info(
+                    f"收到来自 {body.senderNick} 的文本消息: {received_content}"
+                )
 
-        elif body.msgtype == MsgType.PICTURE.value:
-            logger.info(f"收到来自 {body.senderNick} 的图片消息")
+            elif body.msgtype == MsgType.PICTURE.value:
+                logger.info(f"收到来自 {body.senderNick} 的图片消息")
 
-        elif body.msgtype == MsgType.AUDIO.value:
-            logger.info(f"收到来自 {body.senderNick} 的音频消息")
+            elif body.msgtype == MsgType.AUDIO.value:
+                logger.info(f"收到来自 {body.senderNick} 的音频消息")
 
-        elif body.msgtype == MsgType.VIDEO.value:
-            logger.info(f"收到来自 {body.senderNick} 的视频消息")
+            elif body.msgtype == MsgType.VIDEO.value:
+                logger.info(f"收到来自 {body.senderNick} 的视频消息")
 
-        elif body.msgtype == MsgType.FILE.value:
-            logger.info(f"收到来自 {body.senderNick} 的文件消息")
+            elif body.msgtype == MsgType.FILE.value:
+                logger.info(f"收到来自 {body.senderNick} 的文件消息")
 
-        elif body.msgtype == MsgType.RICH_TEXT.value:
-            logger.info(f"收到来自 {body.senderNick} 的富文本消息")
-        else:
-            logger.info(
-                f"收到来自 {body.senderNick} 的其他类型消息: {body.msgtype.value}"
-            )
+            elif body.msgtype == MsgType.RICH_TEXT.value:
+                logger.info(f"收到来自 {body.senderNick} 的富文本消息")
+            else:
+                logger.info(
+                    f"收到来自 {body.senderNick} 的其他类型消息: {body.msgtype.value}"
+                )
 
     except Exception as e:
         # 捕获业务逻辑中的未知错误
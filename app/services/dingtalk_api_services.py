@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from app.core.ratelimit import SharedTokenBucket
+
+logger = logging.getLogger(__name__)
+
+# sessionWebhook 回复在出站限流中使用的接口名
+SESSION_WEBHOOK = "sessionWebhook"
+# Stream 模式网关注册连接接口（同样计入出站 QPS 预算）
+STREAM_CONNECTIONS_OPEN = "/v1.0/gateway/connections/open"
+
+
+class DingTalkAPIError(Exception):
+    """钉钉开放接口返回的业务错误（errcode != 0）"""
+
+    def __init__(self, errcode: int, errmsg: str, path: str = ""):
+        super().__init__(f"{path} errcode={errcode}, errmsg={errmsg}")
+        self.errcode = errcode
+        self.errmsg = errmsg
+
+
+class DingTalkClient:
+    """
+    钉钉服务端 API 异步客户端（oapi.dingtalk.com 与新版 api.dingtalk.com）
+
+    - 共享一个带连接池的 httpx.AsyncClient
+    - access_token 缓存到过期前 5 分钟，并发刷新时只请求一次
+    - 配置了 limiter 时，每次调用前按 "接口|app_key" 从共享令牌桶取令牌
+    """
+
+    def __init__(
+        self,
+        app_key: str,
+        app_secret: str,
+        base_url: str = "https://oapi.dingtalk.com",
+        timeout: float = 10.0,
+        api_base_url: str = "https://api.dingtalk.com",
+        limiter: Optional[SharedTokenBucket] = None,
+    ):
+        self.app_key = app_key
+        self.limiter = limiter
+        self.app_secret = app_secret
+        self.api_base_url = api_base_url.rstrip("/")
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+        self._token: Optional[str] = None
+        self._token_expire_at = 0.0
+        self._token_lock = asyncio.Lock()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    # ------------------- 鉴权 -------------------
+    async def get_access_token(self) -> str:
+        if self._token and time.time() < self._token_expire_at:
+            return self._token
+        async with self._token_lock:
+            if self._token and time.time() < self._token_expire_at:
+                return self._token
+            await self._throttle("/gettoken")
+            resp = await self.client.get(
+                "/gettoken",
+                params={"appkey": self.app_key, "appsecret": self.app_secret},
+            )
+            data = self._check(resp, "/gettoken")
+            self._token = data["access_token"]
+            self._token_expire_at = time.time() + data.get("expires_in", 7200) - 300
+            return self._token
+
+    async def _throttle(self, endpoint: str):
+        if self.limiter is not None:
+            await self.limiter.acquire(endpoint, self.app_key)
+
+    @staticmethod
+    def _check(resp: httpx.Response, path: str) -> Dict[str, Any]:
+        resp.raise_for_status()
+        data = resp.json()
+        if data.get("errcode", 0) != 0:
+            raise DingTalkAPIError(data.get("errcode"), data.get("errmsg", ""), path)
+        return data
+
+    async def post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """调用需要 access_token 的 topapi 接口，返回完整响应体"""
+        token = await self.get_access_token()
+        await self._throttle(path)
+        resp = await self.client.post(
+            path, params={"access_token": token}, json=payload
+        )
+        return self._check(resp, path)
+
+    async def post_api(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """调用新版 api.dingtalk.com 接口（access_token 放在请求头中）"""
+        token = await self.get_access_token()
+        await self._throttle(path)
+        resp = await self.client.post(
+            f"{self.api_base_url}{path}",
+            headers={"x-acs-dingtalk-access-token": token},
+            json=payload,
+        )
+        data = resp.json() if resp.content else {}
+        if resp.status_code >= 400:
+            raise DingTalkAPIError(
+                data.get("code", resp.status_code), data.get("message", ""), path
+            )
+        return data
+
+    # ------------------- 消息发送 -------------------
+    async def send_work_notice(
+        self, agent_id: int, userids: List[str], msg: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """发送工作通知（单次最多 100 个接收者），返回含 task_id 的响应"""
+        return await self.post(
+            "/topapi/message/corpconversation/asyncsend_v2",
+            {"agent_id": agent_id, "userid_list": ",".join(userids), "msg": msg},
+        )
+
+    async def robot_batch_send(
+        self, robot_code: str, user_ids: List[str], msg_key: str, msg_param: str
+    ) -> Dict[str, Any]:
+        """机器人批量单聊消息（单次最多 20 个接收者）"""
+        return await self.post_api(
+            "/v1.0/robot/oToMessages/batchSend",
+            {
+                "robotCode": robot_code,
+                "userIds": user_ids,
+                "msgKey": msg_key,
+                "msgParam": msg_param,
+            },
+        )
+
+    async def reply_session_webhook(
+        self, session_webhook: str, msg: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        通过机器人消息中的 sessionWebhook 回复（无需 access_token，
+        过期时间见 sessionWebhookExpiredTime）
+        """
+        await self._throttle(SESSION_WEBHOOK)
+        resp = await self.client.post(session_webhook, json=msg)
+        return self._check(resp, SESSION_WEBHOOK)
+
+    async def open_stream_connection(
+        self, gateway_url: str, payload: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Stream 模式：向网关注册连接，返回含 endpoint + ticket 的响应体"""
+        await self._throttle(STREAM_CONNECTIONS_OPEN)
+        resp = await self.client.post(gateway_url, json=payload)
+        resp.raise_for_status()
+        return resp.json()
+
+    # ------------------- 通讯录 -------------------
+    async def get_user(self, userid: str) -> Dict[str, Any]:
+        data = await self.post("/topapi/v2/user/get", {"userid": userid})
+        return data["result"]
+
+    async def get_department(self, dept_id: int) -> Dict[str, Any]:
+        data = await self.post("/topapi/v2/department/get", {"dept_id": dept_id})
+        return data["result"]
+
+    async def list_sub_departments(self, dept_id: int) -> List[Dict[str, Any]]:
+        data = await self.post("/topapi/v2/department/listsub", {"dept_id": dept_id})
+        return data.get("result") or []
+
+    async def iter_department_users(
+        self, dept_id: int, page_size: int = 100
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """分页遍历部门下的用户详情"""
+        cursor = 0
+        while True:
+            data = await self.post(
+                "/topapi/v2/user/list",
+                {"dept_id": dept_id, "cursor": cursor, "size": page_size},
+            )
+            result = data.get("result") or {}
+            for user in result.get("list") or []:
+                yield user
+            if not result.get("has_more"):
+                return
+            cursor = result.get("next_cursor")
@@ -0,0 +1,283 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import httpx
+
+from app.services.dingtalk_api_services import DingTalkAPIError, DingTalkClient
+
+logger = logging.getLogger(__name__)
+
+# 根部门ID
+ROOT_DEPT_ID = 1
+
+# 通讯录事件类型
+USER_UPSERT_EVENTS = ("user_add_org", "user_modify_org")
+USER_REMOVE_EVENTS = ("user_leave_org",)
+DEPT_UPSERT_EVENTS = ("org_dept_create", "org_dept_modify")
+DEPT_REMOVE_EVENTS = ("org_dept_remove",)
+DIRECTORY_EVENTS = (
+    USER_UPSERT_EVENTS + USER_REMOVE_EVENTS + DEPT_UPSERT_EVENTS + DEPT_REMOVE_EVENTS
+)
+
+# 本地只保留处理函数会用到的用户字段
+_USER_FIELDS = (
+    "userid",
+    "unionid",
+    "name",
+    "mobile",
+    "email",
+    "title",
+    "job_number",
+    "dept_id_list",
+    "active",
+)
+_DEPT_FIELDS = ("dept_id", "name", "parent_id")
+
+
+class OrgDirectory:
+    """
+    本地组织通讯录缓存
+
+    - 首次启动时从钉钉全量拉取（或加载磁盘快照实现快速热启动）
+    - 之后由 user_* / org_dept_* 回调事件增量维护
+    - 索引：userid / unionid / mobile / 部门成员；部门祖先链查询为 O(深度)
+    """
+
+    def __init__(self, api: DingTalkClient, snapshot_path: str = ""):
+        self.api = api
+        self.snapshot_path = snapshot_path
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.depts: Dict[int, Dict[str, Any]] = {}
+        self._by_unionid: Dict[str, str] = {}
+        self._by_mobile: Dict[str, str] = {}
+        self._dept_members: Dict[int, Set[str]] = defaultdict(set)
+        self._dirty = False
+        self.ready = False
+        self.updated_at = 0.0
+        self.event_updates = 0
+        self.refresh_failures = 0
+
+    # ------------------- 查询（纯内存） -------------------
+    def get_user(self, userid: str) -> Optional[Dict[str, Any]]:
+        return self.users.get(userid)
+
+    def get_user_by_unionid(self, unionid: str) -> Optional[Dict[str, Any]]:
+        userid = self._by_unionid.get(unionid)
+        return self.users.get(userid) if userid else None
+
+    def get_user_by_mobile(self, mobile: str) -> Optional[Dict[str, Any]]:
+        userid = self._by_mobile.get(mobile)
+        return self.users.get(userid) if userid else None
+
+    def get_dept(self, dept_id: int) -> Optional[Dict[str, Any]]:
+        return self.depts.get(dept_id)
+
+    def dept_members(self, dept_id: int) -> List[Dict[str, Any]]:
+        return [self.users[u] for u in self._dept_members.get(dept_id, ())]
+
+    def dept_ancestors(self, dept_id: int) -> List[Dict[str, Any]]:
+        """返回从该部门到根部门的祖先链（含自身），O(深度)"""
+        chain = []
+        seen = set()
+        dept = self.depts.get(dept_id)
+        while dept is not None and dept["dept_id"] not in seen:
+            chain.append(dept)
+            seen.add(dept["dept_id"])
+            dept = self.depts.get(dept.get("parent_id"))
+        return chain
+
+    # ------------------- 增量维护 -------------------
+    def upsert_user(self, user: Dict[str, Any]):
+        slim = {k: user[k] for k in _USER_FIELDS if k in user}
+        userid = slim["userid"]
+        self._unindex_user(userid)
+        self.users[userid] = slim
+        if slim.get("unionid"):
+            self._by_unionid[slim["unionid"]] = userid
+        if slim.get("mobile"):
+            self._by_mobile[slim["mobile"]] = userid
+        for dept_id in slim.get("dept_id_list") or ():
+            self._dept_members[dept_id].add(userid)
+        self._touch()
+
+    def remove_user(self, userid: str):
+        self._unindex_user(userid)
+        self.users.pop(userid, None)
+        self._touch()
+
+    def _unindex_user(self, userid: str):
+        old = self.users.get(userid)
+        if old is None:
+            return
+        if old.get("unionid"):
+            self._by_unionid.pop(old["unionid"], None)
+        if old.get("mobile"):
+            self._by_mobile.pop(old["mobile"], None)
+        for dept_id in old.get("dept_id_list") or ():
+            members = self._dept_members.get(dept_id)
+            if members is not None:
+                members.discard(userid)
+
+    def upsert_dept(self, dept: Dict[str, Any]):
+        slim = {k: dept[k] for k in _DEPT_FIELDS if k in dept}
+        self.depts[slim["dept_id"]] = slim
+        self._touch()
+
+    def remove_dept(self, dept_id: int):
+        self.depts.pop(dept_id, None)
+        for userid in self._dept_members.pop(dept_id, ()):
+            user = self.users.get(userid)
+            if user is None:
+                continue
+            # 替换为新的 dict 而不是原地修改：快照写盘线程可能正在序列化旧对象
+            self.users[userid] = {
+                **user,
+                "dept_id_list": [
+                    d for d in user.get("dept_id_list") or () if d != dept_id
+                ],
+            }
+        self._touch()
+
+    def _touch(self):
+        self._dirty = True
+        self.updated_at = time.time()
+
+    # ------------------- 回调事件处理 -------------------
+    async def on_directory_event(self, event: Dict[str, Any]):
+        """
+        回调事件只携带ID列表：变更的实体从钉钉拉取最新详情，删除的实体直接移除
+        """
+        event_type = event.get("EventType")
+        if event_type in USER_UPSERT_EVENTS:
+            await self._refresh(event.get("UserId") or (), self._refresh_user)
+        elif event_type in USER_REMOVE_EVENTS:
+            for userid in event.get("UserId") or ():
+                self.remove_user(userid)
+        elif event_type in DEPT_UPSERT_EVENTS:
+            await self._refresh(event.get("DeptId") or (), self._refresh_dept)
+        elif event_type in DEPT_REMOVE_EVENTS:
+            for dept_id in event.get("DeptId") or ():
+                self.remove_dept(int(dept_id))
+        self.event_updates += 1
+
+    async def _refresh(self, ids: Iterable, fetch, concurrency: int = 8):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(entity_id):
+            async with semaphore:
+                try:
+                    await fetch(entity_id)
+                except (DingTalkAPIError, httpx.HTTPError) as e:
+                    # 单个实体失败（业务错误、超时、网络错误）不影响同批其他实体
+                    self.refresh_failures += 1
+                    logger.warning(f"通讯录实体 {entity_id} 拉取失败: {e}")
+
+        await asyncio.gather(*(one(i) for i in ids))
+
+    async def _refresh_user(self, userid: str):
+        self.upsert_user(await self.api.get_user(userid))
+
+    async def _refresh_dept(self, dept_id):
+        self.upsert_dept(await self.api.get_department(int(dept_id)))
+
+    # ------------------- 全量初始化 -------------------
+    async def bootstrap(self, concurrency: int = 8):
+        """从根部门开始广度优先遍历，全量拉取部门与用户"""
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(concurrency)
+        root = await self.api.get_department(ROOT_DEPT_ID)
+        self.upsert_dept(root)
+
+        async def children(dept_id):
+            async with semaphore:
+                return await self.api.list_sub_departments(dept_id)
+
+        level = [ROOT_DEPT_ID]
+        all_depts = [ROOT_DEPT_ID]
+        while level:
+            next_level = []
+            for subs in await asyncio.gather(*(children(d) for d in level)):
+                for dept in subs:
+                    self.upsert_dept(dept)
+                    next_level.append(dept["dept_id"])
+            all_depts.extend(next_level)
+            level = next_level
+
+        async def users(dept_id):
+            async with semaphore:
+                async for user in self.api.iter_department_users(dept_id):
+                    self.upsert_user(user)
+
+        await asyncio.gather(*(users(d) for d in all_depts))
+        self.ready = True
+        logger.info(
+            f"通讯录全量初始化完成: {len(self.depts)} 个部门, {len(self.users)} 个用户, "
+            f"耗时 {time.perf_counter() - start:.1f}s"
+        )
+
+    # ------------------- 持久化 -------------------
+    def load_snapshot(self) -> bool:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        with open(self.snapshot_path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        for dept in snapshot.get("depts", []):
+            self.upsert_dept(dept)
+        for user in snapshot.get("users", []):
+            self.upsert_user(user)
+        self._dirty = False
+        self.ready = True
+        self.updated_at = snapshot.get("updated_at", time.time())
+        logger.info(
+            f"已从快照加载通讯录: {len(self.depts)} 个部门, {len(self.users)} 个用户"
+        )
+        return True
+
+    def _take_snapshot(self) -> Optional[Dict[str, Any]]:
+        """在事件循环线程中取一份浅拷贝；无变更时返回 None"""
+        if not self.snapshot_path or not self._dirty:
+            return None
+        self._dirty = False
+        return {
+            "updated_at": self.updated_at,
+            "depts": list(self.depts.values()),
+            "users": list(self.users.values()),
+        }
+
+    def _write_snapshot(self, snapshot: Dict[str, Any]):
+        """原子写入快照（先写临时文件再替换）"""
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, self.snapshot_path)
+
+    async def save_snapshot(self) -> bool:
+        snapshot = self._take_snapshot()
+        if snapshot is None:
+            return False
+        await asyncio.to_thread(self._write_snapshot, snapshot)
+        return True
+
+    async def run_snapshotter(self, interval: float):
+        """后台任务：周期性地保存快照（序列化与写盘在线程中进行）"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.save_snapshot()
+            except Exception as e:
+                logger.error(f"通讯录快照保存失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "users": len(self.users),
+            "depts": len(self.depts),
+            "event_updates": self.event_updates,
+            "refresh_failures": self.refresh_failures,
+            "updated_at": self.updated_at,
+        }
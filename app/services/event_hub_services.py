@@ -0,0 +1,177 @@
+import asyncio
+import itertools
+import json
+import logging
+import time
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# 订阅者缓冲区满时的处理策略
+POLICY_DROP = "drop"  # 丢弃该订阅者最旧的一条，保留最新事件
+POLICY_DISCONNECT = "disconnect"  # 直接断开该订阅者
+
+SOURCE_CALLBACK = "callback"
+SOURCE_ROBOT = "robot"
+
+
+class Subscriber:
+    """
+    单个订阅者：持有有界缓冲区以及服务端过滤条件
+    - event_types 只作用于回调事件
+    - msgtypes / conversation_ids 只作用于机器人消息
+    """
+
+    def __init__(
+        self,
+        sub_id: int,
+        buffer_size: int,
+        policy: str,
+        source: Optional[str] = None,
+        event_types: Optional[Set[str]] = None,
+        msgtypes: Optional[Set[str]] = None,
+        conversation_ids: Optional[Set[str]] = None,
+    ):
+        self.id = sub_id
+        self.policy = policy
+        self.source = source
+        self.event_types = event_types or None
+        self.msgtypes = msgtypes or None
+        self.conversation_ids = conversation_ids or None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.closed = asyncio.Event()
+        self.created_at = time.time()
+        self.delivered = 0
+        self.dropped = 0
+
+    def matches(self, source: str, key: Optional[str], conversation_id: Optional[str]):
+        if self.source is not None and self.source != source:
+            return False
+        if source == SOURCE_CALLBACK:
+            return self.event_types is None or key in self.event_types
+        if self.msgtypes is not None and key not in self.msgtypes:
+            return False
+        return self.conversation_ids is None or conversation_id in self.conversation_ids
+
+    def offer(self, message: str) -> bool:
+        """非阻塞投递；返回 False 表示订阅者应被断开"""
+        try:
+            self.queue.put_nowait(message)
+            self.delivered += 1
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.policy == POLICY_DISCONNECT:
+                return False
+            # 丢弃最旧的一条，为最新事件腾出位置
+            self.queue.get_nowait()
+            self.queue.put_nowait(message)
+            return True
+
+    async def next_message(self, timeout: float) -> Optional[str]:
+        """等待下一条消息；超时返回 None（用于发送心跳），断开时抛出 ConnectionError"""
+        if self.closed.is_set():
+            raise ConnectionError("subscriber closed")
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            if self.closed.is_set():
+                raise ConnectionError("subscriber closed")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "source": self.source,
+            "queued": self.queue.qsize(),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "closed": self.closed.is_set(),
+        }
+
+
+class EventHub:
+    """
+    事件实时分发中心（SSE / WebSocket 共用）
+
+    发布端在请求路径上调用，只做过滤与 put_nowait：
+    - 每条事件只序列化一次，所有订阅者共享同一个字符串
+    - 每个订阅者独立的有界缓冲区，慢消费者按策略丢弃或被断开，不会拖慢接入
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = 1000,
+        policy: str = POLICY_DROP,
+        max_subscribers: int = 100,
+    ):
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.max_subscribers = max_subscribers
+        self._subscribers: Dict[int, Subscriber] = {}
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.disconnected = 0
+
+    # ------------------- 订阅管理 -------------------
+    def subscribe(self, **filters) -> Subscriber:
+        if len(self._subscribers) >= self.max_subscribers:
+            raise RuntimeError("订阅者数量已达上限")
+        sub = Subscriber(next(self._ids), self.buffer_size, self.policy, **filters)
+        self._subscribers[sub.id] = sub
+        logger.info(f"新增事件订阅者 #{sub.id}，当前订阅数 {len(self._subscribers)}")
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        sub.closed.set()
+        if self._subscribers.pop(sub.id, None) is not None:
+            logger.info(
+                f"事件订阅者 #{sub.id} 已退出，当前订阅数 {len(self._subscribers)}"
+            )
+
+    def close(self):
+        """关闭所有订阅者（应用关闭时调用）"""
+        for sub in list(self._subscribers.values()):
+            self.unsubscribe(sub)
+
+    # ------------------- 发布（请求路径） -------------------
+    def _publish(
+        self,
+        source: str,
+        key: Optional[str],
+        conversation_id: Optional[str],
+        build_payload,
+    ):
+        if not self._subscribers:
+            return
+        message = None
+        for sub in list(self._subscribers.values()):
+            if not sub.matches(source, key, conversation_id):
+                continue
+            if message is None:
+                message = json.dumps(
+                    {"source": source, "type": key, "data": build_payload()},
+                    ensure_ascii=False,
+                )
+            if not sub.offer(message):
+                logger.warning(f"事件订阅者 #{sub.id} 消费过慢，已断开")
+                self.disconnected += 1
+                self.unsubscribe(sub)
+        if message is not None:
+            self.published += 1
+
+    def publish_callback_event(self, event: Any):
+        self._publish(SOURCE_CALLBACK, event.event_type, None, lambda: event.raw)
+
+    def publish_robot_message(self, event: Any):
+        self._publish(
+            SOURCE_ROBOT, event.msgtype, event.conversation_id, lambda: event.raw
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "disconnected": self.disconnected,
+            "details": [sub.stats() for sub in self._subscribers.values()],
+        }
@@ -0,0 +1,326 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 哨兵对象：通知写线程退出
+_STOP = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS callback_events (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_type  TEXT,
+    corp_id     TEXT,
+    received_at REAL NOT NULL,
+    payload     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cb_event_type ON callback_events(event_type, received_at);
+CREATE INDEX IF NOT EXISTS idx_cb_corp_id ON callback_events(corp_id, received_at);
+CREATE INDEX IF NOT EXISTS idx_cb_received_at ON callback_events(received_at);
+
+CREATE TABLE IF NOT EXISTS robot_messages (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    msg_id          TEXT,
+    msgtype         TEXT,
+    corp_id         TEXT,
+    conversation_id TEXT,
+    sender_id       TEXT,
+    created_at      INTEGER,
+    received_at     REAL NOT NULL,
+    payload         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rm_conversation ON robot_messages(conversation_id, received_at);
+CREATE INDEX IF NOT EXISTS idx_rm_sender ON robot_messages(sender_id, received_at);
+CREATE INDEX IF NOT EXISTS idx_rm_corp_id ON robot_messages(corp_id, received_at);
+CREATE INDEX IF NOT EXISTS idx_rm_received_at ON robot_messages(received_at);
+"""
+
+
+class EventStore:
+    """
+    基于 SQLite (WAL) 的嵌入式事件存储
+
+    - 请求路径只做一次非阻塞入队（queue.put_nowait），不产生任何磁盘IO
+    - 后台写线程批量取出事件，在同一个事务中组提交（group commit）
+    - 查询使用独立的只读连接，WAL 模式下读写互不阻塞
+    - 保留策略：写线程定期删除超过保留天数的记录，并限制每张表的总行数，磁盘占用有上限
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 500,
+        flush_interval_ms: int = 200,
+        queue_size: int = 100000,
+        retention_days: float = 7,
+        max_rows: int = 1000000,
+        sweep_interval: float = 60.0,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.retention_seconds = retention_days * 86400
+        self.max_rows = max_rows
+        self.sweep_interval = sweep_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._local = threading.local()
+
+        # 统计信息
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.expired = 0
+
+    # ------------------- 生命周期 -------------------
+    def start(self):
+        """建表并启动后台写线程"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.close()
+
+        self._thread = threading.Thread(
+            target=self._writer_loop, name="event-store-writer", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"事件存储已启动: {self.path}")
+
+    def stop(self, timeout: float = 10.0):
+        """通知写线程刷完剩余事件后退出"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info(f"事件存储已关闭，累计写入 {self.written} 条")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ------------------- 写入（请求路径） -------------------
+    def _enqueue(self, item: tuple):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def add_callback_event(self, event: Any):
+        """记录一条解密后的回调事件（CallbackEvent）"""
+        self._enqueue(("callback", event.received_at, event))
+
+    def add_robot_message(self, event: Any):
+        """记录一条机器人消息（RobotEvent，原始负载已是 JSON，写线程中无需再序列化）"""
+        self._enqueue(("robot", event.received_at, event))
+
+    # ------------------- 后台写线程 -------------------
+    def _writer_loop(self):
+        conn = self._connect()
+        last_sweep = 0.0
+        running = True
+        while running:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=1.0))
+            except queue.Empty:
+                pass
+            deadline = time.monotonic() + self.flush_interval
+            # 在时间窗口内尽量攒满一批，再统一提交
+            while batch and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = (
+                        self._queue.get(timeout=remaining)
+                        if remaining > 0
+                        else self._queue.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            if _STOP in batch:
+                batch = [item for item in batch if item is not _STOP]
+                running = False
+            if batch:
+                self._write_batch(conn, batch)
+            if time.monotonic() - last_sweep >= self.sweep_interval:
+                self._sweep(conn)
+                last_sweep = time.monotonic()
+        conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[tuple]):
+        callback_rows = []
+        robot_rows = []
+        for kind, received_at, data in batch:
+            try:
+                if kind == "callback":
+                    callback_rows.append(self._callback_row(received_at, data))
+                else:
+                    robot_rows.append(self._robot_row(received_at, data))
+            except Exception as e:
+                logger.error(f"事件序列化失败，已跳过: {e}")
+
+        try:
+            with conn:
+                if callback_rows:
+                    conn.executemany(
+                        "INSERT INTO callback_events "
+                        "(event_type, corp_id, received_at, payload) VALUES (?, ?, ?, ?)",
+                        callback_rows,
+                    )
+                if robot_rows:
+                    conn.executemany(
+                        "INSERT INTO robot_messages "
+                        "(msg_id, msgtype, corp_id, conversation_id, sender_id, "
+                        "created_at, received_at, payload) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        robot_rows,
+                    )
+            self.written += len(callback_rows) + len(robot_rows)
+            self.batches += 1
+        except sqlite3.Error as e:
+            logger.error(f"事件批量写入失败（{len(batch)} 条）: {e}")
+
+    def _sweep(self, conn: sqlite3.Connection):
+        """按保留天数与最大行数删除旧记录（行ID单调递增，按ID截断即按时间截断）"""
+        deleted = 0
+        try:
+            # 表名为固定白名单
+            for table in ("callback_events", "robot_messages"):
+                expired_sql = (
+                    f"SELECT max(id) FROM {table} WHERE received_at < ?"  # nosec B608
+                )
+                row = conn.execute(
+                    expired_sql, (time.time() - self.retention_seconds,)
+                ).fetchone()
+                cutoff = row[0] or 0
+                max_id_sql = f"SELECT max(id) FROM {table}"  # nosec B608
+                max_id = conn.execute(max_id_sql).fetchone()[0] or 0
+                cutoff = max(cutoff, max_id - self.max_rows)
+                if cutoff <= 0:
+                    continue
+                delete_sql = f"DELETE FROM {table} WHERE id <= ?"  # nosec B608
+                with conn:
+                    deleted += conn.execute(delete_sql, (cutoff,)).rowcount
+        except sqlite3.Error as e:
+            logger.error(f"事件存储清理失败: {e}")
+        if deleted:
+            self.expired += deleted
+            logger.info(f"事件存储保留策略清理 {deleted} 条")
+
+    @staticmethod
+    def _callback_row(received_at: float, event: Any) -> tuple:
+        return (
+            event.event_type,
+            event.corp_id,
+            received_at,
+            event.raw_json.decode(),
+        )
+
+    @staticmethod
+    def _robot_row(received_at: float, event: Any) -> tuple:
+        return (
+            event.msg_id,
+            event.msgtype,
+            event.corp_id,
+            event.conversation_id,
+            event.sender_id,
+            event.created_at,
+            received_at,
+            event.raw_json.decode(),
+        )
+
+    # ------------------- 查询 -------------------
+    def _reader(self) -> sqlite3.Connection:
+        """每个线程复用一条只读连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _build_where(filters: Dict[str, Any], since, until) -> tuple:
+        clauses, params = [], []
+        for column, value in filters.items():
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("received_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("received_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def query_events(
+        self,
+        event_type: Optional[str] = None,
+        corp_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """按事件类型、企业ID和时间范围查询回调事件（最新在前）"""
+        where, params = self._build_where(
+            {"event_type": event_type, "corp_id": corp_id}, since, until
+        )
+        sql = (
+            f"SELECT id, event_type, corp_id, received_at, payload "
+            f"FROM callback_events {where} ORDER BY received_at DESC LIMIT ?"
+        )  # nosec B608 - 列名为固定白名单
+        rows = self._reader().execute(sql, (*params, limit)).fetchall()
+        return [{**dict(row), "payload": json.loads(row["payload"])} for row in rows]
+
+    def query_messages(
+        self,
+        conversation_id: Optional[str] = None,
+        sender_id: Optional[str] = None,
+        corp_id: Optional[str] = None,
+        msgtype: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """按会话、发送者、企业ID和时间范围查询机器人消息（最新在前）"""
+        where, params = self._build_where(
+            {
+                "conversation_id": conversation_id,
+                "sender_id": sender_id,
+                "corp_id": corp_id,
+                "msgtype": msgtype,
+            },
+            since,
+            until,
+        )
+        sql = (
+            f"SELECT id, msg_id, msgtype, corp_id, conversation_id, sender_id, "
+            f"created_at, received_at, payload "
+            f"FROM robot_messages {where} ORDER BY received_at DESC LIMIT ?"
+        )  # nosec B608 - 列名为固定白名单
+        rows = self._reader().execute(sql, (*params, limit)).fetchall()
+        return [{**dict(row), "payload": json.loads(row["payload"])} for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "expired": self.expired,
+        }
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+# 可重试的 4xx：请求超时、被限流；其余 4xx 说明批次本身被下游拒绝，重发也不会成功
+RETRYABLE_CLIENT_ERRORS = (408, 429)
+
+
+def _to_payload(event: tuple) -> Dict[str, Any]:
+    """在后台任务中解析紧凑事件的原始负载，避免占用请求路径"""
+    source, data = event
+    return {"source": source, "data": data.raw}
+
+
+class CircuitBreaker:
+    """
+    简单的熔断器：连续失败达到阈值后打开，冷却期结束后进入半开状态放行一次探测
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.state = self.HALF_OPEN
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.state = self.CLOSED
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class Destination:
+    """单个转发目标：独立的有界缓冲区、批处理任务、重试与熔断"""
+
+    def __init__(
+        self,
+        url: str,
+        client: httpx.AsyncClient,
+        batch_size: int,
+        batch_interval: float,
+        max_retries: int,
+        backoff_base: float,
+        queue_size: int,
+        breaker: CircuitBreaker,
+    ):
+        self.url = url
+        self.client = client
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.breaker = breaker
+        # 元素为 (入队时间, (来源, 事件))；满时丢弃最旧的事件
+        self.buffer: deque = deque(maxlen=queue_size)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # 统计信息
+        self.sent_events = 0
+        self.sent_batches = 0
+        self.failed_batches = 0
+        self.rejected_batches = 0
+        self.rejected_events = 0
+        self.dropped = 0
+        self._started_at = time.monotonic()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name=f"forwarder:{self.url}")
+
+    async def stop(self, timeout: float):
+        """尽力在超时时间内把缓冲区发送完，然后停止后台任务"""
+        if self._task is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self.buffer and time.monotonic() < deadline and self.breaker.allow():
+            self._wakeup.set()
+            await asyncio.sleep(0.05)
+        # 等待任务真正退出：发送中被取消的批次会先放回缓冲区
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self.buffer:
+            logger.warning(f"转发至 {self.url} 停止时仍有 {len(self.buffer)} 条未发送")
+
+    def offer(self, event: tuple):
+        """非阻塞入队（请求路径）"""
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append((time.monotonic(), event))
+        if len(self.buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            # 凑满 batch_size 条或等待 batch_interval 后发送一批
+            if len(self.buffer) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.batch_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            if not self.buffer:
+                continue
+            if not self.breaker.allow():
+                await asyncio.sleep(self.batch_interval)
+                continue
+
+            n = min(self.batch_size, len(self.buffer))
+            batch = [self.buffer.popleft() for _ in range(n)]
+            payload = [_to_payload(event) for _, event in batch]
+            try:
+                sent = await self._send_with_retry(payload)
+            except asyncio.CancelledError:
+                self._requeue(batch)
+                raise
+            if not sent:
+                # 发送失败：放回队首，等待熔断器恢复后重发
+                self._requeue(batch)
+
+    def _requeue(self, batch: List[tuple]):
+        """
+        把未发送成功的批次放回队首。批次中的事件比缓冲区中的都旧，
+        放不下时与 offer() 一致丢弃最旧的部分（直接 extendleft 会从右端挤掉最新的事件）
+        """
+        overflow = len(self.buffer) + len(batch) - self.buffer.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+            batch = batch[overflow:]
+        self.buffer.extendleft(reversed(batch))
+
+    async def _send_with_retry(self, events: List[Dict[str, Any]]) -> bool:
+        """
+        发送一批事件，返回 False 表示需要放回队首稍后重发。
+        下游以不可重试的 4xx 拒绝时不再重发，计入 rejected 后丢弃该批次
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = await self.client.post(self.url, json=events)
+                resp.raise_for_status()
+                self.breaker.record_success()
+                self.sent_events += len(events)
+                self.sent_batches += 1
+                return True
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if 400 <= status < 500 and status not in RETRYABLE_CLIENT_ERRORS:
+                    # 下游可达，只是拒绝了这批数据：不计入熔断
+                    self.breaker.record_success()
+                    self.rejected_batches += 1
+                    self.rejected_events += len(events)
+                    logger.error(
+                        f"转发至 {self.url} 被拒绝（HTTP {status}），丢弃该批 {len(events)} 条"
+                    )
+                    return True
+                self.breaker.record_failure()
+                logger.warning(
+                    f"转发至 {self.url} 失败（第 {attempt + 1} 次，{len(events)} 条）: {e}"
+                )
+                if not self.breaker.allow():
+                    break
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.backoff_base * (2**attempt))
+            except (httpx.HTTPError, OSError) as e:
+                self.breaker.record_failure()
+                logger.warning(
+                    f"转发至 {self.url} 失败（第 {attempt + 1} 次，{len(events)} 条）: {e}"
+                )
+                if not self.breaker.allow():
+                    break
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.backoff_base * (2**attempt))
+        self.failed_batches += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        elapsed = max(now - self._started_at, 1e-6)
+        # 延迟取缓冲区中最旧事件的等待时间；缓冲区为空即没有积压
+        lag_ms = (now - self.buffer[0][0]) * 1000 if self.buffer else 0.0
+        return {
+            "url": self.url,
+            "breaker": self.breaker.state,
+            "queued": len(self.buffer),
+            "sent_events": self.sent_events,
+            "sent_batches": self.sent_batches,
+            "failed_batches": self.failed_batches,
+            "rejected_batches": self.rejected_batches,
+            "rejected_events": self.rejected_events,
+            "dropped": self.dropped,
+            "avg_batch_size": (
+                round(self.sent_events / self.sent_batches, 2)
+                if self.sent_batches
+                else 0
+            ),
+            "throughput_eps": round(self.sent_events / elapsed, 2),
+            "lag_ms": round(lag_ms, 2),
+        }
+
+
+class EventForwarder:
+    """
+    事件批量转发器：把回调事件和机器人消息转发到内部 HTTP 接口
+
+    - 所有目标共享一个带连接池的 httpx.AsyncClient（keep-alive）
+    - 每个目标按 N 条或 T 毫秒微批发送，失败时指数退避重试并熔断
+    - 请求路径只做 deque.append，下游宕机不会阻塞 ding_callback
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        batch_size: int = 100,
+        batch_interval_ms: int = 200,
+        max_retries: int = 3,
+        backoff_ms: int = 200,
+        queue_size: int = 10000,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0,
+        timeout: float = 5.0,
+    ):
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+        self.destinations = [
+            Destination(
+                url=url,
+                client=self.client,
+                batch_size=batch_size,
+                batch_interval=batch_interval_ms / 1000,
+                max_retries=max_retries,
+                backoff_base=backoff_ms / 1000,
+                queue_size=queue_size,
+                breaker=CircuitBreaker(breaker_threshold, breaker_cooldown),
+            )
+            for url in urls
+        ]
+
+    def start(self):
+        for dest in self.destinations:
+            dest.start()
+        logger.info(f"事件转发器已启动，目标数 {len(self.destinations)}")
+
+    async def stop(self, timeout: float = 5.0):
+        await asyncio.gather(*(dest.stop(timeout) for dest in self.destinations))
+        await self.client.aclose()
+
+    def _forward(self, event: tuple):
+        for dest in self.destinations:
+            dest.offer(event)
+
+    def forward_callback_event(self, event: Any):
+        self._forward(("callback", event))
+
+    def forward_robot_message(self, event: Any):
+        self._forward(("robot", event))
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [dest.stats() for dest in self.destinations]
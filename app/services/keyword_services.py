@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+from app.schemas.ding_robot import MsgType
+from app.utils.aho_corasick import AhoCorasick
+
+logger = logging.getLogger(__name__)
+
+
+def iter_message_texts(body: Any) -> Iterator[Tuple[str, str]]:
+    """提取机器人消息中需要扫描的文本：(字段路径, 文本)"""
+    if body.msgtype == MsgType.TEXT.value:
+        if body.text.content:
+            yield "text.content", body.text.content
+    elif body.msgtype == MsgType.AUDIO.value:
+        if body.content.recognition:
+            yield "content.recognition", body.content.recognition
+    elif body.msgtype == MsgType.RICH_TEXT.value:
+        for i, item in enumerate(body.content.richText or ()):
+            text = getattr(item, "text", None)
+            if text:
+                yield f"content.richText[{i}].text", text
+
+
+class KeywordScanner:
+    """
+    机器人消息关键词 / 敏感词扫描
+
+    - 词典文件每行一个词，可用 Tab 分隔附加分类（如 "词语\\t涉政"），# 开头为注释
+    - 基于 Aho-Corasick 自动机单遍扫描，耗时与消息长度成正比，与词典规模无关
+    - 热更新：后台检测词典文件修改时间，在线程中重建自动机后整体替换引用，
+      扫描中的请求继续使用旧自动机，不会看到构建到一半的状态
+    """
+
+    def __init__(self, path: str, ignore_case: bool = True):
+        self.path = path
+        self.ignore_case = ignore_case
+        # (自动机, 各词分类)：作为一个整体替换
+        self._index: Tuple[AhoCorasick, List[str]] = (AhoCorasick((), ignore_case), [])
+        self._mtime = 0.0
+        self.loaded_at = 0.0
+        self.build_ms = 0.0
+        self.scanned = 0
+        self.hits = 0
+
+    def _build(self) -> Tuple[AhoCorasick, List[str], float]:
+        """读取词典并构建自动机（在线程中执行）"""
+        mtime = os.path.getmtime(self.path)
+        words: Dict[str, str] = {}
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.rstrip("\r\n")
+                if not line.strip() or line.lstrip().startswith("#"):
+                    continue
+                word, _, category = line.partition("\t")
+                word = word.strip()
+                if word:
+                    words.setdefault(word, category.strip())
+        automaton = AhoCorasick(words, self.ignore_case)
+        categories = [words[p] for p in automaton.patterns]
+        return automaton, categories, mtime
+
+    async def reload(self, force: bool = False) -> bool:
+        """词典有变化（或强制）时重建并原子替换自动机；返回是否发生了替换"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        if not force and os.path.getmtime(self.path) == self._mtime:
+            return False
+        start = time.perf_counter()
+        automaton, categories, mtime = await asyncio.to_thread(self._build)
+        # 单次赋值替换整个索引，扫描方不会读到新旧混合的状态
+        self._index = (automaton, categories)
+        self._mtime = mtime
+        self.loaded_at = time.time()
+        self.build_ms = round((time.perf_counter() - start) * 1000, 2)
+        logger.info(f"关键词词典已加载: {len(automaton)} 个词，耗时 {self.build_ms}ms")
+        return True
+
+    async def run_reloader(self, interval: float):
+        """后台任务：周期性检查词典文件并热更新"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"关键词词典重新加载失败，继续使用旧词典: {e}")
+
+    def scan_text(self, text: str) -> List[Dict[str, Any]]:
+        automaton, categories = self._index
+        return [
+            {
+                "word": automaton.patterns[index],
+                "category": categories[index],
+                "start": start,
+                "end": end,
+            }
+            for start, end, index in automaton.scan(text)
+        ]
+
+    def scan_message(self, body: Any) -> List[Dict[str, Any]]:
+        """扫描一条机器人消息，命中项附带所在字段与位置（end 为开区间）"""
+        matches = []
+        for field, text in iter_message_texts(body):
+            for match in self.scan_text(text):
+                match["field"] = field
+                matches.append(match)
+        self.scanned += 1
+        if matches:
+            self.hits += 1
+        return matches
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "words": len(self._index[0]),
+            "loaded_at": self.loaded_at,
+            "build_ms": self.build_ms,
+            "scanned": self.scanned,
+            "hits": self.hits,
+        }
@@ -0,0 +1,308 @@
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# 哨兵对象：通知写线程退出
+_STOP = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id                 INTEGER PRIMARY KEY AUTOINCREMENT,
+    msg_id             TEXT,
+    conversation_id    TEXT,
+    conversation_title TEXT,
+    sender_id          TEXT,
+    sender_nick        TEXT,
+    created_at         INTEGER,
+    received_at        REAL NOT NULL,
+    text               TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_msg_conversation ON messages(conversation_id, received_at);
+CREATE INDEX IF NOT EXISTS idx_msg_sender ON messages(sender_id, received_at);
+CREATE INDEX IF NOT EXISTS idx_msg_received_at ON messages(received_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(tokens, chars);
+"""
+
+# 中日韩统一表意文字及常用扩展、假名、谚文
+_CJK = r"぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[^\W{_CJK}]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    面向中文的分词：连续的中日韩字符切成重叠的二元组（单字保留为一元），
+    其他文字按单词切分并转小写。索引与查询使用同一套规则
+    """
+    tokens = []
+    for run in _TOKEN_RE.findall(text):
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run.lower())
+    return tokens
+
+
+def cjk_chars(text: str) -> str:
+    """去重后的中日韩单字，单独成列以支持单字检索"""
+    return " ".join(dict.fromkeys(_CJK_RE.findall(text)))
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    把用户输入转换为 FTS5 MATCH 表达式：空格分隔的词之间为 AND，
+    每个词的二元组构成短语（即子串匹配）；单个汉字查单字列
+    """
+    parts = []
+    for term in query.split():
+        tokens = tokenize(term)
+        if not tokens:
+            continue
+        if len(tokens) == 1 and len(tokens[0]) == 1 and _CJK_RE.match(tokens[0]):
+            parts.append(f'chars : "{tokens[0]}"')
+        else:
+            parts.append(f'tokens : "{" ".join(tokens)}"')
+    return " AND ".join(parts) or None
+
+
+class MessageSearchIndex:
+    """
+    机器人消息全文索引（SQLite FTS5，独立数据库文件）
+
+    - 只索引有文本的消息（文本、语音识别结果、富文本中的文字段）
+    - 请求路径只做一次非阻塞入队；后台写线程分批提交，分词也在写线程中进行
+    - 保留策略：定期删除超过保留天数的消息，并限制总行数，磁盘占用有上限
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 500,
+        flush_interval_ms: int = 500,
+        queue_size: int = 50000,
+        retention_days: float = 30,
+        max_rows: int = 1000000,
+        sweep_interval: float = 60.0,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.retention_seconds = retention_days * 86400
+        self.max_rows = max_rows
+        self.sweep_interval = sweep_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._local = threading.local()
+
+        # 统计信息
+        self.indexed = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.expired = 0
+
+    # ------------------- 生命周期 -------------------
+    def start(self):
+        """建表并启动后台写线程"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.close()
+
+        self._thread = threading.Thread(
+            target=self._writer_loop, name="message-index-writer", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"消息全文索引已启动: {self.path}")
+
+    def stop(self, timeout: float = 10.0):
+        """通知写线程提交剩余消息后退出"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info(f"消息全文索引已关闭，累计索引 {self.indexed} 条")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ------------------- 写入（请求路径） -------------------
+    def add_robot_message(self, event: Any):
+        """索引一条机器人消息（RobotEvent，文本已在入口处提取）"""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    # ------------------- 后台写线程 -------------------
+    def _writer_loop(self):
+        conn = self._connect()
+        last_sweep = 0.0
+        running = True
+        while running:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=1.0))
+            except queue.Empty:
+                pass
+            deadline = time.monotonic() + self.flush_interval
+            while batch and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = (
+                        self._queue.get(timeout=remaining)
+                        if remaining > 0
+                        else self._queue.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            if _STOP in batch:
+                batch = [item for item in batch if item is not _STOP]
+                running = False
+            if batch:
+                self._write_batch(conn, batch)
+            if time.monotonic() - last_sweep >= self.sweep_interval:
+                self._sweep(conn)
+                last_sweep = time.monotonic()
+        conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[tuple]):
+        rows = []
+        for event in batch:
+            text = event.text
+            if not text:
+                self.skipped += 1
+                continue
+            rows.append(
+                (
+                    (
+                        event.msg_id,
+                        event.conversation_id,
+                        event.conversation_title,
+                        event.sender_id,
+                        event.sender_nick,
+                        event.created_at,
+                        event.received_at,
+                        text,
+                    ),
+                    " ".join(tokenize(text)),
+                    cjk_chars(text),
+                )
+            )
+        if not rows:
+            return
+        try:
+            with conn:
+                for row, tokens, chars in rows:
+                    cursor = conn.execute(
+                        "INSERT INTO messages (msg_id, conversation_id, "
+                        "conversation_title, sender_id, sender_nick, created_at, "
+                        "received_at, text) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        row,
+                    )
+                    conn.execute(
+                        "INSERT INTO messages_fts (rowid, tokens, chars) "
+                        "VALUES (?, ?, ?)",
+                        (cursor.lastrowid, tokens, chars),
+                    )
+            self.indexed += len(rows)
+        except sqlite3.Error as e:
+            logger.error(f"消息索引批量写入失败（{len(rows)} 条）: {e}")
+
+    def _sweep(self, conn: sqlite3.Connection):
+        """按保留天数与最大行数删除旧消息（行ID单调递增，按ID截断即按时间截断）"""
+        try:
+            row = conn.execute(
+                "SELECT max(id) FROM messages WHERE received_at < ?",
+                (time.time() - self.retention_seconds,),
+            ).fetchone()
+            cutoff = row[0] or 0
+            max_id = conn.execute("SELECT max(id) FROM messages").fetchone()[0] or 0
+            cutoff = max(cutoff, max_id - self.max_rows)
+            if cutoff <= 0:
+                return
+            with conn:
+                deleted = conn.execute(
+                    "DELETE FROM messages WHERE id <= ?", (cutoff,)
+                ).rowcount
+                conn.execute("DELETE FROM messages_fts WHERE rowid <= ?", (cutoff,))
+            if deleted:
+                self.expired += deleted
+                logger.info(f"消息索引保留策略清理 {deleted} 条")
+        except sqlite3.Error as e:
+            logger.error(f"消息索引清理失败: {e}")
+
+    # ------------------- 查询 -------------------
+    def _reader(self) -> sqlite3.Connection:
+        """每个线程复用一条只读连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def search(
+        self,
+        query: str,
+        conversation_id: Optional[str] = None,
+        sender_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """全文检索，可按会话、发送者与时间范围过滤（最新在前）"""
+        match = build_match_query(query)
+        if match is None:
+            return []
+        clauses, params = ["messages_fts MATCH ?"], [match]
+        for column, value in (
+            ("m.conversation_id", conversation_id),
+            ("m.sender_id", sender_id),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("m.received_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("m.received_at < ?")
+            params.append(until)
+        sql = (
+            f"SELECT m.id, m.msg_id, m.conversation_id, m.conversation_title, "
+            f"m.sender_id, m.sender_nick, m.created_at, m.received_at, m.text "
+            f"FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+            f"WHERE {' AND '.join(clauses)} ORDER BY m.received_at DESC LIMIT ?"
+        )  # nosec B608 - 列名为固定白名单
+        rows = self._reader().execute(sql, (*params, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "queued": self._queue.qsize(),
+            "indexed": self.indexed,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "expired": self.expired,
+        }
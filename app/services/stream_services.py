@@ -0,0 +1,284 @@
+import asyncio
+import json
+import logging
+import random
+import socket
+from typing import TYPE_CHECKING, Any, Dict, Optional, Set
+
+import httpx
+from pydantic import ValidationError
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed, WebSocketException
+
+from app.core.tracing import request_id_var, tracer
+from app.schemas.ding_robot import robot_request_adapter
+from app.services.ding_http_callback_services import process_callback_event
+from app.services.ding_robot_services import handle_robot_logic
+
+if TYPE_CHECKING:
+    from app.core.context import AppContext
+
+logger = logging.getLogger(__name__)
+
+# 机器人消息在 Stream 模式下的订阅主题
+ROBOT_TOPIC = "/v1.0/im/bot/messages/get"
+
+
+def _local_ip() -> str:
+    try:
+        return socket.gethostbyname(socket.gethostname())
+    except OSError:
+        return "127.0.0.1"
+
+
+class DingStreamClient:
+    """
+    钉钉 Stream 模式接入客户端
+
+    通过一条长连接 WebSocket 接收事件和机器人消息，替代逐条 HTTP 回调：
+    - 先调用网关 connections/open 获取 endpoint + ticket，再建立 WebSocket
+    - SYSTEM 消息：ping 原样回复，disconnect 触发重连
+    - EVENT / CALLBACK 消息：转换后交给与 HTTP 路由相同的处理函数，处理完成后 ack；
+      应用排空期间直接以错误码应答，不再处理
+    - 流控：同时处理中的消息数受 max_inflight 限制，达到上限时暂停读取 socket
+    - 断线后按指数退避（带抖动）重连
+    """
+
+    def __init__(
+        self,
+        context: "AppContext",
+        client_id: str,
+        client_secret: str,
+        gateway_url: str,
+        max_inflight: int = 64,
+        reconnect_max: float = 60.0,
+    ):
+        self.context = context
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.gateway_url = gateway_url
+        self.reconnect_max = reconnect_max
+        self._inflight = asyncio.Semaphore(max_inflight)
+        self._task: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        # 统计信息
+        self.connected = False
+        self.connects = 0
+        self.received = 0
+        self.acked = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.rejected_draining = 0
+
+    # ------------------- 生命周期 -------------------
+    def start(self):
+        self._task = asyncio.create_task(self._run_forever(), name="ding-stream")
+        logger.info(f"钉钉 Stream 模式已启动，网关: {self.gateway_url}")
+
+    async def stop(self, timeout: float = 5.0):
+        """
+        先在超时时间内等待处理中的消息完成并 ack（连接保持打开），
+        超时仍未完成的处理任务被取消（不 ack，由网关重新投递），最后关闭连接
+        """
+        if self._tasks:
+            _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+            if pending:
+                logger.warning(
+                    f"Stream 停止时仍有 {len(pending)} 条消息未处理完，已取消"
+                )
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.error(f"钉钉 Stream 任务异常退出: {e}", exc_info=True)
+            self._task = None
+        logger.info("钉钉 Stream 模式已停止")
+
+    async def _run_forever(self):
+        attempt = 0
+        while True:
+            try:
+                endpoint = await self._open_connection()
+                async with connect(endpoint, max_queue=1) as ws:
+                    self.connected = True
+                    self.connects += 1
+                    attempt = 0
+                    logger.info("钉钉 Stream 连接已建立")
+                    await self._receive_loop(ws)
+            except asyncio.CancelledError:
+                raise
+            except (WebSocketException, OSError, httpx.HTTPError, ValueError) as e:
+                # WebSocketException 包括握手被拒（ticket 无效或过期）、地址非法、连接断开
+                logger.warning(f"钉钉 Stream 连接异常: {e}")
+            except Exception as e:
+                # 未预料的异常同样进入退避重连，不能让重连任务就此退出
+                logger.error(f"钉钉 Stream 连接意外失败: {e}", exc_info=True)
+            finally:
+                self.connected = False
+
+            # 指数退避 + 抖动，避免大量实例同时重连
+            jitter = random.uniform(0.5, 1.0)  # nosec B311
+            delay = min(self.reconnect_max, 2**attempt) * jitter
+            attempt += 1
+            logger.info(f"{delay:.1f}s 后重连钉钉 Stream")
+            await asyncio.sleep(delay)
+
+    async def _open_connection(self) -> str:
+        """调用网关注册连接，返回带 ticket 的 WebSocket 地址"""
+        payload = {
+            "clientId": self.client_id,
+            "clientSecret": self.client_secret,
+            "subscriptions": [
+                {"type": "EVENT", "topic": "*"},
+                {"type": "CALLBACK", "topic": ROBOT_TOPIC},
+            ],
+            "ua": "dingtalk-http/0.1.0",
+            "localIp": _local_ip(),
+        }
+        api = self.context.dingtalk_api
+        if api is not None:
+            # 经由共享的 API 客户端调用，与其他出站接口共用 QPS 预算和连接池
+            data = await api.open_stream_connection(self.gateway_url, payload)
+        else:
+            async with httpx.AsyncClient(timeout=10) as client:
+                resp = await client.post(self.gateway_url, json=payload)
+                resp.raise_for_status()
+                data = resp.json()
+        if not data.get("endpoint") or not data.get("ticket"):
+            raise ValueError(f"网关返回数据不完整: {data}")
+        return f"{data['endpoint']}?ticket={data['ticket']}"
+
+    # ------------------- 消息处理 -------------------
+    async def _receive_loop(self, ws):
+        async for raw in ws:
+            # 单个无法解析的帧只丢弃该帧，不断开整个连接
+            try:
+                message = json.loads(raw)
+            except ValueError as e:
+                self.failed += 1
+                logger.error(f"Stream 帧不是有效的 JSON，已丢弃: {e}")
+                continue
+            if not isinstance(message, dict):
+                self.failed += 1
+                logger.error(f"Stream 帧格式错误，已丢弃: {str(raw)[:200]}")
+                continue
+            msg_type = message.get("type")
+            topic = message.get("headers", {}).get("topic")
+
+            if msg_type == "SYSTEM":
+                if topic == "ping":
+                    await self._send(ws, self._ack(message, message.get("data")))
+                elif topic == "disconnect":
+                    logger.info("钉钉 Stream 服务端要求断开，准备重连")
+                    return
+                continue
+
+            if not self.context.accepting:
+                # 排空期间不再处理新消息：以错误码应答，由网关重新投递（可能投递到其他实例）
+                self.rejected_draining += 1
+                await self._send(
+                    ws, self._ack(message, "Service is draining", code=503)
+                )
+                continue
+
+            # 流控：处理中的消息达到上限时，在此阻塞，不再读取 socket
+            await self._inflight.acquire()
+            self.received += 1
+            task = asyncio.create_task(self._handle(ws, message))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _handle(self, ws, message: Dict[str, Any]):
+        headers = message.get("headers", {})
+        message_id = headers.get("messageId", "")
+        token = request_id_var.set(message_id)
+        trace = tracer.start_trace(f"STREAM {headers.get('topic')}", message_id)
+        try:
+            data = json.loads(message.get("data") or "{}")
+            if message.get("type") == "EVENT":
+                # 转换为与 HTTP 回调解密后一致的事件结构
+                event_data = {
+                    "EventType": headers.get("eventType"),
+                    "CorpId": headers.get("eventCorpId"),
+                    **data,
+                }
+                process_callback_event(event_data, self.context)
+                result = {"status": "SUCCESS", "message": "success"}
+            elif headers.get("topic") == ROBOT_TOPIC:
+                limiter = self.context.robot_limiter
+                field = limiter.check(data) if limiter is not None else None
+                if field is not None:
+                    # 与 HTTP 接入共用限流预算；以错误码应答，由网关稍后重新投递
+                    self.rate_limited += 1
+                    logger.warning(
+                        f"Stream 机器人消息触发限流: {field}={data.get(field)}"
+                    )
+                    await self._send(
+                        ws, self._ack(message, f"Rate limited by {field}", code=429)
+                    )
+                    return
+                body = robot_request_adapter.validate_python(data)
+                await handle_robot_logic(body, context=self.context)
+                result = {"response": None}
+            else:
+                logger.info(f"收到未处理的 Stream 消息: {headers.get('topic')}")
+                result = {"response": None}
+            await self._send(ws, self._ack(message, json.dumps(result)))
+            self.acked += 1
+        except (ValidationError, json.JSONDecodeError) as e:
+            self.failed += 1
+            if trace is not None:
+                trace.error = type(e).__name__
+            logger.error(f"Stream 消息格式错误: {e}")
+            await self._send(ws, self._ack(message, str(e), code=400))
+        except Exception as e:
+            self.failed += 1
+            if trace is not None:
+                trace.error = type(e).__name__
+            logger.error(f"Stream 消息处理失败: {e}", exc_info=True)
+            await self._send(ws, self._ack(message, str(e), code=500))
+        finally:
+            tracer.finish_trace(trace)
+            request_id_var.reset(token)
+            self._inflight.release()
+
+    @staticmethod
+    def _ack(message: Dict[str, Any], data: Any, code: int = 200) -> str:
+        headers = message.get("headers", {})
+        return json.dumps(
+            {
+                "code": code,
+                "headers": {
+                    "contentType": "application/json",
+                    "messageId": headers.get("messageId"),
+                },
+                "message": "OK" if code == 200 else "error",
+                "data": data,
+            }
+        )
+
+    @staticmethod
+    async def _send(ws, text: str):
+        try:
+            await ws.send(text)
+        except ConnectionClosed:
+            logger.warning("Stream 连接已关闭，ack 未能发送")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "connects": self.connects,
+            "received": self.received,
+            "acked": self.acked,
+            "failed": self.failed,
+            "rate_limited": self.rate_limited,
+            "rejected_draining": self.rejected_draining,
+            "inflight": len(self._tasks),
+        }
@@ -60,7 +60,6 @@ class DingCallbackCrypto3:
         :return:
         """
         sign = self.generateSignature(nonce, timeStamp, self.token, content)
-        print(sign, msg_signature)
         if msg_signature != sign:
             raise ValueError("signature check error")
 
@@ -100,7 +99,6 @@ class DingCallbackCrypto3:
 
     ### 生成回调返回使用的签名值
     def generateSignature(self, nonce, timestamp, token, msg_encrypt):
-        print(type(nonce), type(timestamp), type(token), type(msg_encrypt))
         v = msg_encrypt
         signList = "".join(sorted([nonce, timestamp, token, v]))
         return hashlib.sha1(signList.encode()).hexdigest()  # nosec B324
@@ -0,0 +1,95 @@
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+def _fold(text: str) -> str:
+    """
+    逐字符小写化，保证结果与原文本等长（命中位置可直接用于原文本）。
+    str.lower() 会改变部分字符的长度（如 "İ".lower() 为两个字符），这类字符保持原样
+    """
+    if text.isascii():
+        return text.lower()
+    return "".join(lowered if len(lowered := ch.lower()) == 1 else ch for ch in text)
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick 多模式匹配自动机
+
+    构建时间与词典总长度成正比；扫描只需遍历文本一次，
+    耗时与文本长度（加上命中数）成正比，与词典大小无关。
+    构建完成后只读，可在多个协程/线程间共享。
+    """
+
+    __slots__ = ("patterns", "ignore_case", "_lengths", "_goto", "_fail", "_out")
+
+    def __init__(self, patterns: Iterable[str], ignore_case: bool = True):
+        self.ignore_case = ignore_case
+        self.patterns: List[str] = []
+        # 按匹配时使用的（大小写折叠后的）长度计算起始位置
+        self._lengths: List[int] = []
+        # 节点 i 的转移表 / 失败指针 / 命中的模式编号（含失败链上的输出）
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        seen = set()
+        for pattern in patterns:
+            key = _fold(pattern) if ignore_case else pattern
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            self._insert(key, len(self.patterns))
+            self.patterns.append(pattern)
+            self._lengths.append(len(key))
+        self._build_failure_links()
+
+    def _insert(self, key: str, index: int):
+        node = 0
+        goto = self._goto
+        for ch in key:
+            nxt = goto[node].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto[node][ch] = nxt
+                goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] = self._out[node] + (index,)
+
+    def _build_failure_links(self):
+        """广度优先计算失败指针，并把失败链上的输出合并到当前节点"""
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                queue.append(child)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[child] = target if target != child else 0
+                if out[fail[child]]:
+                    out[child] = out[child] + out[fail[child]]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def scan(self, text: str) -> List[Tuple[int, int, int]]:
+        """返回所有命中 (start, end, 模式编号)，end 为开区间，允许重叠"""
+        if self.ignore_case:
+            text = _fold(text)
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        matches = []
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                end = i + 1
+                for index in out[node]:
+                    matches.append((end - lengths[index], end, index))
+        return matches
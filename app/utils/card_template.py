@@ -0,0 +1,106 @@
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+# 占位符 ${name}：字符串值恰好为一个占位符时按 JSON 值替换（可为数字、对象等），
+# 否则作为字符串内容的一部分替换（转义后、不含引号）
+_PLACEHOLDER_RE = re.compile(r"\$\{(\w+)\}")
+
+# 片段类型
+_VALUE = 0
+_TEXT = 1
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class _Compiler:
+    """把模板结构编译为字面量片段与变量槽（只在构造模板时使用）"""
+
+    def __init__(self):
+        self.literals: List[str] = []
+        self.slots: List[Tuple[int, str]] = []
+        self._pending: List[str] = []
+
+    def finish(self) -> Tuple[List[str], List[Tuple[int, str]]]:
+        self.literals.append("".join(self._pending))
+        return self.literals, self.slots
+
+    def node(self, node: Any):
+        pending = self._pending
+        if isinstance(node, dict):
+            pending.append("{")
+            for i, (key, value) in enumerate(node.items()):
+                if i:
+                    pending.append(",")
+                self.string(str(key), whole_value=False)
+                pending.append(":")
+                self.node(value)
+            pending.append("}")
+        elif isinstance(node, (list, tuple)):
+            pending.append("[")
+            for i, value in enumerate(node):
+                if i:
+                    pending.append(",")
+                self.node(value)
+            pending.append("]")
+        elif isinstance(node, str):
+            self.string(node, whole_value=True)
+        else:
+            pending.append(_dumps(node))
+
+    def string(self, text: str, whole_value: bool):
+        match = _PLACEHOLDER_RE.fullmatch(text)
+        if whole_value and match:
+            self._slot(_VALUE, match.group(1))
+            return
+        pending = self._pending
+        pending.append('"')
+        pos = 0
+        for match in _PLACEHOLDER_RE.finditer(text):
+            pending.append(_dumps(text[pos : match.start()])[1:-1])
+            self._slot(_TEXT, match.group(1))
+            pos = match.end()
+        pending.append(_dumps(text[pos:])[1:-1])
+        pending.append('"')
+
+    def _slot(self, kind: int, name: str):
+        self.literals.append("".join(self._pending))
+        self._pending.clear()
+        self.slots.append((kind, name))
+
+
+class CardTemplate:
+    """
+    预编译的卡片模板
+
+    模板是任意 JSON 结构（通常是卡片回调的完整响应体），字符串中用 ${name} 标记变量。
+    构造时遍历一次模板结构，把它编译为“字面量片段 + 变量槽”（占位符在解析后的字符串上
+    识别，不对序列化后的文本做匹配，转义出来的引号不会被误认为模板的一部分），渲染时
+    只序列化变量值再拼接字符串，不再遍历和序列化整个卡片结构。
+    构建完成后只读，可在多个协程/线程间共享。
+    """
+
+    __slots__ = ("_literals", "_slots", "variables")
+
+    def __init__(self, template: Any):
+        compiler = _Compiler()
+        compiler.node(template)
+        self._literals, self._slots = compiler.finish()
+        self.variables = frozenset(name for _, name in self._slots)
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        """渲染为 JSON 文本；缺少变量时抛出 KeyError"""
+        literals = self._literals
+        parts = [literals[0]]
+        for i, (kind, name) in enumerate(self._slots):
+            value = variables[name]
+            if kind == _VALUE:
+                parts.append(json.dumps(value, ensure_ascii=False))
+            else:
+                if not isinstance(value, str):
+                    value = str(value)
+                parts.append(json.dumps(value, ensure_ascii=False)[1:-1])
+            parts.append(literals[i + 1])
+        return "".join(parts)
@@ -0,0 +1,76 @@
+"""
+批量消息发送压测：对本地替身服务比较“逐人发送”与 BulkSender 的耗时
+
+    python tests/bench_bulk_send.py --users 5000 --latency-ms 30 --qps 40
+
+替身服务在后台线程中启动，无需真实钉钉环境。
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import uvicorn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_dingtalk_server import create_app  # noqa: E402
+
+from app.services.bulk_send_services import BulkSender  # noqa: E402
+from app.services.dingtalk_api_services import DingTalkClient  # noqa: E402
+
+
+def start_fake_server(port: int, latency_ms: float, qps: int) -> uvicorn.Server:
+    config = uvicorn.Config(create_app(latency_ms, qps), port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def bench(args):
+    base_url = f"http://127.0.0.1:{args.port}"
+    api = DingTalkClient("key", "secret", base_url=base_url, api_base_url=base_url)
+    users = [f"user{i}" for i in range(args.users)]
+    msg = {"msgKey": "sampleText", "msgParam": {"content": "系统维护通知"}}
+
+    # 逐人发送（并发受同样的 QPS 预算约束），只取前 naive_users 人估算
+    naive = BulkSender(api, "robot", "1", qps=args.qps, concurrency=args.concurrency)
+    sample = users[: args.naive_users]
+    start = time.perf_counter()
+    await asyncio.gather(*(naive.send("robot", [([u], msg)]) for u in sample))
+    naive_rate = len(sample) / (time.perf_counter() - start)
+
+    bulk = BulkSender(api, "robot", "1", qps=args.qps, concurrency=args.concurrency)
+    # 模拟调用方按人生成消息：内容相同的会被合并
+    report = await bulk.send("robot", [([u], msg) for u in users])
+    bulk_rate = report["recipients"] / (report["elapsed_ms"] / 1000)
+
+    print(f"接收者: {args.users}，QPS 预算: {args.qps}，接口延迟: {args.latency_ms}ms")
+    print(f"逐人发送: {naive_rate:,.0f} 人/秒（样本 {len(sample)} 人）")
+    print(
+        f"批量发送: {bulk_rate:,.0f} 人/秒，{report['requests']} 次调用，"
+        f"耗时 {report['elapsed_ms'] / 1000:.2f}s，结果 {report['summary']}，"
+        f"重试 {bulk.retries} 次"
+    )
+    print(f"预计 {args.users} 人逐人发送耗时: {args.users / naive_rate:.1f}s")
+    await api.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量消息发送压测")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--naive-users", type=int, default=200)
+    parser.add_argument("--port", type=int, default=9210)
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--qps", type=int, default=40, help="客户端 QPS 预算")
+    parser.add_argument("--server-qps", type=int, default=0, help="替身服务端限流")
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    start_fake_server(args.port, args.latency_ms, args.server_qps)
+    asyncio.run(bench(args))
@@ -0,0 +1,156 @@
+"""
+保留事件的内存占用对比：Pydantic 模型 / 解码后的 dict / 紧凑事件（core/events.py）
+
+    python tests/bench_event_memory.py --count 100000
+
+对每种表示各构造 count 条互不相同的机器人消息与回调事件并全部保留（模拟排队、
+转发缓冲等场景），用 tracemalloc 统计保留部分的内存，另外给出构造耗时与还原为
+处理函数入参的耗时。
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.events import CallbackEvent, RobotEvent  # noqa: E402
+from app.schemas.ding_robot import robot_request_adapter  # noqa: E402
+
+
+def robot_payload(i: int) -> bytes:
+    return json.dumps(
+        {
+            "conversationId": f"cid{i % 500:06d}",
+            "chatbotCorpId": "ding0123456789abcdef",
+            "chatbotUserId": "$:LWCP_v1:$0123456789abcdefghijklmn",
+            "openThreadId": f"thread{i % 500:06d}",
+            "msgId": f"msgXXXXXXXXXXXXXXXX{i:08d}",
+            "senderNick": f"用户{i % 2000}",
+            "isAdmin": False,
+            "senderStaffId": f"staff{i % 2000}",
+            "sessionWebhookExpiredTime": 1700000000000 + i,
+            "createAt": 1700000000000 + i,
+            "senderCorpId": "ding0123456789abcdef",
+            "conversationType": "2",
+            "senderId": f"$:LWCP_v1:$sender{i % 2000:010d}",
+            "conversationTitle": "项目讨论群",
+            "isInAtList": True,
+            "sessionWebhook": f"https://oapi.dingtalk.com/robot/sendBySession?session={i:032d}",
+            "robotCode": "dingrobotcode0123",
+            "msgtype": "text",
+            "text": {"content": f"第{i}条消息：明天下午三点开会讨论预算"},
+        },
+        ensure_ascii=False,
+    ).encode()
+
+
+def callback_payload(i: int) -> bytes:
+    return json.dumps(
+        {
+            "EventType": "user_modify_org",
+            "CorpId": "ding0123456789abcdef",
+            "TimeStamp": str(1700000000000 + i),
+            "UserId": [f"user{i:08d}", f"user{i + 1:08d}"],
+            "OptStaffId": f"staff{i % 2000}",
+        },
+        ensure_ascii=False,
+    ).encode()
+
+
+def build_robot_model(data: bytes):
+    return robot_request_adapter.validate_json(data)
+
+
+def build_robot_dict(data: bytes):
+    return json.loads(data)
+
+
+def build_robot_event(data: bytes):
+    body = robot_request_adapter.validate_json(data)
+    return RobotEvent.from_request(body, body.text.content)
+
+
+def build_callback_dict(data: bytes):
+    return json.loads(data)
+
+
+def build_callback_event(data: bytes):
+    decrypted = data.decode()
+    return CallbackEvent.from_dict(json.loads(decrypted), decrypted)
+
+
+def measure(name: str, build, payloads, materialize=None):
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    retained = [build(data) for data in payloads]
+    build_s = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    materialize_us = None
+    if materialize is not None:
+        sample = retained[:1000]
+        start = time.perf_counter()
+        for item in sample:
+            materialize(item)
+        materialize_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+    size = current - base
+    result = {
+        "name": name,
+        "total_mb": size / 1024 / 1024,
+        "per_event_b": size / len(retained),
+        "build_us": build_s / len(retained) * 1e6,
+        "materialize_us": materialize_us,
+    }
+    del retained
+    gc.collect()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="保留事件的内存占用对比")
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    robot = [robot_payload(i) for i in range(args.count)]
+    callback = [callback_payload(i) for i in range(args.count)]
+    results = [
+        measure("robot: TextRequest 模型", build_robot_model, robot),
+        measure("robot: dict", build_robot_dict, robot),
+        measure(
+            "robot: RobotEvent",
+            build_robot_event,
+            robot,
+            materialize=lambda e: e.materialize(),
+        ),
+        measure("callback: dict", build_callback_dict, callback),
+        measure(
+            "callback: CallbackEvent",
+            build_callback_event,
+            callback,
+            materialize=lambda e: e.materialize(),
+        ),
+    ]
+
+    print(f"保留 {args.count} 条事件:")
+    print(f"{'表示':<26}{'总计 MB':>10}{'每条 B':>10}{'构造 us':>10}{'还原 us':>10}")
+    for r in results:
+        materialize = (
+            f"{r['materialize_us']:10.2f}" if r["materialize_us"] is not None else ""
+        )
+        print(
+            f"{r['name']:<28}{r['total_mb']:10.2f}{r['per_event_b']:10.0f}"
+            f"{r['build_us']:10.2f}{materialize}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+冷启动回归检查：导入耗时、启动耗时与首个请求的延迟
+
+    python tests/bench_startup.py                     # 默认阈值：导入 1500ms、首个请求 50ms
+    python tests/bench_startup.py --max-import-ms 0   # 阈值为 0 表示不检查该项
+
+每轮在新的子进程中测量（模块缓存为空），取多轮中位数；超过阈值时以非零状态码退出，
+可直接放进 CI。需要与运行应用时相同的环境变量或 .env（RobotCode、ase_key 等）。
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import os
+import statistics
+import subprocess  # nosec B404
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure():
+    """子进程：导入应用、启动、依次发送两次回调与两次机器人消息"""
+    sys.path.insert(0, ROOT)
+    start = time.perf_counter()
+    from app.main import app
+
+    import_ms = (time.perf_counter() - start) * 1000
+
+    from fastapi.testclient import TestClient
+
+    from app.config import settings
+    from app.utils.DingCallbackCrypto3 import DingCallbackCrypto3
+
+    def callback_request(crypto: DingCallbackCrypto3):
+        encrypted = crypto.encrypt(json.dumps({"EventType": "check_url"}))
+        ts, nonce = str(int(time.time())), "bench"
+        signature = crypto.generateSignature(nonce, ts, crypto.token, encrypted)
+        return {
+            "url": "/v1/callback",
+            "params": {"signature": signature, "timestamp": ts, "nonce": nonce},
+            "json": {"encrypt": encrypted},
+        }
+
+    def robot_request():
+        ts = str(int(time.time() * 1000))
+        secret = settings.Client_Secret
+        sign = base64.b64encode(
+            hmac.new(
+                secret.encode(), f"{ts}\n{secret}".encode(), hashlib.sha256
+            ).digest()
+        ).decode()
+        body = {
+            "conversationId": "cid",
+            "chatbotCorpId": "corp",
+            "chatbotUserId": "bot",
+            "openThreadId": "t",
+            "msgId": "m",
+            "senderNick": "bench",
+            "isAdmin": False,
+            "sessionWebhookExpiredTime": 0,
+            "createAt": int(time.time() * 1000),
+            "conversationType": "1",
+            "senderId": "s",
+            "sessionWebhook": "http://127.0.0.1:9/unused",
+            "msgtype": "text",
+            "text": {"content": "hello"},
+        }
+        return {"url": "/", "headers": {"timestamp": ts, "sign": sign}, "json": body}
+
+    def timed(client: TestClient, request: dict) -> float:
+        start = time.perf_counter()
+        response = client.post(**request)
+        elapsed = (time.perf_counter() - start) * 1000
+        assert response.status_code < 500, response.text  # nosec B101
+        return elapsed
+
+    start = time.perf_counter()
+    with TestClient(app) as client:
+        startup_ms = (time.perf_counter() - start) * 1000
+        crypto = DingCallbackCrypto3(
+            settings.token, settings.ase_key, settings.Client_ID
+        )
+        result = {
+            "import_ms": import_ms,
+            "startup_ms": startup_ms,
+            "callback_first_ms": timed(client, callback_request(crypto)),
+            "callback_second_ms": timed(client, callback_request(crypto)),
+            "robot_first_ms": timed(client, robot_request()),
+            "robot_second_ms": timed(client, robot_request()),
+        }
+        report = getattr(app.state.context, "startup_report", None)
+        if report:
+            result["startup_steps"] = report["steps"]
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动回归检查")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument(
+        "--max-import-ms", type=float, default=1500, help="导入耗时上限，0 表示不检查"
+    )
+    parser.add_argument(
+        "--max-first-request-ms",
+        type=float,
+        default=50,
+        help="首个请求延迟上限，0 表示不检查",
+    )
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        measure()
+        return
+
+    runs = []
+    for _ in range(args.rounds):
+        output = subprocess.run(  # nosec B603
+            [sys.executable, __file__, "--child"],
+            capture_output=True,
+            text=True,
+            env={**os.environ, "LOG_LEVEL": "WARNING"},
+        )
+        if output.returncode != 0:
+            print(output.stderr)
+            sys.exit(output.returncode)
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    keys = [k for k in runs[0] if k.endswith("_ms")]
+    summary = {k: round(statistics.median(r[k] for r in runs), 2) for k in keys}
+    for key, value in summary.items():
+        print(f"{key:>20}: {value:8.2f} ms")
+    if "startup_steps" in runs[-1]:
+        print("启动各步骤耗时（最后一轮）:")
+        for step, ms in runs[-1]["startup_steps"].items():
+            print(f"{step:>28}: {ms:8.2f} ms")
+
+    failures = []
+    if args.max_import_ms and summary["import_ms"] > args.max_import_ms:
+        failures.append(f"导入耗时 {summary['import_ms']}ms > {args.max_import_ms}ms")
+    first = max(summary["callback_first_ms"], summary["robot_first_ms"])
+    if args.max_first_request_ms and first > args.max_first_request_ms:
+        failures.append(f"首个请求延迟 {first}ms > {args.max_first_request_ms}ms")
+    if failures:
+        print("回归检查失败: " + "；".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+钉钉服务端 API 本地替身服务（oapi.dingtalk.com + api.dingtalk.com）
+
+用于在没有真实钉钉环境时验证与压测出站调用（DingTalkClient / BulkSender / sessionWebhook）：
+    1. 启动替身：python tests/fake_dingtalk_server.py --port 9200 --latency-ms 30 --qps 40
+    2. 启动应用：DINGTALK_OAPI_URL=http://127.0.0.1:9200
+                 DINGTALK_API_URL=http://127.0.0.1:9200
+                 python run.py
+替身模拟接口延迟、按秒窗口的 QPS 限流（返回钉钉的限流错误）以及单次接收者上限校验，
+并通过 /stats 返回收到的调用统计。
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import uvicorn
+from fastapi import Body, FastAPI
+from fastapi.responses import JSONResponse
+
+
+def create_app(latency_ms: float = 30, qps: int = 0, invalid_suffix: str = "x"):
+    """
+    :param latency_ms: 每次调用的模拟延迟
+    :param qps: 每秒允许的调用数（0 表示不限流），超出时返回限流错误
+    :param invalid_suffix: userid 以该后缀结尾时视为无效接收者
+    """
+    app = FastAPI(title="钉钉服务端 API 替身")
+    calls: Counter = Counter()
+    window = {"second": 0, "count": 0}
+
+    def throttled() -> bool:
+        if not qps:
+            return False
+        second = int(time.time())
+        if window["second"] != second:
+            window["second"], window["count"] = second, 0
+        window["count"] += 1
+        return window["count"] > qps
+
+    @app.get("/gettoken")
+    async def get_token():
+        calls["gettoken"] += 1
+        return {"errcode": 0, "access_token": "fake-token", "expires_in": 7200}
+
+    @app.post("/topapi/message/corpconversation/asyncsend_v2")
+    async def work_notice(body: dict = Body(...)):
+        await asyncio.sleep(latency_ms / 1000)
+        if throttled():
+            calls["throttled"] += 1
+            return {"errcode": 90018, "errmsg": "当前企业调用该接口的QPS超限"}
+        userids = body["userid_list"].split(",")
+        if len(userids) > 100:
+            return {"errcode": 40035, "errmsg": "userid_list 超过 100"}
+        calls["work_notice"] += 1
+        calls["work_notice_users"] += len(userids)
+        return {"errcode": 0, "task_id": calls["work_notice"], "request_id": "fake"}
+
+    @app.post("/v1.0/robot/oToMessages/batchSend")
+    async def robot_batch_send(body: dict = Body(...)):
+        await asyncio.sleep(latency_ms / 1000)
+        if throttled():
+            calls["throttled"] += 1
+            return JSONResponse(
+                {
+                    "code": "Forbidden.AccessDenied.QpsLimitForApi",
+                    "message": "QPS 超限",
+                },
+                status_code=403,
+            )
+        user_ids = body["userIds"]
+        if len(user_ids) > 20:
+            return JSONResponse(
+                {"code": "InvalidParameter", "message": "userIds 超过 20"},
+                status_code=400,
+            )
+        calls["robot"] += 1
+        calls["robot_users"] += len(user_ids)
+        return {
+            "processQueryKey": f"pqk-{calls['robot']}",
+            "invalidStaffIdList": [u for u in user_ids if u.endswith(invalid_suffix)],
+            "flowControlledStaffIdList": [],
+        }
+
+    @app.post("/robot/sendBySession")
+    async def session_webhook(body: dict = Body(...)):
+        """机器人消息中的 sessionWebhook 回复（load_generator 生成的消息指向这里）"""
+        await asyncio.sleep(latency_ms / 1000)
+        if throttled():
+            calls["throttled"] += 1
+            return {"errcode": 130101, "errmsg": "send too fast"}
+        calls["session_webhook"] += 1
+        return {"errcode": 0, "errmsg": "ok"}
+
+    @app.get("/stats")
+    async def stats():
+        return dict(calls)
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="钉钉服务端 API 本地替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--latency-ms", type=float, default=30, help="模拟接口延迟")
+    parser.add_argument("--qps", type=int, default=0, help="每秒允许的调用数，0 不限")
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(args.latency_ms, args.qps),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
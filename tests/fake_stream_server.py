@@ -0,0 +1,154 @@
+"""
+钉钉 Stream 模式本地替身服务
+
+用于在没有真实钉钉环境时验证 Stream 模式接入（DingStreamClient）：
+    1. 启动替身：python tests/fake_stream_server.py --port 9100 --events 100 --robots 20
+    2. 启动应用：STREAM_MODE_ENABLED=true
+                 STREAM_GATEWAY_URL=http://127.0.0.1:9100/v1.0/gateway/connections/open
+                 python run.py
+替身在每条连接上先发送 ping，再推送指定数量的事件与机器人消息，统计 ack 结果后
+发送 disconnect，用于同时验证 ack、流控与断线重连。
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+
+ROBOT_TOPIC = "/v1.0/im/bot/messages/get"
+EVENT_TYPES = ["user_modify_org", "org_dept_modify", "bpms_instance_change"]
+
+
+def build_event(i: int) -> dict:
+    event_type = EVENT_TYPES[i % len(EVENT_TYPES)]
+    return {
+        "specVersion": "1.0",
+        "type": "EVENT",
+        "headers": {
+            "messageId": uuid.uuid4().hex,
+            "topic": "*",
+            "eventType": event_type,
+            "eventCorpId": "ding-fake-corp",
+            "eventId": uuid.uuid4().hex,
+            "eventBornTime": str(int(time.time() * 1000)),
+            "contentType": "application/json",
+        },
+        "data": json.dumps({"UserId": [f"user{i}"], "DeptId": [i % 10]}),
+    }
+
+
+def build_robot_message(i: int) -> dict:
+    now = int(time.time() * 1000)
+    data = {
+        "conversationId": f"cid{i % 5}",
+        "chatbotCorpId": "ding-fake-corp",
+        "chatbotUserId": "fake-bot",
+        "openThreadId": "thread",
+        "msgId": uuid.uuid4().hex,
+        "senderNick": f"tester{i}",
+        "isAdmin": False,
+        "sessionWebhookExpiredTime": now + 3600000,
+        "createAt": now,
+        "conversationType": "2",
+        "senderId": f"sender{i % 7}",
+        "sessionWebhook": "http://127.0.0.1:9/webhook",
+        "msgtype": "text",
+        "text": {"content": f"stream message {i}"},
+    }
+    return {
+        "specVersion": "1.0",
+        "type": "CALLBACK",
+        "headers": {
+            "messageId": uuid.uuid4().hex,
+            "topic": ROBOT_TOPIC,
+            "contentType": "application/json",
+        },
+        "data": json.dumps(data, ensure_ascii=False),
+    }
+
+
+def create_app(events: int, robots: int) -> FastAPI:
+    app = FastAPI(title="Fake DingTalk Stream Gateway")
+
+    @app.post("/v1.0/gateway/connections/open")
+    async def open_connection(request: Request):
+        body = await request.json()
+        print(f"[gateway] 注册连接: clientId={body.get('clientId')}")
+        host = request.headers.get("host")
+        return {"endpoint": f"ws://{host}/connect", "ticket": uuid.uuid4().hex}
+
+    @app.websocket("/connect")
+    async def connect(ws: WebSocket):
+        await ws.accept()
+        messages = [build_event(i) for i in range(events)]
+        messages += [build_robot_message(i) for i in range(robots)]
+        pending = {m["headers"]["messageId"]: time.perf_counter() for m in messages}
+        codes: dict = {}
+        latencies = []
+
+        ping = {
+            "specVersion": "1.0",
+            "type": "SYSTEM",
+            "headers": {"messageId": uuid.uuid4().hex, "topic": "ping"},
+            "data": json.dumps({"opaque": "fake"}),
+        }
+        await ws.send_text(json.dumps(ping))
+
+        async def reader():
+            while pending:
+                ack = json.loads(await ws.receive_text())
+                sent_at = pending.pop(ack["headers"]["messageId"], None)
+                if sent_at is None:
+                    continue  # ping 的回复
+                codes[ack["code"]] = codes.get(ack["code"], 0) + 1
+                latencies.append((time.perf_counter() - sent_at) * 1000)
+
+        start = time.perf_counter()
+        reader_task = asyncio.create_task(reader())
+        try:
+            for m in messages:
+                await ws.send_text(json.dumps(m))
+            await asyncio.wait_for(reader_task, timeout=30)
+        except (asyncio.TimeoutError, WebSocketDisconnect):
+            print(f"[stream] 未收到全部 ack，剩余 {len(pending)} 条")
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        if latencies:
+            p50 = latencies[len(latencies) // 2]
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(
+                f"[stream] {len(latencies)} 条 ack / {elapsed:.2f}s "
+                f"({len(latencies) / elapsed:.0f} msg/s), code 分布 {codes}, "
+                f"p50={p50:.1f}ms p99={p99:.1f}ms"
+            )
+
+        disconnect = {
+            "specVersion": "1.0",
+            "type": "SYSTEM",
+            "headers": {"messageId": uuid.uuid4().hex, "topic": "disconnect"},
+            "data": "{}",
+        }
+        try:
+            await ws.send_text(json.dumps(disconnect))
+            await ws.close()
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="钉钉 Stream 模式本地替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--events", type=int, default=100, help="每条连接推送的事件数")
+    parser.add_argument(
+        "--robots", type=int, default=20, help="每条连接推送的机器人消息数"
+    )
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.events, args.robots), host=args.host, port=args.port)
@@ -0,0 +1,406 @@
+"""
+端到端压测：在本地扮演钉钉平台，向运行中的实例推送回调事件与机器人消息
+
+    1. 启动应用（出站调用指向替身平台）：
+           DINGTALK_OAPI_URL=http://127.0.0.1:9200
+           DINGTALK_API_URL=http://127.0.0.1:9200
+           python run.py
+    2. 压测（--fake-port 会在本进程中启动替身平台，见 fake_dingtalk_server.py）：
+           python tests/load_generator.py --target http://127.0.0.1:8000 \\
+               --callback-rate 200 --robot-rate 100 --duration 30 --fake-port 9200
+
+- 回调：按 DingCallbackCrypto3 的方案签名并 AES 加密（token / aes_key / corp key 可配置，
+  默认读取与应用相同的环境变量），并校验应答的签名、解密结果（"success"）与时限
+- 机器人消息：各 msgtype 轮流发送，带 HmacSHA256 签名头；发送者与会话在池中轮换，
+  避免压测流量本身触发入站限流；sessionWebhook 指向替身平台
+- 开环：按固定速率发出请求，不等待前一个请求完成；延迟从计划发出的时刻算起，
+  实例变慢时排队时间也计入延迟
+- 超过时限（默认 1500ms，钉钉判定推送失败并重试）的请求即使应答正确也计为失败
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+import uvicorn
+from Crypto.Cipher import AES
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_dingtalk_server import create_app  # noqa: E402
+
+from app.config.api_paths import APIPaths  # noqa: E402
+from app.schemas.ding_robot import robot_request_samples  # noqa: E402
+from app.utils.DingCallbackCrypto3 import DingCallbackCrypto3  # noqa: E402
+
+# 各 msgtype 的消息内容（其余公共字段取自 robot_request_samples）
+ROBOT_CONTENT = {
+    "text": lambda i: {"content": f"压测消息 {i}"},
+    "picture": lambda i: {"downloadCode": f"dc{i}", "pictureDownloadCode": f"pdc{i}"},
+    "audio": lambda i: {
+        "downloadCode": f"dc{i}",
+        "duration": 3000,
+        "recognition": "你好",
+    },
+    "video": lambda i: {"downloadCode": f"dc{i}", "duration": 5000, "videoType": "mp4"},
+    "file": lambda i: {"downloadCode": f"dc{i}", "fileName": f"file{i}.pdf"},
+    "richText": lambda i: {
+        "richText": [
+            {"text": f"富文本 {i}"},
+            {"downloadCode": f"dc{i}", "type": "picture"},
+        ]
+    },
+}
+
+
+def start_fake_platform(port: int, latency_ms: float, qps: int) -> uvicorn.Server:
+    config = uvicorn.Config(create_app(latency_ms, qps), port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+class KindStats:
+    """单类请求的统计：成功请求的延迟与按原因分类的失败数"""
+
+    def __init__(self):
+        self.scheduled = 0
+        self.latencies: List[float] = []
+        self.failures: Counter = Counter()
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        completed = len(latencies) + sum(self.failures.values())
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 2)
+
+        return {
+            "scheduled": self.scheduled,
+            "completed": completed,
+            "ok": len(latencies),
+            "failed": sum(self.failures.values()),
+            "offered_rps": round(self.scheduled / elapsed, 2) if elapsed else None,
+            "ok_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+            "p50_ms": percentile(0.5),
+            "p90_ms": percentile(0.9),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(latencies[-1], 2) if latencies else None,
+            "failures": dict(self.failures.most_common()),
+        }
+
+
+class LoadGenerator:
+    def __init__(self, args):
+        self.args = args
+        self.crypto = DingCallbackCrypto3(args.token, args.aes_key, args.corp_key)
+        self.deadline_ms = args.deadline_ms
+        self.event_types = args.event_types.split(",")
+        self.msgtypes = robot_request_samples()
+        # 未在本进程启动替身平台时，假定替身以默认端口单独运行
+        self.webhook = f"http://127.0.0.1:{args.fake_port or 9200}/robot/sendBySession"
+        self.stats = {"callback": KindStats(), "robot": KindStats()}
+        self.inflight = 0
+        self.client = httpx.AsyncClient(
+            base_url=args.target,
+            timeout=args.timeout,
+            limits=httpx.Limits(
+                max_connections=args.max_inflight,
+                max_keepalive_connections=args.max_inflight,
+            ),
+        )
+
+    # ------------------- 请求构造 -------------------
+    def encrypt(self, plaintext: str) -> str:
+        """
+        与 DingCallbackCrypto3.encrypt 相同的方案（随机串 16 字节 + 4 字节长度 + 明文 +
+        corp key，PKCS#7 填充到 32 字节，AES-CBC），按字节计算长度与填充：
+        DingCallbackCrypto3.encrypt 按字符处理，只适用于 ASCII 且长度较短的明文（如 "success"）
+        """
+        crypto = self.crypto
+        body = plaintext.encode()
+        data = b"".join(
+            [
+                crypto.generateRandomKey(16).encode(),
+                struct.pack(">I", len(body)),
+                body,
+                crypto.key.encode(),
+            ]
+        )
+        pad = 32 - len(data) % 32
+        data += bytes([pad]) * pad
+        cipher = AES.new(crypto.aesKey, AES.MODE_CBC, crypto.aesKey[:16])
+        return base64.b64encode(cipher.encrypt(data)).decode()
+
+    def callback_request(self, i: int) -> Dict[str, Any]:
+        event_type = self.event_types[i % len(self.event_types)]
+        event = {
+            "EventType": event_type,
+            "CorpId": self.args.corp_key,
+            "TimeStamp": str(int(time.time() * 1000)),
+            "UserId": [f"load-user-{i % self.args.senders}"],
+            "LoadSeq": i,
+        }
+        encrypted = self.encrypt(json.dumps(event, ensure_ascii=False))
+        timestamp, nonce = str(int(time.time())), f"load{i:012d}"
+        signature = self.crypto.generateSignature(
+            nonce, timestamp, self.crypto.token, encrypted
+        )
+        return {
+            "url": APIPaths.CALLBACK_VERIFY,
+            "params": {"signature": signature, "timestamp": timestamp, "nonce": nonce},
+            "json": {"encrypt": encrypted},
+        }
+
+    def robot_request(self, i: int) -> Dict[str, Any]:
+        body = dict(self.msgtypes[i % len(self.msgtypes)])
+        msgtype = body["msgtype"]
+        content_field = "text" if msgtype == "text" else "content"
+        body[content_field] = ROBOT_CONTENT.get(msgtype, lambda _: {})(i)
+        conversation = i % self.args.conversations
+        now_ms = int(time.time() * 1000)
+        body.update(
+            conversationId=f"load-cid-{conversation}",
+            conversationType="2",
+            conversationTitle=f"压测群 {conversation}",
+            chatbotCorpId=self.args.corp_key,
+            msgId=f"load-msg-{i}",
+            senderId=f"load-sender-{i % self.args.senders}",
+            senderNick=f"压测用户 {i % self.args.senders}",
+            createAt=now_ms,
+            sessionWebhook=f"{self.webhook}?session=load-{conversation}",
+            sessionWebhookExpiredTime=now_ms + 3600 * 1000,
+        )
+        secret = self.args.robot_secret
+        timestamp = str(now_ms)
+        sign = base64.b64encode(
+            hmac.new(
+                secret.encode(), f"{timestamp}\n{secret}".encode(), hashlib.sha256
+            ).digest()
+        ).decode()
+        return {
+            "url": APIPaths.API_ROOT,
+            "headers": {"timestamp": timestamp, "sign": sign},
+            "json": body,
+        }
+
+    # ------------------- 应答校验 -------------------
+    def check_callback_ack(self, resp: httpx.Response) -> Optional[str]:
+        """返回失败原因，应答正确时返回 None"""
+        if resp.status_code != 200:
+            return f"http_{resp.status_code}"
+        try:
+            ack = resp.json()
+            decrypted = self.crypto.getDecryptMsg(
+                ack["msg_signature"], ack["timeStamp"], ack["nonce"], ack["encrypt"]
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            return "ack_bad_signature" if "signature" in str(e) else "ack_malformed"
+        return None if decrypted == "success" else "ack_wrong_content"
+
+    @staticmethod
+    def check_robot_ack(resp: httpx.Response) -> Optional[str]:
+        return None if resp.status_code == 200 else f"http_{resp.status_code}"
+
+    # ------------------- 开环发送 -------------------
+    async def fire(self, kind: str, request: Dict[str, Any], scheduled: float):
+        stats = self.stats[kind]
+        self.inflight += 1
+        try:
+            resp = await self.client.post(**request)
+        except httpx.TimeoutException:
+            stats.failures["timeout"] += 1
+            return
+        except httpx.HTTPError as e:
+            stats.failures[type(e).__name__] += 1
+            return
+        finally:
+            self.inflight -= 1
+        latency_ms = (time.perf_counter() - scheduled) * 1000
+        check = self.check_callback_ack if kind == "callback" else self.check_robot_ack
+        reason = check(resp)
+        if reason is None and latency_ms > self.deadline_ms:
+            reason = "deadline_exceeded"
+        if reason is None:
+            stats.latencies.append(latency_ms)
+        else:
+            stats.failures[reason] += 1
+
+    async def open_loop(self, kind: str, rate: float, tasks: set):
+        if rate <= 0:
+            return
+        build = self.callback_request if kind == "callback" else self.robot_request
+        stats = self.stats[kind]
+        start = time.perf_counter()
+        i = 0
+        while i / rate < self.args.duration:
+            scheduled = start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            stats.scheduled += 1
+            if self.inflight >= self.args.max_inflight:
+                # 压测端自身的保护：未发出的请求同样计为失败，而不是悄悄降低发送速率
+                stats.failures["generator_overloaded"] += 1
+            else:
+                task = asyncio.create_task(self.fire(kind, build(i), scheduled))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            i += 1
+
+    async def run(self) -> float:
+        tasks: set = set()
+        start = time.perf_counter()
+        await asyncio.gather(
+            self.open_loop("callback", self.args.callback_rate, tasks),
+            self.open_loop("robot", self.args.robot_rate, tasks),
+        )
+        if tasks:
+            await asyncio.wait(tasks)
+        elapsed = time.perf_counter() - start
+        await self.client.aclose()
+        return elapsed
+
+
+def print_report(report: Dict[str, Any]):
+    print(
+        f"持续 {report['elapsed_s']}s，时限 {report['deadline_ms']}ms，"
+        f"目标 {report['target']}"
+    )
+    header = (
+        "类型",
+        "计划",
+        "成功",
+        "失败",
+        "发送/s",
+        "成功/s",
+        "p50",
+        "p90",
+        "p99",
+        "max",
+    )
+    print("".join(f"{h:>12}" for h in header))
+    for kind in ("callback", "robot"):
+        s = report[kind]
+        if not s["scheduled"]:
+            continue
+        row = (
+            kind,
+            s["scheduled"],
+            s["ok"],
+            s["failed"],
+            s["offered_rps"],
+            s["ok_rps"],
+            s["p50_ms"],
+            s["p90_ms"],
+            s["p99_ms"],
+            s["max_ms"],
+        )
+        print("".join(f"{str(v):>12}" for v in row))
+        for reason, count in s["failures"].items():
+            print(f"{'':>12}失败 {reason}: {count}")
+    if report.get("fake_platform") is not None:
+        print(f"替身平台收到的调用: {report['fake_platform']}")
+
+
+async def main_async(args) -> Dict[str, Any]:
+    generator = LoadGenerator(args)
+    elapsed = await generator.run()
+    report = {
+        "target": args.target,
+        "elapsed_s": round(elapsed, 2),
+        "deadline_ms": args.deadline_ms,
+        "callback": generator.stats["callback"].summary(elapsed),
+        "robot": generator.stats["robot"].summary(elapsed),
+        "fake_platform": None,
+    }
+    if args.fake_port:
+        async with httpx.AsyncClient() as client:
+            try:
+                resp = await client.get(f"http://127.0.0.1:{args.fake_port}/stats")
+                report["fake_platform"] = resp.json()
+            except httpx.HTTPError:
+                pass
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端压测（本地模拟钉钉平台）")
+    parser.add_argument(
+        "--target", default="http://127.0.0.1:8000", help="被测实例地址"
+    )
+    parser.add_argument("--callback-rate", type=float, default=50, help="回调事件/秒")
+    parser.add_argument("--robot-rate", type=float, default=50, help="机器人消息/秒")
+    parser.add_argument("--duration", type=float, default=10, help="发送时长（秒）")
+    parser.add_argument("--deadline-ms", type=float, default=1500)
+    parser.add_argument("--timeout", type=float, default=5.0, help="单个请求超时（秒）")
+    parser.add_argument("--max-inflight", type=int, default=1000)
+    parser.add_argument(
+        "--event-types",
+        default="user_modify_org,org_dept_modify,bpms_instance_change",
+        help="回调事件类型，逗号分隔，轮流发送",
+    )
+    parser.add_argument("--senders", type=int, default=1000, help="发送者池大小")
+    parser.add_argument("--conversations", type=int, default=200, help="会话池大小")
+    parser.add_argument("--token", default=os.environ.get("token", ""))
+    parser.add_argument("--aes-key", default=os.environ.get("ase_key", ""))
+    parser.add_argument(
+        "--corp-key",
+        default=os.environ.get("Client_ID", ""),
+        help="加解密使用的 corpId / suiteKey / Client_ID",
+    )
+    parser.add_argument("--robot-secret", default=os.environ.get("Client_Secret", ""))
+    parser.add_argument(
+        "--fake-port",
+        type=int,
+        default=0,
+        help="在本进程中启动替身平台的端口，0 不启动",
+    )
+    parser.add_argument("--fake-latency-ms", type=float, default=30)
+    parser.add_argument("--fake-qps", type=int, default=0)
+    parser.add_argument("--json", default="", help="完整结果另存为 JSON 文件")
+    parser.add_argument(
+        "--max-failure-rate",
+        type=float,
+        default=None,
+        help="失败率超过该值（0~1）时以非零状态码退出",
+    )
+    args = parser.parse_args()
+    if not (args.token and args.aes_key and args.corp_key and args.robot_secret):
+        parser.error("需要 token / aes key / corp key / robot secret（参数或环境变量）")
+
+    if args.fake_port:
+        start_fake_platform(args.fake_port, args.fake_latency_ms, args.fake_qps)
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.max_failure_rate is not None:
+        completed = sum(report[k]["completed"] for k in ("callback", "robot"))
+        failed = sum(report[k]["failed"] for k in ("callback", "robot"))
+        if completed and failed / completed > args.max_failure_rate:
+            print(f"失败率 {failed / completed:.2%} 超过 {args.max_failure_rate:.2%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()